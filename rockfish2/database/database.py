@@ -2,10 +2,18 @@
 Database tools
 """
 import os
+import time
 import pandas as pd
 from pandas.io import sql as psql
 #from sqlitedict import SqliteDict
 from rockfish2 import logging
+from rockfish2.db.backends.sqlite3.schema import SchemaCache
+from rockfish2.db.backends.sqlite3.instrument import \
+        SQLInstrumentation, debug_enabled
+from rockfish2.db.backends.sqlite3.reader import TableReader
+from rockfish2.db.backends.sqlite3.query import QueryBuilder
+from rockfish2.db.backends.sqlite3.stats import TableStats
+from rockfish2.db.backends.sqlite3.cache import ResultCache
 
 #XXX dev
 #from logbook import Logger
@@ -62,7 +70,8 @@ class DatabaseIntegrityError(DatabaseError):
     pass
 
 
-class Connection(dbapi2.Connection):
+class Connection(SchemaCache, SQLInstrumentation, TableReader,
+        QueryBuilder, TableStats, ResultCache, dbapi2.Connection):
 
     def __init__(self, database=':memory:', spatial=False,
             params_table=None):
@@ -137,23 +146,6 @@ class Connection(dbapi2.Connection):
             logging.debug("Creating table 'spatial_ref_sys'")
             self.execute('SELECT InitSpatialMetadata()')
 
-    def _get_pragma(self, table):
-        """
-        Return the SQLite PRAGMA information.
-
-        Parameters
-        ----------
-        table: str
-            Name of table to get PRAGMA for.
-
-        Returns
-        -------
-        pragma
-            Result of pragma query
-        """
-        sql = 'PRAGMA table_info({:})'.format(table)
-        return self.execute(sql).fetchall()
-
     def _create_table(self, table, fields, if_not_exists=True):
         """
         Shortcut function for creating new tables.
@@ -235,31 +227,11 @@ class Connection(dbapi2.Connection):
                 required_fields.append(str(row[1]))
         return required_fields
 
-    def _get_types(self, table):
-        """
-        Return dictionary of data types for fields in a table
-
-        Parameters
-        ----------
-        table: str
-            Name of table to get field data types for
-
-        Returns
-        _______
-        type_dict: dict
-            Dictionary of SQL data types indexed by field names
-        """
-        type_dict = {}
-        for row in self._get_pragma(table):
-            type_dict[row[1]] = row[2]
-        return type_dict
-
     def _get_tables(self):
         """
         Returns a list of tables in the database.
         """
-        sql = "SELECT name FROM sqlite_master WHERE type='table'"
-        return [d[0] for d in self.execute(sql)]
+        return self._get_master_names('table')
 
     tables = property(_get_tables)
 
@@ -267,8 +239,7 @@ class Connection(dbapi2.Connection):
         """
         Returns a list of views in the database.
         """
-        sql = "SELECT name FROM sqlite_master WHERE type='view'"
-        return [d[0] for d in self.execute(sql)]
+        return self._get_master_names('view')
 
     views = property(_get_views)
 
@@ -278,15 +249,25 @@ class Connection(dbapi2.Connection):
         """
         warn = kwargs.pop('warn_only', False)
 
-        logging.debug('Executing SQL:\n{:}', *args)
+        if debug_enabled():
+            logging.debug('Executing SQL:\n{:}', *args)
+        stats = self.sql_stats
+        if stats is not None:
+            t0 = time.time()
         try:
-            return dbapi2.Connection.execute(self, *args)
+            cursor = dbapi2.Connection.execute(self, *args)
         except Exception as e:
             msg = "execute() failed with '{:}: {:}'"\
                     .format(e.__class__.__name__, e.message)
             msg += ' while executing: {:}'.format(*args)
 
             _process_exception(e, msg, warn=warn)
+            return
+
+        if stats is not None:
+            stats.record(args[0], time.time() - t0, cursor.rowcount)
+        self._check_ddl(args[0])
+        return cursor
 
     def executemany(self, *args, **kwargs):
         """
@@ -294,15 +275,25 @@ class Connection(dbapi2.Connection):
         """
         warn = kwargs.pop('warn_only', False)
 
-        logging.debug('Executing SQL:\n{:}', args[0])
+        if debug_enabled():
+            logging.debug('Executing SQL:\n{:}', args[0])
+        stats = self.sql_stats
+        if stats is not None:
+            t0 = time.time()
         try:
-            return dbapi2.Connection.executemany(self, *args)
+            cursor = dbapi2.Connection.executemany(self, *args)
         except Exception as e:
             msg = "executemany() failed with '{:}: {:}'"\
                     .format(e.__class__.__name__, e.message)
             msg += ' while executing: {:}'.format(args[0])
             
             _process_exception(e, msg, warn=warn)
+            return
+
+        if stats is not None:
+            stats.record(args[0], time.time() - t0, cursor.rowcount)
+        self._check_ddl(args[0])
+        return cursor
 
     def read_sql(self, sql, **kwargs):
         """
@@ -319,10 +310,16 @@ class Connection(dbapi2.Connection):
         -------
         data: :class:`pandas.DataFrame`
             Data from the table
+
+        Notes
+        -----
+        Results are cached if the result cache is enabled (see
+        :meth:`enable_result_cache`).
         """
-        return psql.read_sql(sql, self, **kwargs)
+        return self._read_cached(lambda: psql.read_sql(sql, self, **kwargs),
+                sql, **kwargs)
 
-    def read_table(self, table):
+    def read_table(self, table, chunksize=None, **kwargs):
         """
         Reads all rows from a table and returns a
         :class:`pandas.DataFrame`
@@ -331,18 +328,31 @@ class Connection(dbapi2.Connection):
         ----------
         table: str
             Table name to read data from
+        chunksize: int, optional
+            If given, return an iterator of data frames with up to this
+            many rows each (see :meth:`iter_table`).
+        **kwargs
+            Keyword arguments for :meth:`iter_table`, if `chunksize` is
+            given.
 
         Returns
         -------
         data: :class:`pandas.DataFrame`
             Data from the table
         """
+        if chunksize is not None:
+            return self.iter_table(table, chunksize=chunksize, **kwargs)
+
         sql = 'SELECT * FROM {:}'.format(table)
-        dat = self.execute(sql).fetchall()
-        if len(dat) > 0:
-            return pd.DataFrame(dat, columns=self._get_fields(table))
-        else:
-            return psql.read_sql(sql, self)
+
+        def read():
+            dat = self.execute(sql).fetchall()
+            if len(dat) > 0:
+                return pd.DataFrame(dat, columns=self._get_fields(table))
+            else:
+                return psql.read_sql(sql, self)
+
+        return self._read_cached(read, sql, table=table)
 
     def count(self, table, **kwargs):
         """
@@ -353,13 +363,30 @@ class Connection(dbapi2.Connection):
         table: str
             Name of table to get count from.
         **kwargs
-            Keyword arguments for WHERE statements in the query
+            Keyword arguments for WHERE statements in the query (see
+            :meth:`build_where`)
+
+        Notes
+        -----
+        Without WHERE statements, the maintained row count is used for
+        tables with maintained statistics (see :meth:`track_stats`).
         """
-        sql = 'SELECT COUNT(*) FROM {:}'.format(table)
         if len(kwargs) > 0:
-            values = ['{:}="{:}"'.format(k, kwargs[k]) for k in kwargs]
-            sql += ' WHERE ' + ' and '.join(values)
-        return self.execute(sql).fetchall()[0][0]
+            fields = [f.lower() for f in self._get_fields(table)]
+            unknown = sorted([k for k in kwargs if k.lower() not in fields])
+            if len(fields) > 0 and len(unknown) > 0:
+                raise DatabaseOperationalError("No such column(s) in '{:}':"
+                        " {:}".format(table, ', '.join(unknown)))
+
+        sql = 'SELECT COUNT(*) FROM {:}'.format(table)
+        where, params = self.build_where(kwargs)
+        if len(where) > 0:
+            sql += ' WHERE ' + where
+        else:
+            nrows = self._get_maintained_count(table)
+            if nrows is not None:
+                return nrows
+        return self.execute(sql, params).fetchone()[0]
 
     def insert(self, table, **kwargs):
         """
@@ -52,6 +52,9 @@ def format_where(match_dict, list_op='OR', key_op='AND', op='=',
     """
     Format a dictionary of search terms into a SQLite search string.
 
+    Values are written into the SQL. For parameterized queries, use
+    :func:`rockfish2.db.backends.sqlite3.query.build_where`.
+
     Parameters
     ----------
     match_dict : dict
@@ -0,0 +1,234 @@
+"""
+Cache of query results for SQLite connections
+"""
+import os
+import re
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+from rockfish2 import logging
+
+# quoted strings and identifiers, which are not normalized
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+
+def normalize_sql(sql):
+    """
+    Collapse whitespace outside of quoted strings in a SQL statement
+
+    Examples
+    --------
+    >>> normalize_sql("SELECT  *\\n  FROM t WHERE name = 'a  b' ")
+    "SELECT * FROM t WHERE name = 'a  b'"
+    """
+    parts = _QUOTED.split(sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i])
+
+    return ''.join(parts).strip()
+
+
+class QueryCache(object):
+    """
+    Least-recently-used cache of data frames with a memory limit
+
+    Parameters
+    ----------
+    max_bytes: int, optional
+        Maximum total size of cached data frames in memory. Default is
+        100 MB.
+    spill_dir: str, optional
+        Directory to write data frames that are evicted from memory to.
+        Default is to discard evicted data frames.
+    """
+    def __init__(self, max_bytes=100e6, spill_dir=None):
+
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        if (spill_dir is not None) and not os.path.isdir(spill_dir):
+            os.makedirs(spill_dir)
+
+        self.version = None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._spilled = {}
+
+    def _get_spill_file(self, key):
+
+        name = hashlib.sha1(repr(key)).hexdigest()
+
+        return os.path.join(self.spill_dir, 'rockfish_cache_' + name + '.pkl')
+
+    def clear(self):
+        """
+        Remove all cached data frames
+        """
+        for filename in self._spilled.values():
+            if os.path.isfile(filename):
+                os.remove(filename)
+        self._spilled = {}
+        self._data = OrderedDict()
+        self.nbytes = 0
+
+    def set_version(self, version):
+        """
+        Clear the cache if the data version changed
+        """
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def get(self, key):
+        """
+        Returns a copy of a cached data frame, or `None`
+        """
+        if key in self._data:
+            dat, nbytes = self._data.pop(key)
+            self._data[key] = (dat, nbytes)
+        elif key in self._spilled:
+            filename = self._spilled.pop(key)
+            dat = pd.read_pickle(filename)
+            os.remove(filename)
+            self.put(key, dat)
+        else:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return dat.copy()
+
+    def put(self, key, dat):
+        """
+        Add a copy of a data frame to the cache
+        """
+        nbytes = dat.memory_usage(index=True, deep=True).sum()
+        if nbytes > self.max_bytes:
+            self._spill(key, dat)
+            return
+
+        self._data[key] = (dat.copy(), nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _key, (_dat, _nbytes) = self._data.popitem(last=False)
+            self.nbytes -= _nbytes
+            self._spill(_key, _dat)
+
+    def _spill(self, key, dat):
+        """
+        Write an evicted data frame to the spill directory
+        """
+        if self.spill_dir is None:
+            return
+
+        filename = self._get_spill_file(key)
+        logging.debug('Spilling cached query result to: {:}', filename)
+        dat.to_pickle(filename)
+        self._spilled[key] = filename
+
+
+class ResultCache(object):
+    """
+    Opt-in cache of results from :meth:`read_sql` and :meth:`read_table`
+
+    Results are keyed on the normalized SQL and the query parameters. The
+    cache is cleared when the data change, as detected by
+    ``PRAGMA data_version`` (commits by other connections), ``PRAGMA
+    schema_version``, and the number of rows changed by this connection.
+    While this connection may have uncommitted changes, the cache is not
+    used, and the cache is cleared by :meth:`rollback`. Changes to attached
+    databases are not detected.
+    """
+    # cache, or None if disabled
+    result_cache = None
+
+    def enable_result_cache(self, max_bytes=100e6, spill_dir=None):
+        """
+        Start caching query results
+
+        Parameters
+        ----------
+        max_bytes: int, optional
+            Maximum total size of cached results in memory. The least
+            recently used results are evicted first. Default is 100 MB.
+        spill_dir: str, optional
+            Directory to write evicted results to. Default is to discard
+            evicted results.
+
+        Returns
+        -------
+        cache: :class:`QueryCache`
+            The result cache.
+        """
+        self.__dict__['_clean_changes'] = self.total_changes
+        self.result_cache = QueryCache(max_bytes=max_bytes,
+                spill_dir=spill_dir)
+
+        return self.result_cache
+
+    def disable_result_cache(self):
+        """
+        Stop caching query results and clear the cache
+        """
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        self.result_cache = None
+
+    def _get_data_version(self):
+        """
+        Returns a tuple that changes when the data may have changed
+        """
+        return (self._read_pragma('data_version').fetchone()[0],
+                self._get_schema_version(), self.total_changes)
+
+    def _has_uncommitted_changes(self):
+        """
+        Returns `True` if this connection may have uncommitted changes
+
+        Rows changed since the last :meth:`commit` or :meth:`rollback` are
+        assumed to be uncommitted, even if the sqlite3 module committed
+        them implicitly before another statement.
+        """
+        if self.isolation_level is None:
+            return False
+
+        return self.total_changes != self.__dict__.get('_clean_changes', 0)
+
+    def _read_cached(self, func, sql, params=None, **kwargs):
+        """
+        Returns a cached result, or calls `func()` and caches the result
+        """
+        cache = self.result_cache
+        if (cache is None) or ('chunksize' in kwargs):
+            return func()
+
+        if self._has_uncommitted_changes():
+            # uncommitted changes may be rolled back
+            return func()
+
+        cache.set_version(self._get_data_version())
+        key = (normalize_sql(sql), repr(params), repr(sorted(kwargs.items())))
+        dat = cache.get(key)
+        if dat is None:
+            dat = func()
+            cache.put(key, dat)
+
+        return dat
+
+    def commit(self):
+        """
+        Commits the current transaction.
+        """
+        super(ResultCache, self).commit()
+        self.__dict__['_clean_changes'] = self.total_changes
+
+    def rollback(self):
+        """
+        Rolls back the current transaction.
+        """
+        super(ResultCache, self).rollback()
+        self.__dict__['_clean_changes'] = self.total_changes
+        if self.result_cache is not None:
+            self.result_cache.clear()
@@ -2,6 +2,10 @@
 Extensions to the SQLite database connection object.
 """
 import os
+import time
+import shutil
+import itertools
+import numpy as np
 import pandas as pd
 from pandas.io import sql as psql
 from rockfish2 import logging
@@ -9,7 +13,130 @@ from rockfish2.utils.loaders import get_resource_file
 from rockfish2.db.backends.sqlite3.base import dbapi2, load_spatialite,\
         SPATIALITE_ENABLED, OperationalError, IntegrityError,\
         ConfigurationError
+from rockfish2.db.backends.sqlite3.schema import SchemaCache
+from rockfish2.db.backends.sqlite3.instrument import \
+        SQLInstrumentation, debug_enabled
+from rockfish2.db.backends.sqlite3.reader import TableReader
+from rockfish2.db.backends.sqlite3.query import QueryBuilder
+from rockfish2.db.backends.sqlite3.stats import TableStats
+from rockfish2.db.backends.sqlite3.cache import ResultCache
 
+# cached template database with spatial metadata
+SPATIAL_TEMPLATE = os.path.join(os.path.expanduser('~'), '.rockfish2',
+        'spatial_metadata_template.sqlite')
+
+# SRIDs that are always kept in minimal spatial_ref_sys tables
+UNDEFINED_SRIDS = [-1, 0]
+
+# conflict resolution algorithms for INSERT statements
+ON_CONFLICT = ['ROLLBACK', 'ABORT', 'FAIL', 'IGNORE', 'REPLACE']
+
+
+def build_spatial_template(filename=None, replace=False,
+        source='sql'):
+    """
+    Build a template database with SpatiaLite metadata
+
+    The template is built once and copied for each new spatial database,
+    instead of running ``InitSpatialMetadata()``, which inserts thousands
+    of rows into ``spatial_ref_sys``.
+
+    Parameters
+    ----------
+    filename: str, optional
+        Path to the template database. Default is `SPATIAL_TEMPLATE`.
+    replace: bool, optional
+        If `True`, rebuild an existing template. Default is `False`.
+    source: str, optional
+        If 'sql' (default), the metadata are read from the
+        ``initspatialmetadata.sql`` resource file, which does not require
+        SpatiaLite. If 'spatialite', the metadata are created by the
+        installed version of SpatiaLite.
+
+    Returns
+    -------
+    filename: str
+        Path to the template database.
+    """
+    filename = filename or SPATIAL_TEMPLATE
+    if os.path.isfile(filename) and not replace:
+        return filename
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    logging.info('Building spatial metadata template: {:}', filename)
+
+    # build in a temporary file, so that other processes never see a
+    # partial template
+    tmpfile = '{:}.{:}.tmp'.format(filename, os.getpid())
+    if os.path.isfile(tmpfile):
+        os.remove(tmpfile)
+
+    db = dbapi2.connect(tmpfile)
+    try:
+        if source == 'sql':
+            with open(get_resource_file('initspatialmetadata.sql')) as f:
+                db.executescript(f.read())
+        elif source == 'spatialite':
+            load_spatialite(db)
+            db.execute('SELECT InitSpatialMetadata(1)')
+        else:
+            raise ValueError("source must be 'sql' or 'spatialite'")
+        db.commit()
+    finally:
+        db.close()
+
+    os.rename(tmpfile, filename)
+
+    return filename
+
+def copy_spatial_template(database, template=None):
+    """
+    Create a new database file by copying the spatial metadata template
+
+    Parameters
+    ----------
+    database: str
+        Path to the new database file.
+    template: str, optional
+        Path to the template database. Default is `SPATIAL_TEMPLATE`,
+        which is built if it does not exist.
+    """
+    if os.path.isfile(database):
+        raise ValueError('Database exists: {:}'.format(database))
+
+    template = build_spatial_template(template)
+    logging.debug('Copying spatial metadata template to: {:}', database)
+    shutil.copyfile(template, database)
+
+
+def to_native(values):
+    """
+    Convert an array to a list of native Python values
+
+    Null values (NaN, NaT, `None`) are converted to `None`, and
+    datetime64 values to :class:`datetime.datetime`.
+
+    Examples
+    --------
+    >>> to_native(np.array([1.5, np.nan]))
+    [1.5, None]
+    >>> to_native(np.array([1, 2], dtype=np.int32))
+    [1, 2]
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        values = values.astype('M8[us]')
+
+    if values.dtype.kind in 'fcMO':
+        null = pd.isnull(values)
+        if np.any(null):
+            values = values.astype(object)
+            values[null] = None
+
+    return values.tolist()
 
 def _process_exception(exception, message, warn=False):
 
@@ -43,11 +170,63 @@ class DatabaseIntegrityError(DatabaseError):
     pass
 
 
-class Connection(dbapi2.Connection):
-
+class Connection(SchemaCache, SQLInstrumentation, TableReader,
+        QueryBuilder, TableStats, ResultCache, dbapi2.Connection):
+    """
+    SQLite database connection
+
+    Parameters
+    ----------
+    database: str, optional
+        Path to the database file. Default is ``':memory:'``.
+    spatial: bool, optional
+        If `True`, load SpatiaLite and initialize spatial metadata. Default
+        is `False`.
+    spatial_template: bool or str, optional
+        If `True` (default), spatial metadata for new databases are copied
+        from the cached template database (see
+        :func:`build_spatial_template`). A path sets the template to use.
+        If `False`, metadata are created with ``InitSpatialMetadata()``.
+    srids: list, optional
+        If given, only these SRIDs (and the undefined SRIDs -1 and 0) are
+        copied into ``spatial_ref_sys`` for new databases. Default is to
+        copy all SRIDs.
+    check_same_thread: bool, optional
+        If `False`, the connection can be used from threads other than the
+        one that created it (e.g., by
+        :class:`~rockfish2.db.backends.sqlite3.pool.ConnectionPool`).
+        Default is `True`.
+    in_memory: bool, optional
+        If `True`, a new database file is built in memory and is only
+        written to `database` by :meth:`persist`. Existing database files
+        are opened as usual. Default is `False`.
+    memory_budget: int, optional
+        Maximum size, in bytes, of a database to build in memory. If
+        `estimated_size` is larger, the database is built on the disk.
+        Default is no limit.
+    estimated_size: int, optional
+        Estimated size, in bytes, of the database.
+    """
     ConfigurationError = ConfigurationError
 
-    def __init__(self, database=':memory:', spatial=False):
+    def __init__(self, database=':memory:', spatial=False,
+            spatial_template=True, srids=None, check_same_thread=True,
+            in_memory=False, memory_budget=None, estimated_size=None):
+
+        # file to write databases built in memory to
+        self.persist_filename = None
+        if in_memory and (database not in ['', ':memory:'])\
+                and not os.path.isfile(database):
+            if (memory_budget is not None) and (estimated_size is not None)\
+                    and (estimated_size > memory_budget):
+                logging.info('Estimated size ({:.0f} MB) exceeds the memory'
+                        ' budget ({:.0f} MB); building on the disk',
+                        estimated_size / 1e6, memory_budget / 1e6)
+            else:
+                logging.info('Building database in memory for: {:}',
+                        database)
+                self.persist_filename = database
+                database = ':memory:'
 
         if os.path.isfile(database):
             logging.info('Connecting to existing database: {:}',
@@ -55,41 +234,105 @@ class Connection(dbapi2.Connection):
         else:
             logging.info('Creating new database: {:}', database)
 
-        dbapi2.Connection.__init__(self, database)
+            if spatial and spatial_template and (srids is None)\
+                    and (database not in ['', ':memory:']):
+                copy_spatial_template(database,
+                        template=self._get_template(spatial_template))
+
+        dbapi2.Connection.__init__(self, database,
+                check_same_thread=check_same_thread)
         self.row_factory = dbapi2.Row
 
 	self.spatialite_enabled = SPATIALITE_ENABLED
 
         if spatial:
-            self.init_spatialite()
+            self.init_spatialite(spatial_template=spatial_template,
+                    srids=srids)
 
-    def _get_fields(self, table):
+    def persist(self, filename=None, replace=False, progress=None,
+            interval=10000):
         """
-        Return a list of fields for a table.
+        Write the database to a file
+
+        The database is committed and written with ``VACUUM INTO`` to a
+        temporary file, which is renamed to `filename` when complete. This
+        is typically used to save a database built in memory (see the
+        `in_memory` parameter).
 
         Parameters
         ----------
-        table: str
-            Name of table to get fields for.
+        filename: str, optional
+            Path to the output file. Default is the `database` given for a
+            database built in memory.
+        replace: bool, optional
+            If `True`, replace an existing file. Default is `False`, except
+            for the file of a database built in memory.
+        progress: callable, optional
+            Function that is called with the fraction of the database
+            written so far. While ``VACUUM INTO`` runs, the fraction is
+            estimated from the size of the output file relative to the
+            size of the database, so it is approximate and is not reported
+            page by page.
+        interval: int, optional
+            Number of SQLite virtual machine instructions between calls to
+            `progress`. Default is 10000.
+
+        Returns
+        -------
+        filename: str
+            Path to the output file.
         """
-        return [str(row[1]) for row in self._get_pragma(table)]
+        if filename is None:
+            filename = self.persist_filename
+        if filename is None:
+            raise ValueError('filename is required for databases that were'
+                    ' not built in memory.')
+        if os.path.isfile(filename) and not replace\
+                and (filename != self.persist_filename):
+            raise ValueError('File exists: {:}'.format(filename))
+        if dbapi2.sqlite_version_info < (3, 27, 0):
+            raise ConfigurationError('persist() requires SQLite 3.27 or'
+                    ' later, found {:}'.format(dbapi2.sqlite_version))
+
+        self.commit()
+        page_size = self.execute('PRAGMA page_size').fetchone()[0]
+        size = page_size * self.execute('PRAGMA page_count').fetchone()[0]
+        logging.info('Writing {:.1f} MB database to: {:}', size / 1e6,
+                filename)
+
+        tmpfile = '{:}.{:}.tmp'.format(filename, os.getpid())
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
+        if progress is not None:
+            def _progress():
+                if os.path.isfile(tmpfile):
+                    progress(min(os.path.getsize(tmpfile) / float(size), 1.))
+                return 0
+            self.set_progress_handler(_progress, interval)
+
+        try:
+            self.execute('VACUUM INTO ?', (tmpfile, ))
+        finally:
+            if progress is not None:
+                self.set_progress_handler(None, interval)
 
-    def _get_pragma(self, table):
+        os.rename(tmpfile, filename)
+        if progress is not None:
+            progress(1.)
+
+        return filename
+
+    def _get_fields(self, table):
         """
-        Return the SQLite PRAGMA information.
+        Return a list of fields for a table.
 
         Parameters
         ----------
         table: str
-            Name of table to get PRAGMA for.
-
-        Returns
-        -------
-        pragma
-            Result of pragma query
+            Name of table to get fields for.
         """
-        sql = 'PRAGMA table_info({:})'.format(table)
-        return self.execute(sql).fetchall()
+        return [str(row[1]) for row in self._get_pragma(table)]
 
     def _get_primary_fields(self, table):
         """
@@ -124,12 +367,23 @@ class Connection(dbapi2.Connection):
                 required_fields.append(str(row[1]))
         return required_fields
 
+    def _get_filename(self):
+        """
+        Returns the path to the main database file, or an empty string if
+        the database is in memory.
+        """
+        for row in self.execute('PRAGMA database_list'):
+            if row[1] == 'main':
+                return row[2] or ''
+        return ''
+
+    filename = property(_get_filename)
+
     def _get_tables(self):
         """
         Returns a list of tables in the database.
         """
-        sql = "SELECT name FROM sqlite_master WHERE type='table'"
-        return [d[0] for d in self.execute(sql)]
+        return self._get_master_names('table')
 
     tables = property(_get_tables)
 
@@ -137,8 +391,7 @@ class Connection(dbapi2.Connection):
         """
         Returns a list of views in the database.
         """
-        sql = "SELECT name FROM sqlite_master WHERE type='view'"
-        return [d[0] for d in self.execute(sql)]
+        return self._get_master_names('view')
 
     views = property(_get_views)
 
@@ -151,13 +404,30 @@ class Connection(dbapi2.Connection):
         table: str
             Name of table to get count from.
         **kwargs
-            Keyword arguments for WHERE statements in the query
+            Keyword arguments for WHERE statements in the query (see
+            :meth:`build_where`)
+
+        Notes
+        -----
+        Without WHERE statements, the maintained row count is used for
+        tables with maintained statistics (see :meth:`track_stats`).
         """
-        sql = 'SELECT COUNT(*) FROM {:}'.format(table)
         if len(kwargs) > 0:
-            values = ['{:}="{:}"'.format(k, kwargs[k]) for k in kwargs]
-            sql += ' WHERE ' + ' and '.join(values)
-        return self.execute(sql).fetchall()[0][0]
+            fields = [f.lower() for f in self._get_fields(table)]
+            unknown = sorted([k for k in kwargs if k.lower() not in fields])
+            if len(fields) > 0 and len(unknown) > 0:
+                raise DatabaseOperationalError("No such column(s) in '{:}':"
+                        " {:}".format(table, ', '.join(unknown)))
+
+        sql = 'SELECT COUNT(*) FROM {:}'.format(table)
+        where, params = self.build_where(kwargs)
+        if len(where) > 0:
+            sql += ' WHERE ' + where
+        else:
+            nrows = self._get_maintained_count(table)
+            if nrows is not None:
+                return nrows
+        return self.execute(sql, params).fetchone()[0]
 
     def execute(self, *args, **kwargs):
         """
@@ -165,15 +435,25 @@ class Connection(dbapi2.Connection):
         """
         warn = kwargs.pop('warn_only', False)
 
-        logging.debug('Executing SQL:\n{:}', *args)
+        if debug_enabled():
+            logging.debug('Executing SQL:\n{:}', *args)
+        stats = self.sql_stats
+        if stats is not None:
+            t0 = time.time()
         try:
-            return dbapi2.Connection.execute(self, *args)
+            cursor = dbapi2.Connection.execute(self, *args)
         except Exception as e:
             msg = "execute() failed with '{:}: {:}'"\
                     .format(e.__class__.__name__, e.message)
             msg += ' while executing: {:}'.format(*args)
 
             _process_exception(e, msg, warn=warn)
+            return
+
+        if stats is not None:
+            stats.record(args[0], time.time() - t0, cursor.rowcount)
+        self._check_ddl(args[0])
+        return cursor
 
     def executemany(self, *args, **kwargs):
         """
@@ -181,15 +461,25 @@ class Connection(dbapi2.Connection):
         """
         warn = kwargs.pop('warn_only', False)
 
-        logging.debug('Executing SQL:\n{:}', args[0])
+        if debug_enabled():
+            logging.debug('Executing SQL:\n{:}', args[0])
+        stats = self.sql_stats
+        if stats is not None:
+            t0 = time.time()
         try:
-            return dbapi2.Connection.executemany(self, *args)
+            cursor = dbapi2.Connection.executemany(self, *args)
         except Exception as e:
             msg = "executemany() failed with '{:}: {:}'"\
                     .format(e.__class__.__name__, e.message)
             msg += ' while executing: {:}'.format(args[0])
             
             _process_exception(e, msg, warn=warn)
+            return
+
+        if stats is not None:
+            stats.record(args[0], time.time() - t0, cursor.rowcount)
+        self._check_ddl(args[0])
+        return cursor
 
     def read_sql(self, sql, **kwargs):
         """
@@ -206,10 +496,16 @@ class Connection(dbapi2.Connection):
         -------
         data: :class:`pandas.DataFrame`
             Data from the table
+
+        Notes
+        -----
+        Results are cached if the result cache is enabled (see
+        :meth:`enable_result_cache`).
         """
-        return psql.read_sql(sql, self, **kwargs)
+        return self._read_cached(lambda: psql.read_sql(sql, self, **kwargs),
+                sql, **kwargs)
 
-    def read_table(self, table):
+    def read_table(self, table, chunksize=None, **kwargs):
         """
         Reads all rows from a table and returns a
         :class:`pandas.DataFrame`
@@ -218,22 +514,109 @@ class Connection(dbapi2.Connection):
         ----------
         table: str
             Table name to read data from
+        chunksize: int, optional
+            If given, return an iterator of data frames with up to this
+            many rows each (see :meth:`iter_table`).
+        **kwargs
+            Keyword arguments for :meth:`iter_table`, if `chunksize` is
+            given.
 
         Returns
         -------
         data: :class:`pandas.DataFrame`
             Data from the table
         """
+        if chunksize is not None:
+            return self.iter_table(table, chunksize=chunksize, **kwargs)
+
         sql = 'SELECT * FROM {:}'.format(table)
-        dat = self.execute(sql).fetchall()
-        if len(dat) > 0:
-            return pd.DataFrame(dat, columns=self._get_fields(table))
-        else:
-            return psql.read_sql(sql, self)
 
-    def init_spatialite(self):
+        def read():
+            dat = self.execute(sql).fetchall()
+            if len(dat) > 0:
+                return pd.DataFrame(dat, columns=self._get_fields(table))
+            else:
+                return psql.read_sql(sql, self)
+
+        return self._read_cached(read, sql, table=table)
+
+    def _get_template(self, spatial_template):
+        """
+        Returns the template path for the `spatial_template` argument
+        """
+        if spatial_template is True:
+            return None
+        return spatial_template
+
+    def _copy_spatial_template(self, template=None, srids=None):
+        """
+        Copy spatial metadata tables from a template database
+
+        Parameters
+        ----------
+        template: str, optional
+            Path to the template database. Default is `SPATIAL_TEMPLATE`.
+        srids: list, optional
+            If given, only copy these SRIDs (and the undefined SRIDs) into
+            ``spatial_ref_sys``.
+        """
+        template = build_spatial_template(template)
+
+        self.execute("ATTACH DATABASE ? AS spatial_template", (template, ))
+        try:
+            sql = """SELECT type, name, sql FROM spatial_template.sqlite_master
+                WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"""
+            schema = self.execute(sql).fetchall()
+
+            # create tables and copy data before adding indices and triggers
+            for _type in ['table', 'index', 'view', 'trigger']:
+                for type, name, sql in schema:
+                    if type != _type:
+                        continue
+
+                    if sql.upper().startswith('CREATE VIRTUAL'):
+                        if not self.spatialite_enabled:
+                            logging.debug('Skipping virtual table: {:}',
+                                    name)
+                            continue
+                        self.execute(sql)
+                        continue
+
+                    self.execute(sql)
+                    if type != 'table':
+                        continue
+
+                    sql = """INSERT INTO main.'{0:}' SELECT * FROM
+                        spatial_template.'{0:}'""".format(name)
+                    if (name == 'spatial_ref_sys') and (srids is not None):
+                        _srids = sorted(set(UNDEFINED_SRIDS
+                            + [int(s) for s in srids]))
+                        sql += ' WHERE srid IN ({:})'.format(
+                                ', '.join([str(s) for s in _srids]))
+                    self.execute(sql)
+
+            if 'sqlite_sequence' in self.tables:
+                sql = """INSERT INTO main.sqlite_sequence SELECT * FROM
+                    spatial_template.sqlite_sequence"""
+                self.execute(sql)
+            self.commit()
+        finally:
+            self.execute("DETACH DATABASE spatial_template")
+
+    def init_spatialite(self, spatial_template=True, srids=None):
         """
         Setup a spatialite database.
+
+        Parameters
+        ----------
+        spatial_template: bool or str, optional
+            If `True` (default), spatial metadata are copied from the
+            cached template database. A path sets the template to use. If
+            `False`, metadata are created with ``InitSpatialMetadata()``.
+        srids: list, optional
+            SRIDs to keep in ``spatial_ref_sys``, in addition to the
+            undefined SRIDs. Default is to keep all SRIDs. Only used with
+            `spatial_template`.
         """
         if not self.spatialite_enabled:
             try:
@@ -244,7 +627,14 @@ class Connection(dbapi2.Connection):
                 msg += " extensions were not found."
                 raise ConfigurationError(msg)
 
-        if 'spatial_ref_sys' not in self.tables:
+        if 'spatial_ref_sys' in self.tables:
+            return
+
+        if spatial_template:
+            self._copy_spatial_template(
+                    template=self._get_template(spatial_template),
+                    srids=srids)
+        else:
             self.execute('SELECT InitSpatialMetadata()')
 
     def insert(self, table, **kwargs):
@@ -263,3 +653,137 @@ class Connection(dbapi2.Connection):
         sql += ' VALUES (%s)' % ', '.join(['?' for k in kwargs])
         data = tuple([kwargs[k] for k in kwargs])
         self.execute(sql, data)
+
+    def _get_sql_insert_many(self, table, columns, on_conflict=None,
+            geometry=None):
+        """
+        Returns a cached INSERT statement for :meth:`insert_many`
+        """
+        if on_conflict is not None:
+            on_conflict = on_conflict.upper()
+            if on_conflict not in ON_CONFLICT:
+                raise ValueError('on_conflict must be one of: {:}'\
+                        .format(ON_CONFLICT))
+        geometry = geometry or {}
+
+        key = ('insert_many', table, tuple(columns), on_conflict,
+                tuple(sorted(geometry.items())))
+
+        def _build():
+            used = [c for g in geometry.values() for c in g[:-1]]
+            fields = [c for c in columns if c not in used]
+            values = ['?' for c in fields]
+            for field in sorted(geometry):
+                names, srid = geometry[field][:-1], geometry[field][-1]
+                if len(names) == 1:
+                    values.append('GeomFromText(?, {:})'.format(srid))
+                elif len(names) == 2:
+                    values.append('MakePoint(?, ?, {:})'.format(srid))
+                else:
+                    raise ValueError('Geometry for {:} must be (wkt, srid)'
+                            ' or (x, y, srid).'.format(field))
+                fields.append(field)
+
+            sql = 'INSERT'
+            if on_conflict is not None:
+                sql += ' OR {:}'.format(on_conflict)
+            sql += " INTO '{:}' ({:}) VALUES ({:})".format(table,
+                    ', '.join(['"{:}"'.format(f) for f in fields]),
+                    ', '.join(values))
+
+            order = [c for c in columns if c not in used]
+            for field in sorted(geometry):
+                order += list(geometry[field][:-1])
+
+            return sql, [list(columns).index(c) for c in order]
+
+        return self._get_cached_schema(key, _build)
+
+    def insert_many(self, table, data, columns=None, chunk=10000,
+            on_conflict=None, geometry=None, commit=True):
+        """
+        Adds many rows to a table
+
+        Columns are converted to native Python values one chunk at a time,
+        and each chunk is added with a single call to :meth:`executemany`
+        using a cached INSERT statement. All chunks are added in one
+        transaction.
+
+        Parameters
+        ----------
+        table: str
+            Name of table to add data to.
+        data: :class:`pandas.DataFrame`, dict, list, or iterator
+            Data to add, as a data frame, a dictionary of arrays, a list of
+            arrays with one array for each column, or an iterator of row
+            tuples.
+        columns: list, optional
+            Names of the columns in `data`. Required for lists and
+            iterators. Default is all columns in data frames and
+            dictionaries.
+        chunk: int, optional
+            Number of rows to add with each call to :meth:`executemany`.
+            Default is 10000.
+        on_conflict: str, optional
+            Conflict resolution algorithm, one of 'rollback', 'abort',
+            'fail', 'ignore', or 'replace' (i.e., ``INSERT OR IGNORE``).
+            Default is to abort on conflicts.
+        geometry: dict, optional
+            Geometry fields to build from columns in `data`, as
+            ``{field: (wkt, srid)}`` for geometries given as WKT, or
+            ``{field: (x, y, srid)}`` for points. Columns used for
+            geometries are not added to the table. Requires SpatiaLite.
+        commit: bool, optional
+            If `True` (default), commit the transaction after adding all
+            rows. If an error occurs, the transaction is rolled back.
+
+        Returns
+        -------
+        nrows: int
+            Number of rows added.
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = list(data.columns) if columns is None else columns
+            arrays = [data[c].values for c in columns]
+        elif isinstance(data, dict):
+            columns = sorted(data) if columns is None else columns
+            arrays = [np.asarray(data[c]) for c in columns]
+        elif isinstance(data, (list, tuple)):
+            assert columns is not None, 'columns are required for lists'
+            assert len(columns) == len(data),\
+                    'data must have one array for each column'
+            arrays = [np.asarray(a) for a in data]
+        else:
+            assert columns is not None, 'columns are required for iterators'
+            arrays = None
+
+        sql, order = self._get_sql_insert_many(table, columns,
+                on_conflict=on_conflict, geometry=geometry)
+
+        if arrays is not None:
+            nrows = len(arrays[0]) if len(arrays) > 0 else 0
+            assert all([len(a) == nrows for a in arrays]),\
+                    'all columns must have the same length'
+            arrays = [arrays[i] for i in order]
+            chunks = (zip(*[to_native(a[i0:i0 + chunk]) for a in arrays])
+                    for i0 in range(0, nrows, chunk))
+        else:
+            rows = iter(data)
+            chunks = iter(lambda: [tuple([r[i] for i in order])
+                for r in itertools.islice(rows, chunk)], [])
+
+        logging.debug('Inserting rows into {:} with:\n{:}', table, sql)
+        nrows = 0
+        try:
+            for values in chunks:
+                self.executemany(sql, values)
+                nrows += len(values)
+        except:
+            if commit:
+                self.rollback()
+            raise
+
+        if commit:
+            self.commit()
+
+        return nrows
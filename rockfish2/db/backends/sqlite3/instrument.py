@@ -0,0 +1,205 @@
+"""
+Instrumentation for SQL statements executed through a connection
+"""
+import re
+import csv
+import json
+from itertools import chain
+from collections import OrderedDict
+from logbook import Handler, DEBUG
+from rockfish2 import logging
+
+# fields in exported statistics
+SQL_STATS_FIELDS = ['template', 'count', 'total_time', 'max_time', 'rows']
+
+# literals that are replaced in statement templates
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+# maximum number of cached statement templates
+_MAX_TEMPLATES = 10000
+
+
+def get_template(sql):
+    """
+    Returns a statement template with literal values replaced by ``?``
+
+    Parameters
+    ----------
+    sql: str
+        SQL statement.
+
+    Examples
+    --------
+    >>> get_template("SELECT * FROM t WHERE line='L1' AND  point=12")
+    'SELECT * FROM t WHERE line=? AND point=?'
+    """
+    return _WHITESPACE.sub(' ', _LITERALS.sub('?', sql)).strip()
+
+
+def debug_enabled(logger=logging):
+    """
+    Returns `True` if a debug message to a logger would be emitted
+
+    A message is emitted if the logger is enabled at the debug level and a
+    handler on the logger, or on the current handler stack, accepts debug
+    messages before any black hole handler.
+
+    Parameters
+    ----------
+    logger: :class:`logbook.Logger`, optional
+        Logger to check. Default is the rockfish logger.
+    """
+    if logger.disabled or (logger.level > DEBUG):
+        return False
+
+    for handler in chain(logger.handlers,
+                         Handler.stack_manager.iter_context_objects()):
+        if handler.level > DEBUG:
+            continue
+        return not handler.blackhole
+
+    return False
+
+
+class SQLStats(object):
+    """
+    Statistics for SQL statements, grouped by statement template
+
+    Parameters
+    ----------
+    slow_query_time: float, optional
+        Statements that take longer than this time, in seconds, are logged.
+        Default (`None`) is to not log slow statements.
+    """
+    def __init__(self, slow_query_time=None):
+
+        self.slow_query_time = slow_query_time
+        self.reset()
+
+    def reset(self):
+        """
+        Clear all statistics
+        """
+        # {template: [count, total_time, max_time, rows]}
+        self.stats = OrderedDict()
+        self._templates = {}
+
+    def record(self, sql, elapsed, rows=-1):
+        """
+        Add a statement to the statistics
+
+        Parameters
+        ----------
+        sql: str
+            SQL statement.
+        elapsed: float
+            Execution time, in seconds.
+        rows: int, optional
+            Number of rows affected, or -1 if unknown.
+        """
+        template = self._templates.get(sql, None)
+        if template is None:
+            template = get_template(sql)
+            if len(self._templates) < _MAX_TEMPLATES:
+                self._templates[sql] = template
+
+        stat = self.stats.get(template, None)
+        if stat is None:
+            stat = self.stats[template] = [0, 0., 0., 0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+        stat[3] += max(rows, 0)
+
+        if (self.slow_query_time is not None)\
+                and (elapsed > self.slow_query_time):
+            logging.info('Slow SQL statement ({:.3f} s): {:}', elapsed,
+                    template)
+
+    def to_records(self):
+        """
+        Returns statistics as a list of dictionaries, slowest first
+        """
+        records = [dict(zip(SQL_STATS_FIELDS, [t] + stat))
+                for t, stat in self.stats.items()]
+
+        return sorted(records, key=lambda r: r['total_time'], reverse=True)
+
+    def to_json(self, filename=None):
+        """
+        Export statistics as JSON
+
+        Parameters
+        ----------
+        filename: str, optional
+            Path to the output file. Default is to return a string.
+        """
+        records = self.to_records()
+        if filename is None:
+            return json.dumps(records)
+
+        with open(filename, 'w') as f:
+            json.dump(records, f, indent=1)
+
+    def to_csv(self, filename):
+        """
+        Export statistics as CSV
+
+        Parameters
+        ----------
+        filename: str
+            Path to the output file.
+        """
+        with open(filename, 'wb') as f:
+            writer = csv.DictWriter(f, SQL_STATS_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.to_records())
+
+
+class SQLInstrumentation(object):
+    """
+    Opt-in SQL statement statistics for a connection
+
+    When statistics are disabled (default), the cost to each statement is
+    a single attribute check. Statements are logged at the debug level only
+    if a handler would emit them (see :func:`debug_enabled`).
+    """
+    # statistics, or None if disabled
+    sql_stats = None
+
+    def enable_sql_stats(self, slow_query_time=None):
+        """
+        Start recording statistics for SQL statements
+
+        Execution times do not include time spent fetching rows from the
+        returned cursor.
+
+        Parameters
+        ----------
+        slow_query_time: float, optional
+            Statements that take longer than this time, in seconds, are
+            logged. Default is to not log slow statements.
+
+        Returns
+        -------
+        stats: :class:`SQLStats`
+            Statistics, which are updated for each statement.
+        """
+        self.sql_stats = SQLStats(slow_query_time=slow_query_time)
+
+        return self.sql_stats
+
+    def disable_sql_stats(self):
+        """
+        Stop recording statistics for SQL statements
+
+        Returns
+        -------
+        stats: :class:`SQLStats`
+            Statistics recorded since :meth:`enable_sql_stats`, or `None`.
+        """
+        stats = self.sql_stats
+        self.sql_stats = None
+
+        return stats
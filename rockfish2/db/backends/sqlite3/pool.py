@@ -0,0 +1,172 @@
+"""
+Pool of connections for concurrent access to a SQLite database
+"""
+import threading
+import Queue
+from contextlib import contextmanager
+from rockfish2 import logging
+from rockfish2.db.backends.sqlite3.connection import Connection,\
+        DatabaseError
+
+
+class ConnectionPool(object):
+    """
+    One writer and several read-only connections to a database in WAL mode
+
+    In write-ahead logging (WAL) mode, readers do not block the writer and
+    the writer does not block readers, so queries from several threads can
+    run while a long ingest is writing. Each query sees the data committed
+    when it started.
+
+    Read-only connections are handed out to one thread at a time. A thread
+    keeps the same connection until it releases it, so nested checkouts in
+    one thread share a connection. Writes are serialized with a lock.
+
+    Parameters
+    ----------
+    database: str
+        Path to the database file. In-memory databases cannot be shared
+        between connections.
+    readers: int, optional
+        Number of read-only connections. Default is 4.
+    factory: class, optional
+        Class for new connections, e.g.,
+        :class:`~rockfish2.navigation.ukooa.p190.database.P190Database`.
+        Must accept `database` and `check_same_thread` keyword arguments.
+        Default is
+        :class:`~rockfish2.db.backends.sqlite3.connection.Connection`.
+    timeout: float, optional
+        Time, in seconds, to wait for a read-only connection before raising
+        a :class:`DatabaseError`. Default (`None`) is to wait indefinitely.
+    **kwargs
+        Keyword arguments for `factory`.
+
+    Examples
+    --------
+    >>> pool = ConnectionPool('temp_pool.sqlite', readers=2)
+    >>> with pool.write() as db:
+    ...     _ = db.execute('CREATE TABLE test (a INTEGER)')
+    ...     _ = db.execute('INSERT INTO test VALUES (1)')
+    >>> with pool.read() as db:
+    ...     print db.execute('SELECT a FROM test').fetchone()[0]
+    1
+    >>> pool.close()
+    >>> import os
+    >>> for suffix in ['', '-wal', '-shm']:
+    ...     if os.path.isfile('temp_pool.sqlite' + suffix):
+    ...         os.remove('temp_pool.sqlite' + suffix)
+    """
+    def __init__(self, database, readers=4, factory=Connection,
+            timeout=None, **kwargs):
+
+        if database in ['', ':memory:']:
+            raise ValueError('A connection pool requires a database file.')
+        assert readers > 0, 'readers must be greater than 0'
+
+        self.database = database
+        self.timeout = timeout
+
+        self.writer = factory(database=database, check_same_thread=False,
+                **kwargs)
+        mode = self.writer.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        if str(mode).lower() != 'wal':
+            raise DatabaseError('Could not set WAL mode for: {:}'\
+                    .format(database))
+        self.writer.commit()
+        self._write_lock = threading.RLock()
+
+        logging.debug('Opening {:} read-only connections to: {:}',
+                readers, database)
+        self.readers = []
+        self._available = Queue.Queue()
+        for i in range(readers):
+            db = factory(database=database, check_same_thread=False,
+                    **kwargs)
+            db.execute('PRAGMA query_only=ON')
+            self.readers.append(db)
+            self._available.put(db)
+
+        # reader checked out by each thread, and the checkout depth
+        self._local = threading.local()
+
+    def reader(self):
+        """
+        Check out a read-only connection for the current thread
+
+        Returns the connection already checked out by the current thread,
+        if any. Each call must be matched by a call to :meth:`release`.
+
+        Returns
+        -------
+        db: connection
+            Read-only connection.
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            try:
+                db = self._available.get(timeout=self.timeout)
+            except Queue.Empty:
+                raise DatabaseError('No read-only connection available after'
+                        ' {:} s.'.format(self.timeout))
+            self._local.db = db
+            self._local.depth = 0
+        self._local.depth += 1
+
+        return db
+
+    def release(self):
+        """
+        Return the current thread's read-only connection to the pool
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            raise DatabaseError('No read-only connection is checked out by'
+                    ' this thread.')
+
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self._local.db = None
+            self._available.put(db)
+
+    @contextmanager
+    def read(self):
+        """
+        Context manager that checks out a read-only connection
+        """
+        db = self.reader()
+        try:
+            yield db
+        finally:
+            self.release()
+
+    @contextmanager
+    def write(self):
+        """
+        Context manager that locks the writer connection
+
+        Changes are committed when the context exits, or rolled back if an
+        exception is raised.
+        """
+        with self._write_lock:
+            try:
+                yield self.writer
+            except:
+                self.writer.rollback()
+                raise
+            self.writer.commit()
+
+    def close(self):
+        """
+        Close all connections
+        """
+        for db in self.readers:
+            db.close()
+        self.readers = []
+        with self._write_lock:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
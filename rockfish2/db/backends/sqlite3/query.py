@@ -0,0 +1,241 @@
+"""
+Parameterized WHERE clauses for SQLite queries
+"""
+import json
+from collections import OrderedDict
+import numpy as np
+
+# comparison operators allowed in WHERE clauses
+OPERATORS = ['=', '==', '!=', '<>', '<', '<=', '>', '>=', 'LIKE', 'GLOB',
+        'IN', 'NOT IN', 'BETWEEN']
+
+# lists with more values are matched through a table instead of IN (...)
+MAX_IN_VALUES = 256
+
+# maximum number of cached predicate templates
+MAX_TEMPLATES = 512
+
+# cached predicate templates, as {(field, op, nvalues): sql}
+_TEMPLATES = OrderedDict()
+
+
+def _pad_length(n):
+    """
+    Round a list length up to a power of two
+
+    Padding IN lists limits the number of distinct statements that SQLite
+    must prepare.
+
+    >>> [_pad_length(n) for n in [1, 2, 3, 5, 16, 17]]
+    [1, 2, 4, 8, 16, 32]
+    """
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+def _get_template(field, op, nvalues):
+    """
+    Returns a cached predicate template with `nvalues` placeholders
+    """
+    key = (field, op, nvalues)
+    sql = _TEMPLATES.pop(key, None)
+    if sql is None:
+        if op == 'BETWEEN':
+            sql = '"{:}" BETWEEN ? AND ?'.format(field)
+        elif op in ['IN', 'NOT IN']:
+            sql = '"{:}" {:} ({:})'.format(field, op,
+                    ', '.join(['?'] * nvalues))
+        else:
+            sql = '"{:}" {:} ?'.format(field, op)
+
+        if len(_TEMPLATES) >= MAX_TEMPLATES:
+            _TEMPLATES.popitem(last=False)
+    _TEMPLATES[key] = sql
+
+    return sql
+
+def _to_list(values):
+    """
+    Convert scalars and arrays to a list of native Python values
+    """
+    if isinstance(values, basestring) or np.isscalar(values):
+        values = [values]
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        values = values.astype('M8[us]')
+
+    return values.tolist()
+
+def build_where(match_dict, valid_fields=None, key_op='AND',
+        in_table=None):
+    """
+    Build a parameterized WHERE clause from a dictionary of search terms
+
+    Parameters
+    ----------
+    match_dict: dict
+        Fields and values to match. Values can be scalars (``field = ?``),
+        lists or arrays (``field IN (...)``), `None` (``field IS NULL``), or
+        ``(op, value)`` tuples, e.g., ``('>', 1)``, ``('LIKE', 'E%')``, or
+        ``('BETWEEN', (0, 10))``.
+    valid_fields: list, optional
+        Fields to include. Default is all fields in `match_dict`.
+    key_op: str, optional
+        Operator for combining fields, 'AND' (default) or 'OR'.
+    in_table: callable, optional
+        Function that is called as ``in_table(values, index)`` for lists
+        with more than `MAX_IN_VALUES` values, and returns SQL for a
+        subquery that selects the values (see
+        :meth:`QueryBuilder.build_where`). Default is to raise a
+        :class:`ValueError` for long lists.
+
+    Returns
+    -------
+    sql: str
+        WHERE clause, without the WHERE keyword, or an empty string.
+    params: list
+        Parameters for the placeholders in `sql`.
+
+    Examples
+    --------
+    >>> build_where({'sta': ['A', 'B', 'C']})
+    ('"sta" IN (?, ?, ?, ?)', ['A', 'B', 'C', 'C'])
+    >>> build_where({'time': ('BETWEEN', (0, 10)), 'chan': 'ELZ'})
+    ('"chan" = ? AND "time" BETWEEN ? AND ?', ['ELZ', 0, 10])
+    >>> build_where({'depth': None, 'x': ('>', 1.5)}, key_op='OR')
+    ('"depth" IS NULL OR "x" > ?', [1.5])
+    >>> build_where({'sta': 'A'}, valid_fields=['chan'])
+    ('', [])
+    """
+    key_op = key_op.upper()
+    assert key_op in ['AND', 'OR'], "key_op must be 'AND' or 'OR'"
+    if valid_fields is None:
+        valid_fields = match_dict.keys()
+
+    wheres = []
+    params = []
+    ntable = 0
+    for field in sorted([k for k in match_dict if k in valid_fields]):
+        value = match_dict[field]
+        if isinstance(value, tuple):
+            op, value = value[0].upper(), value[1]
+        elif (not isinstance(value, basestring)) and np.iterable(value):
+            op = 'IN'
+        else:
+            op = '='
+
+        if op not in OPERATORS:
+            raise ValueError('Operator must be one of: {:}'.format(
+                OPERATORS))
+
+        if value is None:
+            if op not in ['=', '==', '!=', '<>']:
+                raise ValueError("Cannot compare NULL with '{:}'"\
+                        .format(op))
+            wheres.append('"{:}" IS {:}NULL'.format(field,
+                '' if op in ['=', '=='] else 'NOT '))
+            continue
+
+        values = _to_list(value)
+        if op == 'BETWEEN':
+            assert len(values) == 2, 'BETWEEN requires (min, max) values'
+        elif op in ['=', '=='] and len(values) > 1:
+            op = 'IN'
+        elif op not in ['IN', 'NOT IN'] and len(values) > 1:
+            raise ValueError("Operator '{:}' requires a single value"\
+                    .format(op))
+
+        if op in ['IN', 'NOT IN']:
+            if len(values) == 0:
+                # matches nothing, or everything for NOT IN
+                wheres.append('0' if op == 'IN' else '1')
+                continue
+            elif len(values) > MAX_IN_VALUES:
+                if in_table is None:
+                    raise ValueError('Lists with more than {:} values'
+                            ' require in_table.'.format(MAX_IN_VALUES))
+                sql, _params = in_table(values, ntable)
+                ntable += 1
+                wheres.append('"{:}" {:} ({:})'.format(field, op, sql))
+                params += _params
+                continue
+
+            nvalues = _pad_length(len(values))
+            values += values[-1:] * (nvalues - len(values))
+
+        wheres.append(_get_template(field, op, len(values)))
+        params += values
+
+    return (' ' + key_op + ' ').join(wheres), params
+
+
+class QueryBuilder(object):
+    """
+    Parameterized WHERE clauses for a connection
+
+    Long lists of values are matched with a subquery on the JSON1
+    ``json_each()`` table-valued function, with the list bound as a single
+    parameter. If JSON1 is not available, the values are written to
+    temporary tables instead.
+    """
+    def _has_json1(self):
+        """
+        Returns `True` if the JSON1 extension is available
+        """
+        if '_json1' not in self.__dict__:
+            try:
+                self.execute("SELECT json('[]')").fetchone()
+                self.__dict__['_json1'] = True
+            except Exception:
+                self.__dict__['_json1'] = False
+
+        return self.__dict__['_json1']
+
+    def _get_in_table(self, values, index=0):
+        """
+        Returns SQL and parameters for a subquery that selects values
+
+        Without JSON1, values are written to the temporary table
+        ``rockfish_in_<index>``. The writes are committed, unless this
+        connection has uncommitted changes, in which case they join the
+        open transaction. The sqlite3 module in Python 2 commits open
+        transactions before creating tables, so a :class:`ValueError` is
+        raised if the table must be created while there are uncommitted
+        changes.
+        """
+        if self._has_json1():
+            return 'SELECT value FROM json_each(?)', [json.dumps(values)]
+
+        table = 'rockfish_in_{:}'.format(index)
+        pending = self._has_uncommitted_changes()
+        sql = "SELECT name FROM sqlite_temp_master WHERE type='table'"\
+                ' AND name = ?'
+        if self.execute(sql, (table, )).fetchone() is None:
+            if pending:
+                raise ValueError('Lists with more than {:} values cannot be'
+                        ' matched without JSON1 while there are uncommitted'
+                        ' changes.'.format(MAX_IN_VALUES))
+            self.execute('CREATE TEMP TABLE {:} (value)'.format(table))
+
+        self.execute('DELETE FROM temp.{:}'.format(table))
+        self.executemany('INSERT INTO temp.{:} (value) VALUES (?)'\
+                .format(table), [(v, ) for v in values])
+        if not pending:
+            self.commit()
+
+        return 'SELECT value FROM temp.{:}'.format(table), []
+
+    def build_where(self, match_dict, valid_fields=None, key_op='AND'):
+        """
+        Build a parameterized WHERE clause from a dictionary of search terms
+
+        See :func:`build_where` for the supported search terms. Lists with
+        more than `MAX_IN_VALUES` values are matched with a subquery.
+
+        Returns
+        -------
+        sql: str
+            WHERE clause, without the WHERE keyword, or an empty string.
+        params: list
+            Parameters for the placeholders in `sql`.
+        """
+        return build_where(match_dict, valid_fields=valid_fields,
+                key_op=key_op, in_table=self._get_in_table)
@@ -0,0 +1,285 @@
+"""
+Streaming readers for SQLite tables into NumPy arrays and data frames
+"""
+import numpy as np
+import pandas as pd
+from rockfish2 import logging
+
+# declared types, or parts of types, that are read as floats
+FLOAT_TYPES = ['REAL', 'FLOA', 'DOUB', 'NUMERIC', 'DECIMAL']
+
+
+def get_numpy_dtype(sql_type, nullable=True):
+    """
+    Get the NumPy data type for a declared SQLite column type
+
+    Integer types are read as integers, or as floats if the column can
+    contain NULL, so that NULL values can be stored as NaN. REAL, FLOAT,
+    DOUBLE, NUMERIC, and DECIMAL types are read as floats. All other
+    types, including dates, times, and geometries, are read as objects.
+
+    Parameters
+    ----------
+    sql_type: str
+        Declared column type, e.g., from ``PRAGMA table_info``.
+    nullable: bool, optional
+        If `False`, the column is NOT NULL or a primary key. Default is
+        `True`.
+
+    Returns
+    -------
+    dtype: :class:`numpy.dtype`
+        NumPy data type.
+
+    Examples
+    --------
+    >>> get_numpy_dtype('INTEGER', nullable=False)
+    dtype('int64')
+    >>> get_numpy_dtype('INTEGER')
+    dtype('float64')
+    >>> get_numpy_dtype('VARCHAR(10)')
+    dtype('O')
+    >>> get_numpy_dtype('TIMESTAMP')
+    dtype('O')
+    """
+    sql_type = (sql_type or '').upper()
+    if 'INT' in sql_type:
+        return np.dtype(np.float64 if nullable else np.int64)
+    elif any([t in sql_type for t in FLOAT_TYPES]):
+        return np.dtype(np.float64)
+    else:
+        return np.dtype(object)
+
+def _with_object_field(dtype, name):
+    """
+    Returns a copy of a structured data type with one field as objects
+    """
+    return np.dtype([(n, np.dtype(object) if n == name else dtype[n])
+        for n in dtype.names])
+
+
+class TableReader(object):
+    """
+    Chunked readers for tables and views
+
+    Rows are read with :meth:`fetchmany` and converted to NumPy arrays one
+    chunk at a time, with data types derived from the declared column types
+    (see :func:`get_numpy_dtype`). Columns without a declared type, such as
+    expressions in views, are read as objects unless a data type is given.
+
+    SQLite columns can store values of any type. If values in a column
+    cannot be converted to its data type, such as blank text in a REAL
+    column, the column is read as objects instead, starting with the chunk
+    that contains those values for :meth:`iter_table`.
+    """
+    def _get_types(self, table):
+        """
+        Return dictionary of data types for fields in a table
+
+        Parameters
+        ----------
+        table: str
+            Name of table to get field data types for
+
+        Returns
+        _______
+        type_dict: dict
+            Dictionary of SQL data types indexed by field names
+        """
+        type_dict = {}
+        for row in self._get_pragma(table):
+            type_dict[row[1]] = row[2]
+        return type_dict
+
+    def get_dtype(self, table, fields=None, dtype=None):
+        """
+        Get the structured NumPy data type for rows in a table
+
+        Parameters
+        ----------
+        table: str
+            Name of the table or view.
+        fields: list, optional
+            Fields to include. Default is all fields.
+        dtype: dict, optional
+            Data types for some fields, as ``{field: dtype}``, which
+            override the declared types.
+
+        Returns
+        -------
+        dtype: :class:`numpy.dtype`
+            Structured data type with one named field for each column.
+        """
+        dtype = dtype or {}
+        if fields is None:
+            fields = self._get_fields(table)
+
+        pragma = dict([(str(row[1]), row) for row in self._get_pragma(table)])
+        dtypes = []
+        for field in fields:
+            if field in dtype:
+                dtypes.append((str(field), np.dtype(dtype[field])))
+                continue
+            if field not in pragma:
+                raise ValueError("No field '{:}' in '{:}'.".format(field,
+                    table))
+            row = pragma[field]
+            nullable = (row[3] == 0) and (row[5] == 0)
+            dtypes.append((str(field), get_numpy_dtype(row[2],
+                nullable=nullable)))
+
+        return np.dtype(dtypes)
+
+    def _select_rows(self, table, fields=None, where=None):
+        """
+        Execute a SELECT statement that returns tuples
+        """
+        if fields is None:
+            fields = self._get_fields(table)
+
+        sql = "SELECT {:} FROM '{:}'".format(', '.join(['"{:}"'.format(f)
+            for f in fields]), table)
+        if where is not None:
+            sql += ' WHERE {:}'.format(where)
+
+        cursor = self.execute(sql)
+        cursor.row_factory = None
+
+        return cursor
+
+    def _fill_rows(self, out, rows):
+        """
+        Copy rows to the start of a structured array, column by column
+
+        Returns the name of the first field with values that cannot be
+        converted to the data type of the field, or `None`.
+        """
+        for name, values in zip(out.dtype.names, zip(*rows)):
+            try:
+                out[name][:len(rows)] = values
+            except (ValueError, TypeError):
+                return name
+
+        return None
+
+    def iter_table(self, table, chunksize=10000, fields=None, where=None,
+            dtype=None, as_array=False):
+        """
+        Read rows from a table in chunks
+
+        Parameters
+        ----------
+        table: str
+            Name of the table or view.
+        chunksize: int, optional
+            Maximum number of rows in each chunk. Default is 10000.
+        fields: list, optional
+            Fields to read. Default is all fields.
+        where: str, optional
+            SQL condition for the WHERE clause.
+        dtype: dict, optional
+            Data types for some fields, as ``{field: dtype}``.
+        as_array: bool, optional
+            If `True`, yield structured NumPy arrays. Default is to yield
+            :class:`pandas.DataFrame` objects.
+
+        Yields
+        ------
+        chunk: :class:`pandas.DataFrame` or :class:`numpy.ndarray`
+            Rows in the chunk.
+        """
+        dtype = self.get_dtype(table, fields=fields, dtype=dtype)
+        cursor = self._select_rows(table, fields=dtype.names, where=where)
+
+        buf = np.empty(chunksize, dtype=dtype)
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if len(rows) == 0:
+                break
+
+            name = self._fill_rows(buf, rows)
+            while name is not None:
+                logging.debug("Reading '{:}.{:}' as objects", table, name)
+                buf = np.empty(chunksize, dtype=_with_object_field(
+                    buf.dtype, name))
+                name = self._fill_rows(buf, rows)
+            chunk = buf[:len(rows)].copy()
+            if as_array:
+                yield chunk
+            else:
+                yield pd.DataFrame(chunk)
+
+    def read_array(self, table, out=None, fields=None, where=None,
+            dtype=None, chunksize=10000):
+        """
+        Read rows from a table into a structured NumPy array
+
+        Rows are copied into the output array one chunk at a time, so that
+        memory use is bounded by the size of the output array.
+
+        Parameters
+        ----------
+        table: str
+            Name of the table or view.
+        out: :class:`numpy.ndarray`, optional
+            Preallocated structured array to fill. Fields are read by name
+            from `table`, and a :class:`ValueError` is raised if values
+            cannot be converted to the data types in `out`. Default is to
+            allocate an array after counting the rows.
+        fields: list, optional
+            Fields to read, if `out` is not given. Default is all fields.
+        where: str, optional
+            SQL condition for the WHERE clause.
+        dtype: dict, optional
+            Data types for some fields, as ``{field: dtype}``, if `out` is
+            not given.
+        chunksize: int, optional
+            Number of rows to fetch at a time. Default is 10000.
+
+        Returns
+        -------
+        data: :class:`numpy.ndarray`
+            Structured array with one field for each column.
+        """
+        allocated = out is None
+        if allocated:
+            sql = "SELECT COUNT(*) FROM '{:}'".format(table)
+            if where is not None:
+                sql += ' WHERE {:}'.format(where)
+            nrows = self.execute(sql).fetchone()[0]
+            out = np.empty(nrows, dtype=self.get_dtype(table,
+                fields=fields, dtype=dtype))
+
+        logging.debug("Reading {:} rows from '{:}'", len(out), table)
+        cursor = self._select_rows(table, fields=out.dtype.names,
+                where=where)
+
+        i0 = 0
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if len(rows) == 0:
+                break
+            if i0 + len(rows) > len(out):
+                raise ValueError('out has fewer rows ({:}) than {:}.'\
+                        .format(len(out), table))
+
+            name = self._fill_rows(out[i0:], rows)
+            while name is not None:
+                if not allocated:
+                    raise ValueError("Values in '{:}.{:}' cannot be"
+                            " converted to {:}.".format(table, name,
+                                out.dtype[name]))
+                logging.debug("Reading '{:}.{:}' as objects", table, name)
+                _out = np.empty(len(out), dtype=_with_object_field(
+                    out.dtype, name))
+                for _name in out.dtype.names:
+                    _out[_name][:i0] = out[_name][:i0]
+                out = _out
+                name = self._fill_rows(out[i0:], rows)
+            i0 += len(rows)
+
+        if i0 < len(out):
+            raise ValueError('out has more rows ({:}) than {:} ({:}).'\
+                    .format(len(out), table, i0))
+
+        return out
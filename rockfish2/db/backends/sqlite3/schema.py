@@ -0,0 +1,149 @@
+"""
+Schema metadata cache for SQLite connections
+"""
+import re
+
+# statements that may change the schema
+DDL_PATTERN = re.compile(r'^\s*(CREATE|DROP|ALTER|ATTACH|DETACH|ROLLBACK)\b'
+        r'|\b(AddGeometryColumn|RecoverGeometryColumn|DiscardGeometryColumn'
+        r'|CreateSpatialIndex|DisableSpatialIndex|InitSpatialMetadata)\s*\(',
+        re.IGNORECASE)
+
+
+def is_ddl(sql):
+    """
+    Returns `True` if a SQL statement may change the database schema
+
+    Examples
+    --------
+    >>> is_ddl('CREATE TABLE test (a INTEGER)')
+    True
+    >>> is_ddl("SELECT addGeometryColumn('test', 'geom', -1, 'POINT', 'XY')")
+    True
+    >>> is_ddl('SELECT * FROM test')
+    False
+    """
+    return DDL_PATTERN.search(sql) is not None
+
+
+class SchemaCache(object):
+    """
+    Cache of schema metadata for a database connection
+
+    Results of ``PRAGMA table_info`` and lists of tables and views are
+    cached for each connection. The cache is cleared when a statement that
+    may change the schema is executed through the connection (see
+    :func:`is_ddl`), and when ``PRAGMA schema_version`` changes, e.g.,
+    because another connection changed the schema.
+
+    Classes using this mixin must call :meth:`_check_ddl` for each
+    statement they execute.
+
+    Pragmas are read with ``SELECT`` where SQLite supports it (3.16 and
+    later), because the sqlite3 module in Python 2 commits any open
+    transaction before executing a ``PRAGMA`` statement.
+    """
+    def _has_pragma_functions(self):
+        """
+        Returns `True` if pragmas can be read as table-valued functions
+        """
+        if '_pragma_functions' not in self.__dict__:
+            version = self.execute('SELECT sqlite_version()').fetchone()[0]
+            version = tuple([int(v) for v in version.split('.')[:3]])
+            self.__dict__['_pragma_functions'] = version >= (3, 16, 0)
+
+        return self.__dict__['_pragma_functions']
+
+    def _read_pragma(self, pragma, arg=None):
+        """
+        Returns a cursor with the result of a pragma
+
+        Parameters
+        ----------
+        pragma: str
+            Name of the pragma, e.g., ``'table_info'``.
+        arg: str, optional
+            Argument to the pragma, e.g., a table name.
+        """
+        if self._has_pragma_functions():
+            sql = 'SELECT * FROM pragma_{:}'.format(pragma)
+            if arg is None:
+                return self.execute(sql)
+            return self.execute(sql + '(?)', (arg, ))
+
+        if arg is None:
+            return self.execute('PRAGMA {:}'.format(pragma))
+        return self.execute('PRAGMA {:}({:})'.format(pragma, arg))
+
+    def clear_schema_cache(self):
+        """
+        Clear cached schema metadata
+        """
+        self.__dict__['_schema_cache'] = {}
+        self.__dict__['_schema_version'] = None
+
+    def _check_ddl(self, sql):
+        """
+        Clear the schema cache if a statement may have changed the schema
+        """
+        if isinstance(sql, basestring) and is_ddl(sql):
+            self.clear_schema_cache()
+
+    def _get_schema_version(self):
+        """
+        Returns the schema version of the main database
+        """
+        return self._read_pragma('schema_version').fetchone()[0]
+
+    def _get_cached_schema(self, key, func):
+        """
+        Returns a cached schema value, calling `func` to get it if needed
+        """
+        if '_schema_cache' not in self.__dict__:
+            self.clear_schema_cache()
+
+        version = self._get_schema_version()
+        if version != self.__dict__['_schema_version']:
+            self.__dict__['_schema_cache'] = {}
+            self.__dict__['_schema_version'] = version
+
+        cache = self.__dict__['_schema_cache']
+        if key not in cache:
+            cache[key] = func()
+
+        return cache[key]
+
+    def _get_pragma(self, table):
+        """
+        Return the SQLite PRAGMA information.
+
+        Parameters
+        ----------
+        table: str
+            Name of table to get PRAGMA for.
+
+        Returns
+        -------
+        pragma: list
+            Result of pragma query, as a list of tuples
+        """
+        return self._get_cached_schema(('pragma', table),
+                lambda: [tuple(row) for row in
+                    self._read_pragma('table_info', table).fetchall()])
+
+    def _get_master_names(self, type):
+        """
+        Returns cached names of items of a type in sqlite_master
+        """
+        sql = "SELECT name FROM sqlite_master WHERE type='{:}'".format(type)
+        return list(self._get_cached_schema(('master', type),
+            lambda: [d[0] for d in self.execute(sql)]))
+
+    def executescript(self, *args):
+        """
+        Executes multiple SQL statements.
+        """
+        try:
+            return super(SchemaCache, self).executescript(*args)
+        finally:
+            self.clear_schema_cache()
@@ -0,0 +1,256 @@
+"""
+Maintained row counts and column statistics for SQLite tables
+"""
+from rockfish2 import logging
+
+# tables for maintained statistics
+TABLE_STATS = 'rockfish_table_stats'
+COLUMN_STATS = 'rockfish_column_stats'
+
+# prefix for the names of triggers that maintain statistics
+TRIGGER_PREFIX = 'rockfish_stats_'
+
+
+class TableStats(object):
+    """
+    Row counts and column minimums and maximums kept current by triggers
+
+    Statistics are opt-in for each table (see :meth:`track_stats`). Row
+    counts are updated for each inserted or deleted row. Column minimums
+    and maximums are extended as rows are added, and are recomputed on the
+    next call to :meth:`stats` if a row with a minimum or maximum value is
+    deleted or updated.
+
+    SQLite only fires DELETE triggers for rows replaced by ``INSERT OR
+    REPLACE`` if ``PRAGMA recursive_triggers`` is on. It is turned on for
+    connections that call :meth:`track_stats`; other connections that
+    replace rows in tracked tables must also turn it on.
+    """
+    def _get_stats_triggers(self, table):
+        """
+        Returns names of the triggers that maintain statistics for a table
+        """
+        return [TRIGGER_PREFIX + '{:}_{:}'.format(table, action)
+                for action in ['insert', 'delete', 'update']]
+
+    def _is_tracked(self, table):
+        """
+        Returns `True` if statistics are maintained for a table
+
+        Triggers are dropped with their table, so a table that was dropped
+        and created again is not tracked.
+        """
+        if TABLE_STATS not in self.tables:
+            return False
+
+        trigger = self._get_stats_triggers(table)[0]
+
+        return trigger in self._get_master_names('trigger')
+
+    def _create_tables_stats(self):
+
+        self.execute("""CREATE TABLE IF NOT EXISTS {:} (
+            tbl TEXT NOT NULL,
+            nrows INTEGER NOT NULL,
+            PRIMARY KEY (tbl))""".format(TABLE_STATS))
+
+        self.execute("""CREATE TABLE IF NOT EXISTS {:} (
+            tbl TEXT NOT NULL,
+            field TEXT NOT NULL,
+            min,
+            max,
+            valid INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (tbl, field))""".format(COLUMN_STATS))
+
+    def track_stats(self, table, fields=None):
+        """
+        Maintain the row count and column statistics for a table
+
+        Current statistics are computed once, and are then kept current by
+        triggers on the table.
+
+        Parameters
+        ----------
+        table: str
+            Name of the table.
+        fields: list, optional
+            Fields to maintain minimum and maximum values for. Default is
+            to only maintain the row count.
+        """
+        fields = fields or []
+        self.untrack_stats(table)
+        self._create_tables_stats()
+        self.execute('PRAGMA recursive_triggers = ON')
+
+        logging.debug("Computing statistics for '{:}'", table)
+        nrows = self.execute("SELECT COUNT(*) FROM '{:}'".format(table))\
+                .fetchone()[0]
+        self.execute('INSERT INTO {:} (tbl, nrows) VALUES (?, ?)'\
+                .format(TABLE_STATS), (table, nrows))
+        for field in fields:
+            sql = """INSERT INTO {:} (tbl, field, min, max)
+                SELECT ?, ?, MIN("{:}"), MAX("{:}") FROM '{:}'"""\
+                        .format(COLUMN_STATS, field, field, table)
+            self.execute(sql, (table, field))
+
+        insert, delete, update = self._get_stats_triggers(table)
+        new = ['UPDATE {:} SET nrows = nrows + 1'
+                " WHERE tbl = '{:}';".format(TABLE_STATS, table)]
+        old = ['UPDATE {:} SET nrows = nrows - 1'
+                " WHERE tbl = '{:}';".format(TABLE_STATS, table)]
+        for field in fields:
+            new.append("""UPDATE {:} SET
+                min = CASE WHEN (min IS NULL) OR (NEW."{f}" < min)
+                    THEN NEW."{f}" ELSE min END,
+                max = CASE WHEN (max IS NULL) OR (NEW."{f}" > max)
+                    THEN NEW."{f}" ELSE max END
+                WHERE tbl = '{:}' AND field = '{f}'
+                AND NEW."{f}" IS NOT NULL;""".format(COLUMN_STATS, table,
+                    f=field))
+            old.append("""UPDATE {:} SET valid = 0
+                WHERE tbl = '{:}' AND field = '{f}'
+                AND (OLD."{f}" <= min OR OLD."{f}" >= max);"""\
+                        .format(COLUMN_STATS, table, f=field))
+
+        sql = """CREATE TRIGGER "{:}" AFTER INSERT ON '{:}'
+            BEGIN {:} END"""
+        self.execute(sql.format(insert, table, '\n'.join(new)))
+        sql = """CREATE TRIGGER "{:}" AFTER DELETE ON '{:}'
+            BEGIN {:} END"""
+        self.execute(sql.format(delete, table, '\n'.join(old)))
+        if len(fields) > 0:
+            sql = """CREATE TRIGGER "{:}" AFTER UPDATE OF {:} ON '{:}'
+                BEGIN {:} END"""
+            self.execute(sql.format(update,
+                ', '.join(['"{:}"'.format(f) for f in fields]), table,
+                '\n'.join(old[1:] + new[1:])))
+
+        self.commit()
+
+    def untrack_stats(self, table):
+        """
+        Stop maintaining statistics for a table
+
+        Parameters
+        ----------
+        table: str
+            Name of the table.
+        """
+        for trigger in self._get_stats_triggers(table):
+            self.execute('DROP TRIGGER IF EXISTS "{:}"'.format(trigger))
+
+        if TABLE_STATS in self.tables:
+            for stats_table in [TABLE_STATS, COLUMN_STATS]:
+                self.execute('DELETE FROM {:} WHERE tbl = ?'\
+                        .format(stats_table), (table, ))
+
+    def _get_maintained_count(self, table):
+        """
+        Returns the maintained row count for a table, or `None`
+        """
+        if not self._is_tracked(table):
+            return None
+
+        row = self.execute('SELECT nrows FROM {:} WHERE tbl = ?'\
+                .format(TABLE_STATS), (table, )).fetchone()
+
+        return None if row is None else row[0]
+
+    def stats(self, table, fields=None):
+        """
+        Get the row count and column minimums and maximums for a table
+
+        Maintained statistics are used for tracked tables (see
+        :meth:`track_stats`). Otherwise, statistics are computed. Minimums
+        and maximums that are recomputed for tracked tables are stored,
+        and are committed unless this connection has uncommitted changes.
+
+        Parameters
+        ----------
+        table: str
+            Name of the table or view.
+        fields: list, optional
+            Fields to get minimums and maximums for. Default is the fields
+            that are maintained for tracked tables, and no fields for other
+            tables.
+
+        Returns
+        -------
+        stats: dict
+            Dictionary with the row count as ``'count'``, and dictionaries
+            of minimum and maximum values for each field as ``'min'`` and
+            ``'max'``.
+        """
+        maintained = {}
+        refreshed = False
+        count = self._get_maintained_count(table)
+        if count is not None:
+            pending = self._has_uncommitted_changes()
+            sql = 'SELECT field, min, max, valid FROM {:} WHERE tbl = ?'\
+                    .format(COLUMN_STATS)
+            for field, _min, _max, valid in self.execute(sql,
+                    (table, )).fetchall():
+                field = str(field)
+                if not valid:
+                    sql = 'SELECT MIN("{:}"), MAX("{:}") FROM \'{:}\''\
+                            .format(field, field, table)
+                    _min, _max = self.execute(sql).fetchone()
+                    sql = """UPDATE {:} SET min = ?, max = ?, valid = 1
+                        WHERE tbl = ? AND field = ?""".format(COLUMN_STATS)
+                    self.execute(sql, (_min, _max, table, field))
+                    refreshed = True
+                maintained[field] = (_min, _max)
+
+            # release the write lock, unless joining an open transaction
+            if refreshed and not pending:
+                self.commit()
+        else:
+            count = self.execute("SELECT COUNT(*) FROM '{:}'".format(table))\
+                    .fetchone()[0]
+
+        if fields is None:
+            fields = sorted(maintained)
+
+        stats = {'count': count, 'min': {}, 'max': {}}
+        for field in fields:
+            if field in maintained:
+                _min, _max = maintained[field]
+            else:
+                sql = 'SELECT MIN("{:}"), MAX("{:}") FROM \'{:}\''\
+                        .format(field, field, table)
+                _min, _max = self.execute(sql).fetchone()
+            stats['min'][field] = _min
+            stats['max'][field] = _max
+
+        return stats
+
+    def analyze(self, tables=None, limit=None):
+        """
+        Refresh the statistics used by the SQLite query planner
+
+        Runs ``ANALYZE``, which stores statistics in ``sqlite_stat1``. All
+        refreshes should go through this method.
+
+        Parameters
+        ----------
+        tables: list, optional
+            Tables or indices to analyze. Default is the whole database.
+        limit: int, optional
+            Approximate number of rows to scan in each index (``PRAGMA
+            analysis_limit``, SQLite 3.32 and later). Default is to scan
+            all rows.
+        """
+        if limit is not None:
+            self.execute('PRAGMA analysis_limit = {:d}'.format(limit))
+
+        try:
+            if tables is None:
+                self.execute('ANALYZE')
+            else:
+                for table in tables:
+                    self.execute('ANALYZE "{:}"'.format(table))
+        finally:
+            if limit is not None:
+                self.execute('PRAGMA analysis_limit = 0')
+
+        self.commit()
@@ -0,0 +1,132 @@
+"""
+Test suite for the sqlite3.cache module
+"""
+import os
+import doctest
+import shutil
+import tempfile
+import unittest
+from rockfish2.db.backends.sqlite3 import cache
+from rockfish2.db.backends.sqlite3.connection import Connection
+
+
+class cacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpdir)
+
+    def get_db(self, database=':memory:', nrows=100):
+
+        db = Connection(database)
+        db.execute('CREATE TABLE test (id INTEGER, x REAL)')
+        db.executemany('INSERT INTO test VALUES (?, ?)',
+                [(i, 0.5 * i) for i in range(nrows)])
+        db.commit()
+
+        return db
+
+    def test_cache_hit(self):
+        """
+        Should return cached results for repeated reads
+        """
+        db = self.get_db()
+        self.assertEqual(db.result_cache, None)
+        rc = db.enable_result_cache()
+
+        dat0 = db.read_sql('SELECT * FROM test WHERE id < ?', params=(10, ))
+        dat1 = db.read_sql('SELECT *  FROM test\n WHERE id < ?',
+                params=(10, ))
+        self.assertEqual((rc.hits, rc.misses), (1, 1))
+        self.assertTrue(dat0.equals(dat1))
+
+        # returned frames are copies
+        dat1['x'] = 0
+        self.assertEqual(db.read_sql('SELECT * FROM test WHERE id < ?',
+            params=(10, ))['x'].sum(), 22.5)
+
+        db.read_sql('SELECT * FROM test WHERE id < ?', params=(20, ))
+        self.assertEqual(rc.misses, 2)
+
+        self.assertEqual(len(db.read_table('test')), 100)
+        self.assertEqual(len(db.read_table('test')), 100)
+        self.assertEqual(rc.hits, 3)
+
+        db.disable_result_cache()
+        self.assertEqual(db.result_cache, None)
+        self.assertEqual(len(db.read_table('test')), 100)
+
+    def test_invalidate(self):
+        """
+        Should not return stale results after writes
+        """
+        db = self.get_db()
+        db.enable_result_cache()
+        self.assertEqual(len(db.read_table('test')), 100)
+
+        # uncommitted changes
+        sql = 'SELECT * FROM test'
+        self.assertEqual(len(db.read_sql(sql)), 100)
+        db.execute('INSERT INTO test VALUES (100, 50.)')
+        self.assertEqual(len(db.read_sql(sql)), 101)
+        db.rollback()
+        self.assertEqual(len(db.read_sql(sql)), 100)
+
+        db.execute('DELETE FROM test WHERE id < 10')
+        db.commit()
+        self.assertEqual(len(db.read_table('test')), 90)
+
+        db.execute('ALTER TABLE test ADD COLUMN y REAL')
+        self.assertEqual(list(db.read_table('test').columns),
+                ['id', 'x', 'y'])
+
+        # commits by other connections
+        filename = os.path.join(self.tmpdir, 'test.sqlite')
+        db = self.get_db(filename)
+        db.enable_result_cache()
+        self.assertEqual(len(db.read_table('test')), 100)
+        other = Connection(filename)
+        other.execute('DELETE FROM test WHERE id >= 50')
+        other.commit()
+        self.assertEqual(len(db.read_table('test')), 50)
+
+    def test_limit(self):
+        """
+        Should evict least-recently-used results, and spill them to disk
+        """
+        db = self.get_db()
+        sql = 'SELECT * FROM test WHERE id < {:}'
+        nbytes = db.read_sql(sql.format(100)).memory_usage(deep=True).sum()
+
+        rc = db.enable_result_cache(max_bytes=2 * nbytes)
+        for i in [100, 100, 99, 98, 100]:
+            db.read_sql(sql.format(i))
+        self.assertEqual((rc.hits, rc.misses), (1, 4))
+        self.assertTrue(rc.nbytes <= rc.max_bytes)
+
+        spill_dir = os.path.join(self.tmpdir, 'cache')
+        rc = db.enable_result_cache(max_bytes=nbytes, spill_dir=spill_dir)
+        for i in [100, 99, 100, 99]:
+            dat = db.read_sql(sql.format(i))
+        self.assertEqual((rc.hits, rc.misses), (2, 2))
+        self.assertEqual(len(dat), 99)
+        self.assertEqual(len(os.listdir(spill_dir)), 1)
+
+        db.execute('DELETE FROM test')
+        db.commit()
+        self.assertEqual(len(db.read_sql(sql.format(100))), 0)
+        self.assertEqual(os.listdir(spill_dir), [])
+
+
+def suite():
+    testSuite = unittest.makeSuite(cacheTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(cache))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -2,9 +2,13 @@
 Tests for the sqlite3.connection module
 """
 import os
+import json
 import doctest
 import unittest
-from rockfish2.db.backends.sqlite3 import connection
+import numpy as np
+import pandas as pd
+import logbook
+from rockfish2.db.backends.sqlite3 import connection, schema, instrument
 
 
 class baseTestCase(unittest.TestCase):
@@ -52,6 +56,23 @@ class baseTestCase(unittest.TestCase):
         else:
             self.assertRaises(db.ConfigurationError, db.init_spatialite)
 
+    def test_filename(self):
+        """
+        Should return the path to the database file
+        """
+        # should be empty for a db in memory
+        db = connection.Connection()
+        self.assertEqual(db.filename, '')
+
+        dbfile = 'temp.db'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        db = connection.Connection(database=dbfile)
+        self.assertEqual(db.filename, os.path.abspath(dbfile))
+
+        os.remove(dbfile)
+
     def test_tables(self):
         """
         Should return list of tables
@@ -68,9 +89,237 @@ class baseTestCase(unittest.TestCase):
         db = connection.Connection()
         self.assertEqual(len(db.views), 0)
 
+    def test_spatial_template(self):
+        """
+        Should build a spatial metadata template and copy it to new
+        databases
+        """
+        template = 'temp_template.sqlite'
+        dbfile = 'temp.db'
+        for f in [template, dbfile]:
+            if os.path.isfile(f):
+                os.remove(f)
+
+        # should build template from the resource file
+        connection.build_spatial_template(template)
+        self.assertTrue(os.path.isfile(template))
+        db = connection.Connection(database=template)
+        nsrs = db.count('spatial_ref_sys')
+        self.assertTrue(nsrs > 1000)
+        db.close()
+
+        # should copy template to a new file
+        connection.copy_spatial_template(dbfile, template=template)
+        db = connection.Connection(database=dbfile)
+        self.assertEqual(db.count('spatial_ref_sys'), nsrs)
+        db.close()
+        self.assertRaises(ValueError, connection.copy_spatial_template,
+                dbfile, template=template)
+        os.remove(dbfile)
+
+        # should copy only some SRIDs into a database in memory
+        db = connection.Connection()
+        db._copy_spatial_template(template=template, srids=[4326])
+        sql = 'SELECT srid FROM spatial_ref_sys ORDER BY srid'
+        self.assertEqual([d[0] for d in db.execute(sql)], [-1, 0, 4326])
+        for table in ['geometry_columns', 'views_geometry_columns']:
+            self.assertTrue(table in db.tables)
+
+        os.remove(template)
+
+    def test_schema_cache(self):
+        """
+        Should cache schema metadata until the schema changes
+        """
+        dbfile = 'temp.db'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        db = connection.Connection(database=dbfile)
+        db.execute('CREATE TABLE test (a INTEGER NOT NULL, b REAL)')
+        self.assertEqual(db.tables, ['test'])
+        self.assertEqual(db._get_fields('test'), ['a', 'b'])
+        self.assertEqual(db._get_required_fields('test'), ['a'])
+
+        # should reuse cached values
+        self.assertTrue(db._get_pragma('test') is db._get_pragma('test'))
+
+        # should update after DDL through the connection
+        db.execute('ALTER TABLE test ADD COLUMN c TEXT')
+        self.assertEqual(db._get_fields('test'), ['a', 'b', 'c'])
+        db.execute('CREATE TEMP TABLE temp_test (d INTEGER)')
+        self.assertEqual(db._get_fields('temp_test'), ['d'])
+        db.executescript('CREATE VIEW test_view AS SELECT a FROM test;')
+        self.assertEqual(db.views, ['test_view'])
+        db.commit()
+
+        # should update after changes from another connection
+        db1 = connection.Connection(database=dbfile)
+        db1.execute('CREATE TABLE test1 (e INTEGER)')
+        db1.commit()
+        db1.close()
+        self.assertEqual(sorted(db.tables), ['test', 'test1'])
+
+        # should not commit an open transaction
+        db.execute('INSERT INTO test (a) VALUES (1)')
+        db.clear_schema_cache()
+        self.assertEqual(db._get_fields('test'), ['a', 'b', 'c'])
+        db.rollback()
+        self.assertEqual(db.count('test'), 0)
+
+        db.close()
+        os.remove(dbfile)
+
+    def test_sql_stats(self):
+        """
+        Should record statistics for statement templates when enabled
+        """
+        db = connection.Connection()
+        self.assertEqual(db.sql_stats, None)
+        db.execute('CREATE TABLE test (a INTEGER, b TEXT)')
+
+        stats = db.enable_sql_stats(slow_query_time=0.)
+        for i in range(3):
+            db.execute("INSERT INTO test (a, b) VALUES ({:}, 'x')".format(i))
+        db.executemany('INSERT INTO test (a, b) VALUES (?, ?)',
+                [(3, 'y'), (4, 'z')])
+        db.execute('SELECT * FROM test').fetchall()
+
+        records = dict([(r['template'], r) for r in stats.to_records()])
+        r = records["INSERT INTO test (a, b) VALUES (?, ?)"]
+        self.assertEqual(r['count'], 4)
+        self.assertEqual(r['rows'], 5)
+        self.assertTrue(r['max_time'] <= r['total_time'])
+        self.assertEqual(records['SELECT * FROM test']['rows'], 0)
+
+        # export
+        self.assertEqual(len(json.loads(stats.to_json())), 2)
+        csvfile = 'temp.csv'
+        stats.to_csv(csvfile)
+        self.assertEqual(len(open(csvfile).readlines()), 3)
+        os.remove(csvfile)
+
+        # should stop recording when disabled
+        self.assertTrue(db.disable_sql_stats() is stats)
+        db.execute('SELECT * FROM test')
+        self.assertEqual(len(stats.stats), 2)
+
+    def test_log_sql(self):
+        """
+        Should log statements only if a handler emits debug messages
+        """
+        db = connection.Connection()
+        for level, nrecords in [(logbook.DEBUG, 1), (logbook.INFO, 0)]:
+            with logbook.TestHandler(level=level) as handler:
+                self.assertEqual(instrument.debug_enabled(), nrecords > 0)
+                db.execute('SELECT 1')
+            self.assertEqual(len(handler.records), nrecords)
+
+        # should not log through a black hole handler
+        with logbook.TestHandler(level=logbook.DEBUG) as handler:
+            with logbook.NullHandler():
+                self.assertFalse(instrument.debug_enabled())
+                db.execute('SELECT 1')
+        self.assertEqual(len(handler.records), 0)
+
+    def test_insert_many(self):
+        """
+        Should add rows from arrays, data frames, and iterators
+        """
+        db = connection.Connection()
+        db.execute("""CREATE TABLE test (a INTEGER PRIMARY KEY, b REAL,
+            c TEXT)""")
+
+        # data frame, in chunks
+        dat = pd.DataFrame({'a': np.arange(5), 'b': [0., 1., np.nan, 3., 4.],
+            'c': list('abcde')})
+        self.assertEqual(db.insert_many('test', dat, chunk=2), 5)
+        self.assertEqual(db.count('test'), 5)
+        self.assertEqual(db.execute('SELECT b FROM test WHERE a=2')\
+                .fetchone()[0], None)
+        self.assertEqual(db.execute('SELECT c FROM test WHERE a=4')\
+                .fetchone()[0], 'e')
+
+        # dictionary of arrays, replacing existing rows
+        n = db.insert_many('test', {'a': np.array([4, 5], dtype=np.int32),
+            'b': np.array([40., 50.], dtype=np.float32)},
+            on_conflict='replace')
+        self.assertEqual(n, 2)
+        self.assertEqual(db.count('test'), 6)
+        self.assertEqual(db.execute('SELECT b FROM test WHERE a=4')\
+                .fetchone()[0], 40.)
+
+        # list of arrays, ignoring conflicts
+        db.insert_many('test', [[5, 6], ['x', 'y']], columns=['a', 'c'],
+                on_conflict='ignore')
+        self.assertEqual(db.count('test'), 7)
+
+        # iterator of rows
+        rows = ((i, str(i)) for i in range(10, 25))
+        self.assertEqual(db.insert_many('test', rows, columns=['a', 'c'],
+            chunk=4), 15)
+        self.assertEqual(db.count('test'), 22)
+
+        # should roll back all chunks on errors
+        with self.assertRaises(connection.DatabaseIntegrityError):
+            db.insert_many('test', [[100, 101, 101]], columns=['a'],
+                    chunk=1)
+        self.assertEqual(db.count('test'), 22)
+
+        with self.assertRaises(ValueError):
+            db.insert_many('test', [[1]], columns=['a'], on_conflict='skip')
+
+    def test_persist(self):
+        """
+        Should build databases in memory and write them to files
+        """
+        dbfile = 'temp.db'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        db = connection.Connection(database=dbfile, in_memory=True)
+        self.assertEqual(db.persist_filename, dbfile)
+        self.assertEqual(db.filename, '')
+        db.execute('CREATE TABLE test (a INTEGER, b TEXT)')
+        db.insert_many('test', [range(1000), ['x' * 100] * 1000],
+                columns=['a', 'b'])
+        self.assertFalse(os.path.isfile(dbfile))
+
+        progress = []
+        self.assertEqual(db.persist(progress=progress.append,
+            interval=100), dbfile)
+        self.assertEqual(progress[-1], 1.)
+        self.assertEqual(progress, sorted(progress))
+
+        # should replace its own file
+        db.execute('DELETE FROM test WHERE a >= 10')
+        db.persist()
+        db.close()
+
+        db = connection.Connection(database=dbfile, in_memory=True)
+        self.assertEqual(db.persist_filename, None)
+        self.assertEqual(db.count('test'), 10)
+        with self.assertRaises(ValueError):
+            db.persist()
+        with self.assertRaises(ValueError):
+            db.persist(dbfile)
+        db.close()
+        os.remove(dbfile)
+
+        # should build on the disk if the database is too big
+        db = connection.Connection(database=dbfile, in_memory=True,
+                memory_budget=1e6, estimated_size=2e6)
+        self.assertEqual(db.persist_filename, None)
+        self.assertTrue(db.filename.endswith(dbfile))
+        db.close()
+        os.remove(dbfile)
+
 
 def suite():
     testSuite = unittest.makeSuite(baseTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(schema))
+    testSuite.addTest(doctest.DocTestSuite(instrument))
+    testSuite.addTest(doctest.DocTestSuite(connection))
 
     return testSuite
 
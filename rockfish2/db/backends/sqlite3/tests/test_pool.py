@@ -0,0 +1,127 @@
+"""
+Test suite for the sqlite3.pool module
+"""
+import os
+import doctest
+import unittest
+import threading
+from rockfish2.db.backends.sqlite3 import pool
+from rockfish2.db.backends.sqlite3.connection import DatabaseError
+
+
+def _remove(dbfile):
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.isfile(dbfile + suffix):
+            os.remove(dbfile + suffix)
+
+
+class poolTestCase(unittest.TestCase):
+
+    def test_init(self):
+        """
+        Should open a database in WAL mode with read-only connections
+        """
+        dbfile = 'temp.db'
+        _remove(dbfile)
+
+        with self.assertRaises(ValueError):
+            pool.ConnectionPool(':memory:')
+
+        _pool = pool.ConnectionPool(dbfile, readers=2)
+        self.assertEqual(len(_pool.readers), 2)
+        mode = _pool.writer.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+        with _pool.read() as db:
+            with self.assertRaises(DatabaseError):
+                db.execute('CREATE TABLE test (a INTEGER)')
+
+        _pool.close()
+        _remove(dbfile)
+
+    def test_checkout(self):
+        """
+        Should hand out one read-only connection per thread
+        """
+        dbfile = 'temp.db'
+        _remove(dbfile)
+
+        _pool = pool.ConnectionPool(dbfile, readers=1, timeout=0.01)
+
+        # nested checkouts should share a connection
+        with _pool.read() as db0:
+            with _pool.read() as db1:
+                self.assertTrue(db0 is db1)
+
+            # other threads should wait for the connection
+            errors = []
+            def _read():
+                try:
+                    _pool.reader()
+                except DatabaseError as e:
+                    errors.append(e)
+            thread = threading.Thread(target=_read)
+            thread.start()
+            thread.join()
+            self.assertEqual(len(errors), 1)
+
+        with self.assertRaises(DatabaseError):
+            _pool.release()
+
+        _pool.close()
+        _remove(dbfile)
+
+    def test_concurrent_read_write(self):
+        """
+        Readers should see committed data while the writer is writing
+        """
+        dbfile = 'temp.db'
+        _remove(dbfile)
+
+        _pool = pool.ConnectionPool(dbfile, readers=3)
+        with _pool.write() as db:
+            db.execute('CREATE TABLE test (a INTEGER)')
+            db.executemany('INSERT INTO test VALUES (?)',
+                    [(i, ) for i in range(10)])
+
+        # leave a write transaction open
+        _pool.writer.execute('INSERT INTO test VALUES (10)')
+
+        counts = []
+        def _count():
+            with _pool.read() as db:
+                sql = 'SELECT COUNT(*) FROM test'
+                counts.append(db.execute(sql).fetchone()[0])
+
+        threads = [threading.Thread(target=_count) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counts, [10] * 6)
+
+        _pool.writer.commit()
+        with _pool.read() as db:
+            sql = 'SELECT COUNT(*) FROM test'
+            self.assertEqual(db.execute(sql).fetchone()[0], 11)
+
+        # should roll back failed writes
+        with self.assertRaises(DatabaseError):
+            with _pool.write() as db:
+                db.execute('INSERT INTO test VALUES (11)')
+                db.execute('INSERT INTO missing VALUES (1)')
+        sql = 'SELECT COUNT(*) FROM test'
+        self.assertEqual(_pool.writer.execute(sql).fetchone()[0], 11)
+
+        _pool.close()
+        _remove(dbfile)
+
+
+def suite():
+    testSuite = unittest.makeSuite(poolTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(pool))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
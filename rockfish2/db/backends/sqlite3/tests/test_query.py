@@ -0,0 +1,100 @@
+"""
+Test suite for the sqlite3.query module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.db.backends.sqlite3 import query
+from rockfish2.db.backends.sqlite3.connection import Connection,\
+        DatabaseOperationalError
+
+
+class queryTestCase(unittest.TestCase):
+
+    def get_db(self, nrows=1000):
+
+        db = Connection()
+        db.execute('CREATE TABLE test (id INTEGER, sta TEXT, x REAL)')
+        db.executemany('INSERT INTO test VALUES (?, ?, ?)',
+                [(i, 'S{:}'.format(i % 10), 0.5 * i) for i in range(nrows)])
+
+        return db
+
+    def test_build_where(self):
+        """
+        Should build parameterized clauses with bounded templates
+        """
+        sql0, params0 = query.build_where({'id': np.arange(5)})
+        sql1, params1 = query.build_where({'id': [7, 8, 9, 10, 11, 12]})
+        self.assertEqual(sql0, sql1)
+        self.assertEqual(len(params0), 8)
+        self.assertEqual(params0[-3:], [4, 4, 4])
+
+        sql, params = query.build_where({'sta': ('like', 'S1%'),
+            'id': ('!=', None)})
+        self.assertEqual(sql, '"id" IS NOT NULL AND "sta" LIKE ?')
+
+        self.assertEqual(query.build_where({'id': []})[0], '0')
+
+        with self.assertRaises(ValueError):
+            query.build_where({'id': ('; DROP TABLE test', 1)})
+        with self.assertRaises(ValueError):
+            query.build_where({'id': ('>', [1, 2])})
+        with self.assertRaises(ValueError):
+            query.build_where({'id': range(query.MAX_IN_VALUES + 1)})
+
+        nmax = query.MAX_TEMPLATES
+        for i in range(nmax + 10):
+            query.build_where({'field{:}'.format(i): 1})
+        self.assertEqual(len(query._TEMPLATES), nmax)
+
+    def test_count(self):
+        """
+        Should count rows with parameterized search terms
+        """
+        db = self.get_db()
+        self.assertEqual(db.count('test'), 1000)
+        self.assertEqual(db.count('test', sta='S1'), 100)
+        self.assertEqual(db.count('test', sta=['S1', 'S2', "S3' OR 1"]), 200)
+        self.assertEqual(db.count('test', x=('BETWEEN', (1, 5))), 9)
+
+        # should not compare misspelled fields as string literals
+        with self.assertRaises(DatabaseOperationalError):
+            db.count('test', sat='sat')
+        self.assertEqual(db.count('test', STA='S1'), 100)
+
+    def test_long_lists(self):
+        """
+        Should match long lists of values through a subquery
+        """
+        db = self.get_db()
+        ids = range(0, 1000, 2)
+        self.assertTrue(len(ids) > query.MAX_IN_VALUES)
+        self.assertEqual(db.count('test', id=ids), 500)
+        self.assertEqual(db.count('test', id=('NOT IN', ids),
+            sta=['S1', 'S3']), 200)
+
+        # without JSON1, should use temporary tables
+        db.__dict__['_json1'] = False
+        with self.assertRaises(ValueError):
+            db.count('test', id=ids)
+        db.commit()
+        self.assertEqual(db.count('test', id=ids, x=('NOT IN', ids)), 250)
+        self.assertEqual(db.execute("SELECT COUNT(*) FROM temp.rockfish_in_1")\
+                .fetchone()[0], 500)
+
+        # should not commit an open transaction
+        db.execute('DELETE FROM test WHERE id < 100')
+        self.assertEqual(db.count('test', id=ids), 450)
+        db.rollback()
+        self.assertEqual(db.count('test', id=ids), 500)
+
+
+def suite():
+    testSuite = unittest.makeSuite(queryTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(query))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
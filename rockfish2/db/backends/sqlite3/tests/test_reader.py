@@ -0,0 +1,128 @@
+"""
+Test suite for the sqlite3.reader module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.db.backends.sqlite3 import reader
+from rockfish2.db.backends.sqlite3.connection import Connection
+
+
+class readerTestCase(unittest.TestCase):
+
+    def get_db(self, nrows=25):
+
+        db = Connection()
+        db.execute("""CREATE TABLE test (id INTEGER PRIMARY KEY,
+            n INTEGER NOT NULL, m INTEGER, x REAL, name TEXT)""")
+        rows = [(i, 2 * i, i if i % 2 else None, 0.5 * i, 'p{:}'.format(i))
+                for i in range(nrows)]
+        db.executemany('INSERT INTO test VALUES (?, ?, ?, ?, ?)', rows)
+        db.execute('CREATE VIEW test_view AS SELECT id, x * 2 AS x2'
+                ' FROM test')
+
+        return db
+
+    def test_get_dtype(self):
+        """
+        Should derive data types from declared column types
+        """
+        db = self.get_db()
+        dtype = db.get_dtype('test')
+        self.assertEqual(dtype.names, ('id', 'n', 'm', 'x', 'name'))
+        self.assertEqual([dtype[i] for i in range(5)],
+                [np.dtype(np.int64), np.dtype(np.int64),
+                    np.dtype(np.float64), np.dtype(np.float64),
+                    np.dtype(object)])
+
+        dtype = db.get_dtype('test_view', dtype={'x2': np.float32})
+        self.assertEqual(dtype['x2'], np.dtype(np.float32))
+
+        with self.assertRaises(ValueError):
+            db.get_dtype('test', fields=['missing'])
+
+    def test_iter_table(self):
+        """
+        Should read tables in chunks
+        """
+        db = self.get_db()
+
+        chunks = list(db.iter_table('test', chunksize=10, as_array=True))
+        self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+        self.assertEqual(chunks[2]['n'].tolist(), [40, 42, 44, 46, 48])
+        self.assertTrue(np.isnan(chunks[0]['m'][0]))
+        self.assertEqual(chunks[0]['m'][1], 1.)
+
+        chunks = list(db.read_table('test', chunksize=20, fields=['id',
+            'name'], where='id >= 5'))
+        self.assertEqual([len(c) for c in chunks], [20])
+        self.assertEqual(list(chunks[0].columns), ['id', 'name'])
+        self.assertEqual(chunks[0]['name'].iloc[0], 'p5')
+
+        self.assertEqual(list(db.iter_table('test', where='id < 0')), [])
+
+    def test_read_array(self):
+        """
+        Should fill allocated and preallocated arrays
+        """
+        db = self.get_db()
+
+        dat = db.read_array('test', chunksize=7)
+        self.assertEqual(len(dat), 25)
+        self.assertEqual(dat['x'].tolist(), [0.5 * i for i in range(25)])
+
+        out = np.zeros(10, dtype=[('x', np.float32), ('id', np.int32)])
+        dat = db.read_array('test', out=out, where='id < 10', chunksize=3)
+        self.assertTrue(dat is out)
+        self.assertEqual(out['id'].tolist(), range(10))
+
+        with self.assertRaises(ValueError):
+            db.read_array('test', out=out)
+
+        with self.assertRaises(ValueError):
+            db.read_array('test', out=out, where='id < 5')
+
+    def test_mixed_types(self):
+        """
+        Should read values that do not match the declared column type
+        """
+        db = self.get_db(nrows=5)
+        db.execute("UPDATE test SET x = '    ' WHERE id = 1")
+        db.execute("UPDATE test SET x = '2.5' WHERE id = 2")
+
+        # should read the column as objects instead of losing values
+        dat = db.read_array('test', chunksize=2)
+        self.assertEqual(dat.dtype['x'], np.dtype(object))
+        self.assertEqual(dat['x'].tolist(), [0., '    ', 2.5, 1.5, 2.])
+        self.assertEqual(dat['id'].tolist(), range(5))
+
+        chunks = list(db.iter_table('test', chunksize=3))
+        self.assertEqual(chunks[0]['x'].tolist(), [0., '    ', 2.5])
+        self.assertEqual(chunks[1]['x'].tolist(), [1.5, 2.])
+
+        out = np.zeros(5, dtype=[('x', float)])
+        with self.assertRaises(ValueError):
+            db.read_array('test', out=out)
+
+        db.execute("UPDATE test SET n = 'a' WHERE id = 3")
+        self.assertEqual(db.read_array('test')['n'].tolist(),
+                [0, 2, 4, 'a', 8])
+
+        # dates and geometries should be read as objects
+        db.execute('CREATE TABLE times (t TIMESTAMP, g POINT)')
+        db.execute("INSERT INTO times VALUES ('2026-10-18 12:00:00', ?)",
+                (buffer(b'\x00\x01'), ))
+        chunk = list(db.iter_table('times', chunksize=10))[0]
+        self.assertEqual(chunk['t'].tolist(),
+                db.read_table('times')['t'].tolist())
+        self.assertEqual(bytes(chunk['g'][0]), b'\x00\x01')
+
+
+def suite():
+    testSuite = unittest.makeSuite(readerTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(reader))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
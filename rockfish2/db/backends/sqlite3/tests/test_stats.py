@@ -0,0 +1,126 @@
+"""
+Test suite for the sqlite3.stats module
+"""
+import os
+import unittest
+from rockfish2.db.backends.sqlite3.connection import Connection
+
+
+class statsTestCase(unittest.TestCase):
+
+    def get_db(self, nrows=100, database=':memory:'):
+
+        db = Connection(database=database)
+        db.execute('CREATE TABLE test (id INTEGER PRIMARY KEY, x REAL,'
+                ' name TEXT)')
+        db.executemany('INSERT INTO test VALUES (?, ?, ?)',
+                [(i, 0.5 * i, 'p{:}'.format(i)) for i in range(nrows)])
+
+        return db
+
+    def test_track_stats(self):
+        """
+        Should maintain row counts and column ranges with triggers
+        """
+        db = self.get_db()
+        db.track_stats('test', fields=['x', 'name'])
+        self.assertEqual(db._get_maintained_count('test'), 100)
+
+        stats = db.stats('test')
+        self.assertEqual(stats['count'], 100)
+        self.assertEqual(stats['min'], {'x': 0., 'name': 'p0'})
+        self.assertEqual(stats['max'], {'x': 49.5, 'name': 'p99'})
+
+        # inserts should extend ranges
+        db.insert_many('test', [[100, 101], [-1., 75.]], columns=['id', 'x'])
+        self.assertEqual(db.count('test'), 102)
+        stats = db.stats('test', fields=['x'])
+        self.assertEqual((stats['min']['x'], stats['max']['x']), (-1., 75.))
+
+        # deletes and updates should invalidate ranges
+        db.execute('DELETE FROM test WHERE x < 0')
+        db.execute('UPDATE test SET x = 10. WHERE id = 101')
+        self.assertEqual(db.count('test'), 101)
+        stats = db.stats('test', fields=['x'])
+        self.assertEqual((stats['min']['x'], stats['max']['x']), (0., 49.5))
+
+        # replaced rows should not be counted twice
+        db.insert_many('test', [[5], [1.]], columns=['id', 'x'],
+                on_conflict='replace')
+        self.assertEqual(db.count('test'), 101)
+
+        # should roll back with the transaction
+        db.execute('DELETE FROM test')
+        db.rollback()
+        self.assertEqual(db.count('test'), 101)
+
+        # filtered counts should not use maintained counts
+        self.assertEqual(db.count('test', id=[1, 2, 3]), 3)
+
+    def test_untracked(self):
+        """
+        Should compute statistics for untracked tables
+        """
+        db = self.get_db()
+        self.assertEqual(db._get_maintained_count('test'), None)
+        stats = db.stats('test', fields=['id'])
+        self.assertEqual(stats['count'], 100)
+        self.assertEqual(stats['max'], {'id': 99})
+
+        # dropped tables should no longer be tracked
+        db.track_stats('test')
+        db.execute('DROP TABLE test')
+        db.execute('CREATE TABLE test (id INTEGER)')
+        self.assertEqual(db.count('test'), 0)
+        self.assertEqual(db._get_maintained_count('test'), None)
+
+        db.track_stats('test')
+        db.untrack_stats('test')
+        self.assertEqual(db._get_maintained_count('test'), None)
+
+    def test_refresh(self):
+        """
+        Should not hold a write lock after refreshing column ranges
+        """
+        dbfile = 'temp_stats.sqlite'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        db = self.get_db(database=dbfile)
+        db.track_stats('test', fields=['x'])
+        db.execute('DELETE FROM test WHERE id = 0')
+        db.commit()
+        self.assertEqual(db.stats('test')['min'], {'x': 0.5})
+
+        # other connections should be able to write
+        db2 = Connection(database=dbfile)
+        db2.execute('DELETE FROM test WHERE id = 1')
+        db2.commit()
+
+        # should not commit an open transaction
+        db.execute('DELETE FROM test WHERE id = 99')
+        self.assertEqual(db.stats('test')['max'], {'x': 49.})
+        db.rollback()
+        self.assertEqual(db.stats('test')['max'], {'x': 49.5})
+        self.assertEqual(db.count('test'), 98)
+
+        db.close()
+        db2.close()
+        os.remove(dbfile)
+
+    def test_analyze(self):
+        """
+        Should refresh query planner statistics
+        """
+        db = self.get_db()
+        db.execute('CREATE INDEX test_x ON test (x)')
+        db.analyze(limit=100)
+        self.assertTrue('sqlite_stat1' in db.tables)
+        db.analyze(tables=['test'])
+
+
+def suite():
+    return unittest.makeSuite(statsTestCase, 'test')
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -8,7 +8,6 @@ import pandas as pd
 from obspy import UTCDateTime
 from obspy.core.stream import _read
 from rockfish2 import logging
-from rockfish2.database.utils import format_where
 from rockfish2.db import Connection
 from rockfish2.extensions.obspy.stream import Stream
 
@@ -39,7 +38,8 @@ iddate2timestamp = lambda t: (datetime.datetime(year=1970, day=1, month=1)\
 class AntelopeDatabase(Connection):
 
     def __init__(self, path=None, database=':memory:', read_tables=True,
-            replace=False, spatial=False, srid=4326):
+            replace=False, spatial=False, srid=4326,
+            check_same_thread=True):
         """
         Interface to an Antelope seismic database
 
@@ -70,8 +70,12 @@ class AntelopeDatabase(Connection):
         srid: int, optional
             Sets spatial reference ID.  Default is `4326` (WGS84
             geographic). Only used when `spatial=True`.
+        check_same_thread: bool, optional
+            If `False`, the connection can be used from threads other than
+            the one that created it. Default is `True`.
         """
-        Connection.__init__(self, database=database, spatial=spatial)
+        Connection.__init__(self, database=database, spatial=spatial,
+                check_same_thread=check_same_thread)
 
         self.PATH = path
         self.SRID = srid
@@ -172,7 +176,9 @@ class AntelopeDatabase(Connection):
                 self._read_table_site(replace=replace)
             else:
                 dat = self._read_table('{:}.{:}'.format(path, table), table)
-                dat.to_sql(table, self, if_exists=if_exists)
+                # create the table with pandas, but add rows in bulk
+                dat.iloc[:0].to_sql(table, self, if_exists=if_exists)
+                self.insert_many(table, dat.reset_index())
 
     def _read_table(self, path, kind):
 
@@ -241,32 +247,18 @@ class AntelopeDatabase(Connection):
 
     def _format_time_search(self, starttime=None, endtime=None):
         """
-        Builds SQL for searching for time segments
-        """
-        # build time range query
-        if starttime is None:
-            t0 = self.execute('SELECT min(time) FROM wfdisc').fetchone()[0]
-        else:
-            t0 = starttime
-        if endtime is None: 
-            t1 = self.execute('SELECT max(endtime) FROM wfdisc').fetchone()[0]
-        else:
-            t1 = endtime 
-
+        Builds a parameterized WHERE clause for time segments
 
-        search_fmt = lambda op0, op1, op2, op3, t0, t1:\
-                '((time{:}{:}) AND (time{:}{:}) AND'\
-                    .format(op0, t0, op1, t1)\
-                + '(endtime{:}{:}) AND (endtime{:}{:}))'\
-                    .format(op2, t0, op3, t1)
-
-        where = []
-        where += [search_fmt('<=', '<=', '>=', '<=', t0, t1)]
-        where += [search_fmt('>=', '<=', '>=', '>=', t0, t1)]
-        where += [search_fmt('>=', '<=', '>=', '<=', t0, t1)]
-        where += [search_fmt('<=', '<=', '>=', '>=', t0, t1)]
+        Segments that overlap the time range from `starttime` to `endtime`
+        match. Returns the clause and its parameters.
+        """
+        match = {}
+        if starttime is not None:
+            match['endtime'] = ('>=', starttime)
+        if endtime is not None:
+            match['time'] = ('<=', endtime)
 
-        return '(' + ' OR '.join(where) + ')'
+        return self.build_where(match)
 
     def find_data(self, starttime=None, endtime=None, paths_only=False,
             sort=True, **kwargs):
@@ -283,7 +275,7 @@ class AntelopeDatabase(Connection):
             Determines whether or not to sort paths by time.
         **kwargs:
             Keyword arguments with additional search criteria (e.g.,
-            chan='ELZ' or chan=['EDH', 'ELZ']).
+            chan='ELZ' or chan=['EDH', 'ELZ']). See :meth:`build_where`.
         
         Returns
         -------
@@ -307,10 +299,13 @@ class AntelopeDatabase(Connection):
         else:
             t1 = None
 
-        wheres = [self._format_time_search(starttime=t0, endtime=t1)]
+        where, params = self._format_time_search(starttime=t0, endtime=t1)
+        wheres = [where]
         if len(kwargs) > 0:
-            _wheres = [format_where(kwargs, valid_fields=fields)]
-            wheres += [w for w in _wheres if len(w) > 0]
+            where, _params = self.build_where(kwargs, valid_fields=fields)
+            wheres.append(where)
+            params += _params
+        wheres = ['(' + w + ')' for w in wheres if len(w) > 0]
 
         if len(wheres) > 0:
             sql += ' WHERE ' + ' AND '.join(wheres)
@@ -318,7 +313,7 @@ class AntelopeDatabase(Connection):
         if sort:
             sql += ' ORDER BY time'
 
-        dat = self.read_sql(sql)
+        dat = self.read_sql(sql, params=params)
 
         if paths_only:
             paths = [os.path.join(os.path.dirname(self.PATH), 
@@ -363,7 +358,7 @@ class AntelopeDatabase(Connection):
             gaps are present.
         **kwargs:
             Keyword arguments with additional search criteria (e.g.,
-            chan='ELZ' or chan=['EDH', 'ELZ']).
+            chan='ELZ' or chan=['EDH', 'ELZ']). See :meth:`build_where`.
 
         Returns
         -------
@@ -208,9 +208,9 @@ class databaseTestCase(unittest.TestCase):
                 'endtime': [s[1] for s in segments1]})
         dat.to_sql('wfdisc', sdb)
 
-        sql = sdb._format_time_search(starttime=10, endtime=20)
+        sql, params = sdb._format_time_search(starttime=10, endtime=20)
 
-        dat1 = sdb.read_sql(sql0 + sql)
+        dat1 = sdb.read_sql(sql0 + sql, params=params)
         self.assertEqual(len(dat1), len(segments1))
 
         # should not find these
@@ -218,8 +218,8 @@ class databaseTestCase(unittest.TestCase):
         dat = pd.DataFrame({'time': [s[0] for s in segments2],
                 'endtime': [s[1] for s in segments2]})
         dat.to_sql('wfdisc', sdb, if_exists='append')
-        sql = sdb._format_time_search(starttime=10, endtime=20)
-        dat1 = sdb.read_sql(sql0 + sql)
+        sql, params = sdb._format_time_search(starttime=10, endtime=20)
+        dat1 = sdb.read_sql(sql0 + sql, params=params)
         self.assertEqual(len(dat1), len(segments1))
 
 
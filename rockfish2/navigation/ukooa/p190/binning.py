@@ -1,12 +1,147 @@
 """
 Binning utilities for P190 navigation databases
 """
+import time
+import multiprocessing
 import numpy as np
+import pandas as pd
 from scipy.interpolate import interp1d
 from rockfish2 import logging
 from rockfish2.database.database import DatabaseError
+from rockfish2.db.backends.sqlite3.connection import Connection
 from rockfish2.navigation.utils.cartesian import dist, cumdist,\
-    distribute, build_rectangular_bins
+    distribute, build_rectangular_bins, azimuth
+from rockfish2.navigation.utils.binline import BinLine
+from rockfish2.navigation.utils.coverage import bin_statistics,\
+    offset_vector_tiles, COVERAGE_FIELDS
+from rockfish2.navigation.ukooa.p190.database import get_point_sql
+
+
+def _read_midpoints(db, tables, where='1'):
+    """
+    Read receiver rowids and midpoint coordinates for a partition
+    """
+    x, y = get_point_sql('mid_pt', alias='r',
+            spatial=tables.get('spatial', True))
+    sql = """SELECT r.rowid, {:}, {:} FROM '{:}' AS r
+        WHERE {:} IS NOT NULL AND ({:})""".format(x, y, tables['rec_pt'],
+                x, where)
+    dat = np.asarray(db.execute(sql).fetchall(), dtype=float)
+    if len(dat) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0), np.zeros(0)
+
+    return dat[:, 0].astype(int), dat[:, 1], dat[:, 2]
+
+def _read_bin_centers(db, tables):
+    """
+    Read bin numbers and bin center coordinates
+    """
+    x, y = get_point_sql('bin_center', spatial=tables.get('spatial', True))
+    sql = """SELECT bin, {:}, {:} FROM '{:}'
+        ORDER BY bin""".format(x, y, tables['cmp_model'])
+    dat = np.asarray(db.execute(sql).fetchall(), dtype=float)
+
+    return dat[:, 0].astype(int), dat[:, 1], dat[:, 2]
+
+def _assign_nearest_bins(bx, by, mx, my, inline_dimension,
+        crossline_dimension, bin_line=None):
+    """
+    Assign points to the nearest rectangular bin along a bin line
+
+    Parameters
+    ----------
+    bx, by: array_like
+        Coordinates of the bin centers, in order along the bin line.
+    mx, my: array_like
+        Coordinates of the points to assign.
+    inline_dimension, crossline_dimension: float
+        Dimensions of the bins parallel and perpendicular to the bin line.
+    bin_line: :class:`~rockfish2.navigation.utils.binline.BinLine`, optional
+        Bin line through the bin centers. Default is to create a new bin
+        line from `bx`, `by`.
+
+    Returns
+    -------
+    ipt, ibin: numpy.ndarray
+        Indices of the assigned points and indices of the bins they are
+        assigned to.  Points that fall outside of the rectangle for their
+        nearest bin are not included.
+    """
+    if (len(bx) == 0) or (len(mx) == 0):
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    if len(bx) == 1:
+        # single bin, without an orientation
+        inline = np.asarray(mx, dtype=float) - bx[0]
+        crossline = np.asarray(my, dtype=float) - by[0]
+        ibin = np.zeros(len(mx), dtype=int)
+    else:
+        if bin_line is None:
+            bin_line = BinLine(bx, by)
+        distance, crossline = bin_line.project(mx, my)
+        ibin = bin_line.nearest(distance)
+        inline = distance - bin_line.distance[ibin]
+
+    inside = (np.abs(inline) <= inline_dimension / 2.)\
+            & (np.abs(crossline) <= crossline_dimension / 2.)
+    ipt = np.nonzero(inside)[0]
+
+    return ipt, ibin[ipt]
+
+def _assign_partition(db, tables, where, method='spatial',
+        spatial_index=True, inline_dimension=None, crossline_dimension=None):
+    """
+    Assign the midpoints in one partition to bins
+
+    Returns
+    -------
+    assignments: list
+        List of (bin, rec_pt rowid) tuples.
+    """
+    if method == 'spatial':
+        sql = """SELECT b.bin, r.rowid FROM '{rec_pt}' AS r,
+            '{cmp_model}' AS b WHERE ST_Contains(b.bin_geom, r.mid_pt)
+            """.format(**tables)
+        if spatial_index:
+            sql += """ AND r.rowid IN (SELECT rowid FROM SpatialIndex
+                WHERE f_table_name='{rec_pt}' AND
+                search_frame=b.bin_geom)""".format(**tables)
+        sql += " AND ({:})".format(where)
+
+        return [tuple(d) for d in db.execute(sql).fetchall()]
+
+    elif method == 'array':
+        rowid, mx, my = _read_midpoints(db, tables, where=where)
+        if hasattr(db, 'get_bin_line'):
+            bin_line, bins = db.get_bin_line()
+            bx, by = bin_line.x, bin_line.y
+        else:
+            bins, bx, by = _read_bin_centers(db, tables)
+            bin_line = None
+        ipt, ibin = _assign_nearest_bins(bx, by, mx, my, inline_dimension,
+                crossline_dimension, bin_line=bin_line)
+
+        return list(zip(bins[ibin].tolist(), rowid[ipt].tolist()))
+
+    else:
+        raise ValueError("method must be 'spatial' or 'array'")
+
+def _assign_partition_worker(args):
+    """
+    Assign midpoints in a partition to bins using a new connection
+
+    Run by worker processes in :meth:`P190Binning.assign_cmp_bins`.
+    """
+    database, tables, where, kwargs = args
+
+    t0 = time.time()
+    db = Connection(database=database, spatial=tables.get('spatial', True))
+    try:
+        assignments = _assign_partition(db, tables, where, **kwargs)
+    finally:
+        db.close()
+
+    return where, assignments, time.time() - t0
 
 
 class P190Binning(object):
@@ -18,6 +153,9 @@ class P190Binning(object):
         """
         Distributes stations evenly along a line
         """
+        if interp_kind == 'linear':
+            return BinLine(easting, northing).stations(spacing)
+
         # distance along the line
         r0 = cumdist(easting, northing)
         r1 = np.arange(0, r0[-1], spacing)
@@ -28,90 +166,953 @@ class P190Binning(object):
 
         return r1, r2x(r1), r2y(r1)
 
+    def get_bin_line(self):
+        """
+        Get the bin line through the bin centers in the bin model
+
+        The bin line is cached and reused until the bin model changes.
+
+        Returns
+        -------
+        bin_line: :class:`~rockfish2.navigation.utils.binline.BinLine`
+            Bin line with a point at each bin center.
+        bins: numpy.ndarray
+            Bin numbers for the points in `bin_line`.
+        """
+        model = self._get_cmp_model_version() or {}
+        key = model.get('version', None)
+
+        cache = getattr(self, '_bin_line_cache', None)
+        if (cache is not None) and (key is not None) and (cache[0] == key):
+            return cache[1], cache[2]
+
+        bins, bx, by = _read_bin_centers(self, self._cmp_tables)
+        bin_line = BinLine(bx, by)
+        self._bin_line_cache = (key, bin_line, bins)
+
+        return bin_line, bins
+
     def _calc_bin_rectangles(self, easting, northing, inline_dimension,
             crossline_dimension):
 
         return build_rectangular_bins(easting, northing, inline_dimension,
             crossline_dimension)
 
-    def _create_cmp_assignments_view(self):
+    def _create_cmp_assignments_view(self, compact=False):
         """
         Create a view that matches CMP assignments with src, rec pairs
         """
-        if 'mid_pt' not in self._get_fields(self.REC_PT_TABLE):
+        if not self._has_point(self.REC_PT_TABLE, 'mid_pt'):
             self.calc_src_rec_midpoints()
 
         if self.CMP_ASSIGNMENTS_VIEW in self.views:
             return
 
         logging.info("Creating view '{:}'...", self.CMP_ASSIGNMENTS_VIEW)
+        points = ', '.join(['r.{0:} as {0:}'.format(f) for f in
+            self._get_point_fields('rec_pt')
+            + self._get_point_fields('mid_pt')])
         sql = """CREATE VIEW '{self.CMP_ASSIGNMENTS_VIEW}'
             AS SELECT r.line as line, r.point as point, r.cable_id as cable_id,
-            r.chan as chan, r.rec_pt as rec_pt, r.mid_pt as mid_pt,
+            r.chan as chan, {points},
             b.bin FROM '{self.REC_PT_TABLE}' as r
-            NATURAL JOIN '{self.CMP_ASSIGNMENTS}' as b
             """.format(**locals())
+        if compact:
+            sql += """INNER JOIN '{self.CMP_BIN_INDEX}' as b
+                ON r.rowid=b.rec_rowid""".format(**locals())
+        else:
+            sql += """NATURAL JOIN '{self.CMP_ASSIGNMENTS}' as b
+                """.format(**locals())
         self.execute(sql)
 
-        sql = """INSERT OR REPLACE INTO 'views_geometry_columns'(view_name,
-                view_geometry, view_rowid, f_table_name,
+        if self.SPATIAL:
+            sql = """INSERT OR REPLACE INTO 'views_geometry_columns'(
+                view_name, view_geometry, view_rowid, f_table_name,
                 f_geometry_column, read_only)
                 VALUES('{self.CMP_ASSIGNMENTS_VIEW}', 'mid_pt', 'rowid',
                     '{self.REC_PT_TABLE}', 'mid_pt', 0)""".format(**locals())
-        self.execute(sql)
+            self.execute(sql)
         self.commit()
 
-    def assign_cmp_bins(self, spatial_index=True, **kwargs):
+    def _create_table_cmp_assignments(self):
+        """
+        Create the table for storing CMP assignments
+        """
+        sql = """CREATE TABLE IF NOT EXISTS '{self.CMP_ASSIGNMENTS}' (
+            line INTEGER NOT NULL,
+            point INTEGER NOT NULL,
+            cable_id INTEGER NOT NULL,
+            chan INTEGER NOT NULL,
+            bin INTEGER NOT NULL)""".format(**locals())
+        self.execute(sql)
+
+        self._add_geom_pointxy(self.CMP_ASSIGNMENTS, 'mid_pt')
+
+    def _create_table_cmp_bin_index(self):
+        """
+        Create the table for storing compact CMP assignments
+        """
+        sql = """CREATE TABLE IF NOT EXISTS '{self.CMP_BIN_INDEX}' (
+            rec_rowid INTEGER PRIMARY KEY,
+            bin INTEGER NOT NULL)""".format(**locals())
+        self.execute(sql)
+
+    def _create_cmp_spatial_indices(self):
+        """
+        Create spatial indices for bin polygons and midpoints, reusing
+        existing indices
+        """
+        logging.info('...creating spatial indices')
+        for t, f in [(self.CMP_MODEL, 'bin_geom'),
+                (self.REC_PT_TABLE, 'mid_pt')]:
+            self._create_spatial_index(t, f)
+
+    def _create_table_cmp_model_versions(self):
+        """
+        Create tables for tracking versions of the bin model
+        """
+        sql = """CREATE TABLE IF NOT EXISTS '{self.CMP_MODEL_VERSIONS}' (
+            version INTEGER PRIMARY KEY,
+            spacing REAL,
+            bin0 INTEGER,
+            nbin INTEGER NOT NULL,
+            bin_shape TEXT,
+            inline_dimension REAL,
+            crossline_dimension REAL,
+            nchanged INTEGER NOT NULL,
+            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP)
+            """.format(**locals())
+        self.execute(sql)
+
+        sql = """CREATE TABLE IF NOT EXISTS '{self.CMP_MODEL_CHANGES}' (
+            version INTEGER NOT NULL,
+            bin INTEGER NOT NULL,
+            PRIMARY KEY (version, bin))""".format(**locals())
+        self.execute(sql)
+
+    def _get_cmp_model_version(self, version=None):
+        """
+        Returns parameters for a version of the bin model as a dictionary,
+        or `None` if no versions have been recorded.
+
+        Parameters
+        ----------
+        version: int, optional
+            Version to get. Default is the latest version.
+        """
+        if self.CMP_MODEL_VERSIONS not in self.tables:
+            return None
+
+        sql = "SELECT * FROM '{:}'".format(self.CMP_MODEL_VERSIONS)
+        if version is None:
+            sql += " ORDER BY version DESC LIMIT 1"
+        else:
+            sql += " WHERE version={:}".format(int(version))
+
+        row = self.execute(sql).fetchone()
+        if row is None:
+            return None
+
+        return dict(zip(row.keys(), row))
+
+    def _add_cmp_model_version(self, changed, **kwargs):
+        """
+        Record a new version of the bin model and the bins that changed
+        """
+        self._create_table_cmp_model_versions()
+
+        kwargs['nchanged'] = len(changed)
+        self.insert(self.CMP_MODEL_VERSIONS, **kwargs)
+        version = self.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+        sql = """INSERT INTO '{self.CMP_MODEL_CHANGES}' (version, bin)
+            VALUES (?, ?)""".format(**locals())
+        self.executemany(sql, [(version, int(b)) for b in changed])
+
+        logging.info('...bin model version {:}: {:} bins changed',
+                version, len(changed))
+
+        return version
+
+    def _get_SQL_insert_cmp_assignment(self, compact=False,
+            conflict='REPLACE'):
+        """
+        Returns SQL for inserting (bin, rec_pt rowid) assignments
+        """
+        if compact:
+            return """INSERT OR {conflict} INTO '{self.CMP_BIN_INDEX}'
+                (bin, rec_rowid) VALUES (?, ?)""".format(**locals())
+        else:
+            mid_pt = ', '.join(self._get_point_fields('mid_pt'))
+            return """INSERT OR {conflict} INTO '{self.CMP_ASSIGNMENTS}'
+                (line, point, cable_id, chan, bin, {mid_pt}) SELECT
+                line, point, cable_id, chan, ?, {mid_pt} FROM
+                '{self.REC_PT_TABLE}' WHERE rowid=?""".format(**locals())
+
+    def _get_cmp_partitions(self, partition='line', partition_size=None):
+        """
+        Split midpoints into groups for assigning bins in parallel
+
+        Parameters
+        ----------
+        partition: str, optional
+            Partitioning scheme. If 'line' (default), midpoints are grouped
+            by line and ranges of `partition_size` shot points. If 'tile',
+            midpoints are grouped into square tiles with sides of
+            `partition_size` distance units.
+        partition_size: int or float, optional
+            Number of shot points (partition='line', default is 100) or tile
+            size (partition='tile', default splits the survey into 4x4
+            tiles) for each partition.
+
+        Returns
+        -------
+        partitions: list
+            List of SQL WHERE clauses on the receiver table (as ``r``) that
+            select the midpoints in each partition.
+        """
+        partitions = []
+        if partition == 'line':
+            partition_size = int(partition_size or 100)
+            sql = """SELECT line, MIN(point), MAX(point) FROM '{:}'
+                GROUP BY line ORDER BY line""".format(self.REC_PT_TABLE)
+            for line, p0, p1 in self.execute(sql).fetchall():
+                for _p0 in range(p0, p1 + 1, partition_size):
+                    partitions.append(
+                        "r.line='{:}' AND r.point BETWEEN {:} AND {:}"\
+                            .format(line, _p0, _p0 + partition_size - 1))
+
+        elif partition == 'tile':
+            x, y = self._get_point_sql('mid_pt')
+            sql = """SELECT MIN({x}), MAX({x}), MIN({y}), MAX({y})
+                FROM '{self.REC_PT_TABLE}'""".format(**locals())
+            x0, x1, y0, y1 = self.execute(sql).fetchone()
+            if x0 is None:
+                return partitions
+
+            if partition_size is None:
+                partition_size = max(x1 - x0, y1 - y0) / 4.
+            partition_size = max(float(partition_size), 1e-9)
+
+            xedges = x0 + partition_size\
+                    * np.arange(int((x1 - x0) / partition_size) + 2)
+            yedges = y0 + partition_size\
+                    * np.arange(int((y1 - y0) / partition_size) + 2)
+
+            x, y = self._get_point_sql('mid_pt', alias='r')
+            for _x0, _x1 in zip(xedges[0:-1], xedges[1:]):
+                for _y0, _y1 in zip(yedges[0:-1], yedges[1:]):
+                    partitions.append(
+                        "{0:} >= {2:} AND {0:} < {3:}"\
+                        " AND {1:} >= {4:} AND {1:} < {5:}"\
+                            .format(x, y, repr(_x0), repr(_x1), repr(_y0),
+                                repr(_y1)))
+        else:
+            raise ValueError("partition must be 'line' or 'tile'")
+
+        return partitions
+
+    def _assign_cmp_bins_partitioned(self, partition='line',
+            partition_size=None, method='spatial', nproc=None,
+            spatial_index=True, inline_dimension=None,
+            crossline_dimension=None, compact=False):
+        """
+        Assign midpoints to bins in partitions, using worker processes
+
+        See :meth:`~P190Binning.assign_cmp_bins` for parameters.
+        """
+        if method == 'array':
+            inline_dimension, crossline_dimension = \
+                    self._get_cmp_bin_dimensions(inline_dimension,
+                            crossline_dimension)
+
+        partitions = self._get_cmp_partitions(partition=partition,
+                partition_size=partition_size)
+        npart = len(partitions)
+
+        kwargs = {'method': method, 'spatial_index': spatial_index,
+                'inline_dimension': inline_dimension,
+                'crossline_dimension': crossline_dimension}
+
+        database = self.filename
+        if nproc is None:
+            nproc = multiprocessing.cpu_count()
+        if (database == '') and (nproc > 1):
+            logging.warn('Cannot share an in-memory database between'
+                    ' processes, assigning bins with a single process.')
+            nproc = 1
+
+        logging.info('...assigning bins in {:} partitions ({:}) with {:}'
+                ' process(es) using the {:} method', npart, partition,
+                nproc, method)
+
+        if nproc > 1:
+            pool = multiprocessing.Pool(processes=nproc)
+            args = [(database, self._cmp_tables, where, kwargs)
+                    for where in partitions]
+            results = pool.imap_unordered(_assign_partition_worker, args)
+        else:
+            pool = None
+            def _serial():
+                for where in partitions:
+                    t0 = time.time()
+                    assignments = _assign_partition(self,
+                            self._cmp_tables, where, **kwargs)
+                    yield where, assignments, time.time() - t0
+            results = _serial()
+
+        # merge results through a single writer
+        sql = self._get_SQL_insert_cmp_assignment(compact=compact)
+
+        try:
+            for i, (where, assignments, elapsed) in enumerate(results):
+                t0 = time.time()
+                self.executemany(sql, assignments)
+                self.commit()
+                logging.info('...partition {:} of {:} ({:}): assigned {:}'
+                        ' midpoints in {:.3f} s, wrote in {:.3f} s', i + 1,
+                        npart, where, len(assignments), elapsed,
+                        time.time() - t0)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _get_cmp_bin_dimensions(self, inline_dimension=None,
+            crossline_dimension=None):
+        """
+        Returns bin dimensions for array-based bin assignment
+
+        Dimensions that are not given are taken from the latest version of
+        the bin model, if available, or else default to the bin spacing
+        (inline) and 500 (crossline).
+        """
+        model = self._get_cmp_model_version() or {}
+
+        if inline_dimension is None:
+            inline_dimension = model.get('inline_dimension', None)
+        if inline_dimension is None:
+            bin_line, bins = self.get_bin_line()
+            inline_dimension = np.median(bin_line.segment_length)
+
+        if crossline_dimension is None:
+            crossline_dimension = model.get('crossline_dimension', None)
+        if crossline_dimension is None:
+            crossline_dimension = 500.
+
+        return inline_dimension, crossline_dimension
+
+    def _get_cmp_tables(self):
+        """
+        Returns a dictionary of table names used by the binning workers
+        """
+        return {'rec_pt': self.REC_PT_TABLE, 'cmp_model': self.CMP_MODEL,
+                'cmp_assignments': self.CMP_ASSIGNMENTS,
+                'spatial': self.SPATIAL}
+
+    _cmp_tables = property(fget=_get_cmp_tables)
+
+    def assign_cmp_bins(self, spatial_index=True, partition=None,
+            method='spatial', nproc=None, compact=False, **kwargs):
         """
         Assign midpoints to bins
+
+        Parameters
+        ----------
+        spatial_index: bool, optional
+            Determines whether or not to build and use spatial indices when
+            assigning midpoints to bin polygons. Default is `True`.
+        partition: str or None, optional
+            If 'line' or 'tile', midpoints are split into partitions by
+            line and shot-point range or by spatial tile, and partitions
+            are assigned to bins in parallel worker processes. Results are
+            merged into the assignments table by a single writer. Default
+            (`None`) assigns all midpoints with a single SQL query.
+        method: str, optional
+            Assignment method for partitions. If 'spatial' (default),
+            midpoints are tested against bin polygons in SpatiaLite. If
+            'array', midpoints are assigned to the nearest bin center
+            in NumPy, and rejected if they fall outside of the
+            rectangular bin. Only used if `partition` is not `None`.
+            Databases in numeric mode (``spatial=False``) always use the
+            'array' method, partitioned by line if `partition` is `None`.
+        nproc: int, optional
+            Number of worker processes. Default is the number of CPUs.
+            In-memory databases are always processed with a single
+            process.
+        compact: bool, optional
+            If `True`, assignments are stored as (receiver rowid, bin)
+            pairs in the table set by `CMP_BIN_INDEX`, instead of copying
+            receiver fields and midpoint geometries into the table set by
+            `CMP_ASSIGNMENTS`. Each receiver is assigned to at most one
+            bin. Default is `False`.
+        **kwargs: optional
+            ``partition_size`` sets the number of shot points or the tile
+            size for each partition (see
+            :meth:`~P190Binning._get_cmp_partitions`).
+            ``inline_dimension`` and ``crossline_dimension`` set the bin
+            dimensions used by the 'array' method. Defaults are the bin
+            spacing and 500.
         """
-        if 'mid_pt' not in self._get_fields(self.REC_PT_TABLE):
+        if not self._has_point(self.REC_PT_TABLE, 'mid_pt'):
             self.calc_src_rec_midpoints()
+
+        if not self.SPATIAL:
+            method = 'array'
+            partition = partition or 'line'
         
         logging.info('Assigning midpoints to {:}.{:}...',
                 self.CMP_MODEL, 'bin_geom')
 
-        if spatial_index:
-            logging.info('...creating spatial indices')
+        if spatial_index and (method == 'spatial'):
+            self._create_cmp_spatial_indices()
 
-            fields = [(self.CMP_MODEL, 'bin_geom'),
-                      (self.REC_PT_TABLE, 'mid_pt')]
+        if compact:
+            self._create_table_cmp_bin_index()
+            output_table = self.CMP_BIN_INDEX
+        else:
+            self._create_table_cmp_assignments()
+            output_table = self.CMP_ASSIGNMENTS
+        self.commit()
 
-            for t, f in fields:
-                logging.info('......{:}.{:}', t, f)
-                sql = "SELECT CreateSpatialIndex('{:}', '{:}')".format(t, f)
-                self.execute(sql)
+        if partition is not None:
+            self._assign_cmp_bins_partitioned(partition=partition,
+                    method=method, nproc=nproc, spatial_index=spatial_index,
+                    compact=compact, **kwargs)
+        else:
+            if compact:
+                sql = """INSERT OR REPLACE INTO '{self.CMP_BIN_INDEX}'
+                    (rec_rowid, bin) SELECT r.rowid, b.bin FROM
+                    {self.REC_PT_TABLE} as r, {self.CMP_MODEL} as b WHERE
+                    ST_Contains(b.bin_geom, r.mid_pt)""".format(**locals())
+            else:
+                sql = """INSERT INTO '{self.CMP_ASSIGNMENTS}'
+                    (line, point, cable_id, chan, bin, mid_pt) SELECT
+                    r.line, r.point, r.cable_id, r.chan, b.bin, r.mid_pt
+                    FROM {self.REC_PT_TABLE} as r, {self.CMP_MODEL} as b
+                    WHERE ST_Contains(b.bin_geom, r.mid_pt)"""\
+                            .format(**locals())
 
+            if spatial_index:
+                sql += """ AND r.rowid IN (SELECT rowid FROM SpatialIndex
+                    WHERE f_table_name='{self.REC_PT_TABLE}' AND
+                    search_frame=b.bin_geom)""".format(**locals())
+            
+            self.execute(sql)
+            self.commit()
 
-        sql = """CREATE TABLE IF NOT EXISTS '{self.CMP_ASSIGNMENTS}' (
-            line INTEGER NOT NULL,
-            point INTEGER NOT NULL,
-            cable_id INTEGER NOT NULL,
-            chan INTEGER NOT NULL,
-            bin INTEGER NOT NULL)""".format(**locals())
+        logging.info('...assigned {:} of {:} points to bins',
+                self.count(output_table),
+                self.count(self.REC_PT_TABLE))
+
+        self._create_cmp_assignments_view(compact=compact)
+
+    def reassign_cmp_bins(self, version=None, method='spatial',
+            spatial_index=True, **kwargs):
+        """
+        Reassign midpoints for bins that changed in a bin model version
+
+        With the 'spatial' method, assignments to bins that changed are
+        removed, and midpoints are reassigned to the new versions of those
+        bins only. With the 'array' method, midpoints within one bin
+        dimension of a changed bin are reassigned to the nearest of all
+        bins, because a moved bin can take midpoints from an unchanged
+        neighbor. Other assignments are kept. Assignments are updated in
+        the table set by `CMP_BIN_INDEX`, if it exists, or else in the
+        table set by `CMP_ASSIGNMENTS`.
+
+        Parameters
+        ----------
+        version: int, optional
+            Version of the bin model to apply changes for. Default is the
+            latest version. See
+            :meth:`~P190Binning.create_bin_line` with
+            ``if_exists='update'``.
+        method: str, optional
+            Assignment method; either 'spatial' (default) or 'array'. See
+            :meth:`~P190Binning.assign_cmp_bins`. Databases in numeric mode
+            always use the 'array' method.
+        spatial_index: bool, optional
+            Determines whether or not to use (and reuse) spatial indices
+            with the 'spatial' method. Default is `True`.
+        **kwargs: optional
+            ``inline_dimension`` and ``crossline_dimension`` for the
+            'array' method.
+        """
+        model = self._get_cmp_model_version(version)
+        if model is None:
+            raise DatabaseError('No bin model versions have been recorded.'
+                    " Use create_bin_line(..., if_exists='update').")
+        version = model['version']
+
+        if not self.SPATIAL:
+            method = 'array'
+
+        compact = self.CMP_BIN_INDEX in self.tables
+        if compact:
+            output_table = self.CMP_BIN_INDEX
+        else:
+            self._create_table_cmp_assignments()
+            output_table = self.CMP_ASSIGNMENTS
+
+        logging.info('Reassigning midpoints for {:} bins changed in bin'
+                ' model version {:}...', model['nchanged'], version)
+
+        self.execute('DROP TABLE IF EXISTS temp.temp_cmp_changed_bins')
+        sql = """CREATE TEMPORARY TABLE temp_cmp_changed_bins AS
+            SELECT bin FROM '{self.CMP_MODEL_CHANGES}'
+            WHERE version={version}""".format(**locals())
         self.execute(sql)
 
-        self._add_geom_pointxy(self.CMP_ASSIGNMENTS, 'mid_pt')
+        sql = """DELETE FROM '{output_table}' WHERE bin IN
+            (SELECT bin FROM temp.temp_cmp_changed_bins)"""\
+                    .format(**locals())
+        self.execute(sql)
+        assignments = []
 
-        sql = """INSERT INTO '{self.CMP_ASSIGNMENTS}'
-            (line, point, cable_id, chan, bin, mid_pt) SELECT
-            r.line, r.point, r.cable_id, r.chan, b.bin, r.mid_pt FROM
-            {self.REC_PT_TABLE} as r, {self.CMP_MODEL} as b WHERE
-            ST_Contains(b.bin_geom, r.mid_pt)""".format(**locals())
+        if method == 'spatial':
+            if spatial_index:
+                self._create_cmp_spatial_indices()
 
-        if spatial_index:
-            sql += """ AND r.rowid IN (SELECT rowid FROM SpatialIndex
-                WHERE f_table_name='{self.REC_PT_TABLE}' AND
-                search_frame=b.bin_geom)""".format(**locals())
-        
+            if compact:
+                sql = """INSERT OR IGNORE INTO '{self.CMP_BIN_INDEX}'
+                    (rec_rowid, bin) SELECT r.rowid, b.bin"""\
+                            .format(**locals())
+            else:
+                sql = """INSERT INTO '{self.CMP_ASSIGNMENTS}'
+                    (line, point, cable_id, chan, bin, mid_pt) SELECT
+                    r.line, r.point, r.cable_id, r.chan, b.bin, r.mid_pt
+                    """.format(**locals())
+            sql += """ FROM {self.REC_PT_TABLE} as r,
+                {self.CMP_MODEL} as b WHERE
+                b.bin IN (SELECT bin FROM temp.temp_cmp_changed_bins)
+                AND ST_Contains(b.bin_geom, r.mid_pt)""".format(**locals())
+            if spatial_index:
+                sql += """ AND r.rowid IN (SELECT rowid FROM SpatialIndex
+                    WHERE f_table_name='{self.REC_PT_TABLE}' AND
+                    search_frame=b.bin_geom)""".format(**locals())
+            self.execute(sql)
+
+        elif method == 'array':
+            inline_dimension, crossline_dimension = \
+                    self._get_cmp_bin_dimensions(**kwargs)
+
+            # only consider midpoints near the changed bins
+            x, y = self._get_point_sql('bin_center')
+            sql = """SELECT MIN({x}), MAX({x}), MIN({y}), MAX({y}) FROM
+                '{self.CMP_MODEL}' WHERE bin IN
+                (SELECT bin FROM temp.temp_cmp_changed_bins)"""\
+                        .format(**locals())
+            x0, x1, y0, y1 = self.execute(sql).fetchone()
+
+            if x0 is not None:
+                pad = max(inline_dimension, crossline_dimension)
+                x, y = self._get_point_sql('mid_pt', alias='r')
+                where = """{:} BETWEEN {:} AND {:}
+                    AND {:} BETWEEN {:} AND {:}"""\
+                        .format(x, repr(x0 - pad), repr(x1 + pad), y,
+                                repr(y0 - pad), repr(y1 + pad))
+
+                # reassign all midpoints in the window, which may now be
+                # nearest to a changed bin
+                if compact:
+                    sql = """DELETE FROM '{:}' WHERE rec_rowid IN
+                        (SELECT r.rowid FROM '{:}' AS r WHERE {:})"""
+                else:
+                    sql = """DELETE FROM '{:}' WHERE
+                        (line, point, cable_id, chan) IN
+                        (SELECT r.line, r.point, r.cable_id, r.chan
+                        FROM '{:}' AS r WHERE {:})"""
+                self.execute(sql.format(output_table, self.REC_PT_TABLE,
+                    where))
+                assignments = _assign_partition(self, self._cmp_tables,
+                        where, method='array',
+                        inline_dimension=inline_dimension,
+                        crossline_dimension=crossline_dimension)
+
+        else:
+            raise ValueError("method must be 'spatial' or 'array'")
+
+        if len(assignments) > 0:
+            sql = self._get_SQL_insert_cmp_assignment(compact=compact)
+            self.executemany(sql, assignments)
+
+        self.execute('DROP TABLE IF EXISTS temp.temp_cmp_changed_bins')
+        self.commit()
+
+        logging.info('...{:} points now assigned to bins',
+                self.count(output_table))
+
+        self._create_cmp_assignments_view(compact=compact)
+
+    def read_cmp_bin_index(self):
+        """
+        Read CMP assignments as arrays
+
+        Assignments are read from the table set by `CMP_BIN_INDEX`, if it
+        exists, or else from the table set by `CMP_ASSIGNMENTS`.
+
+        Returns
+        -------
+        rowid, bins: numpy.ndarray
+            Receiver rowids and the bins they are assigned to.
+        """
+        if self.CMP_BIN_INDEX in self.tables:
+            sql = """SELECT rec_rowid, bin FROM '{self.CMP_BIN_INDEX}'
+                """.format(**locals())
+        else:
+            sql = """SELECT r.rowid, b.bin FROM '{self.REC_PT_TABLE}' as r
+                INNER JOIN '{self.CMP_ASSIGNMENTS}' as b
+                USING (line, point, cable_id, chan)""".format(**locals())
+
+        dat = np.asarray(self.execute(sql).fetchall(), dtype=np.int64)
+        if len(dat) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+
+        return dat[:, 0], dat[:, 1].astype(np.int32)
+
+    def save_cmp_bin_index(self, filename):
+        """
+        Save CMP assignments as a memory-mappable array
+
+        The array is stored in NumPy ``.npy`` format, with one int32 bin
+        number for each receiver rowid (i.e., ``bins[rowid]``). Receivers
+        that are not assigned to a bin have a value of -1.
+
+        Parameters
+        ----------
+        filename: str
+            Path to the output file.
+
+        Returns
+        -------
+        bins: numpy.memmap
+            Memory-mapped array of bin numbers.
+        """
+        rowid, bins = self.read_cmp_bin_index()
+
+        sql = "SELECT MAX(rowid) FROM '{:}'".format(self.REC_PT_TABLE)
+        nrow = (self.execute(sql).fetchone()[0] or 0) + 1
+
+        logging.info('Saving CMP bin index for {:} receivers to: {:}',
+                nrow, filename)
+        index = np.lib.format.open_memmap(filename, mode='w+',
+                dtype=np.int32, shape=(nrow,))
+        index[:] = -1
+        index[rowid] = bins
+        index.flush()
+
+        return index
+
+    def load_cmp_bin_index(self, filename):
+        """
+        Load CMP assignments saved by
+        :meth:`~P190Binning.save_cmp_bin_index`
+
+        Parameters
+        ----------
+        filename: str
+            Path to the input file.
+
+        Returns
+        -------
+        bins: numpy.memmap
+            Read-only memory-mapped array of bin numbers, indexed by
+            receiver rowid.
+        """
+        return np.load(filename, mmap_mode='r')
+
+    def _read_cmp_traces(self):
+        """
+        Read CMP assignments with source and receiver coordinates
+
+        Returns
+        -------
+        rowid, bins, sx, sy, rx, ry: numpy.ndarray
+            Receiver rowids, bin numbers, and source and receiver
+            coordinates for each assigned trace. Coordinates are NaN for
+            receivers without a source position.
+        """
+        rowid, bins = self.read_cmp_bin_index()
+        if len(rowid) == 0:
+            return (rowid, bins) + tuple([np.zeros(0)] * 4)
+
+        # coordinates, indexed by rowid
+        _rowid, _sx, _sy, _rx, _ry = self._read_src_rec_coords()
+        nrow = max(rowid.max(), _rowid.max() if len(_rowid) else 0) + 1
+        coords = []
+        for _c in [_sx, _sy, _rx, _ry]:
+            c = np.nan * np.ones(nrow)
+            c[_rowid] = _c
+            coords.append(c[rowid])
+
+        return (rowid, bins) + tuple(coords)
+
+    def calc_cmp_coverage(self):
+        """
+        Calculate fold and coverage statistics for CMP bins
+
+        Statistics are calculated in NumPy from the CMP assignments (see
+        :func:`~rockfish2.navigation.utils.coverage.bin_statistics`) and
+        stored in the table set by `CMP_COVERAGE`, replacing any existing
+        statistics. Crossline distances are measured from the bin line
+        through the bin centers.
+
+        Returns
+        -------
+        stats: :class:`pandas.DataFrame`
+            Statistics for each bin with at least one trace.
+        """
+        logging.info('Calculating CMP coverage...')
+        rowid, bins, sx, sy, rx, ry = self._read_cmp_traces()
+
+        offsets = dist(0, 0, rx - sx, ry - sy)
+        mx = sx + (rx - sx) / 2.
+        my = sy + (ry - sy) / 2.
+
+        crossline = None
+        if len(rowid) > 0:
+            bin_line, _ = self.get_bin_line()
+            _, crossline = bin_line.project(mx, my)
+
+        stats = bin_statistics(bins, offsets, x=mx, y=my,
+                crossline=crossline)
+        logging.info('...calculated statistics for {:} bins', len(stats))
+
+        sql = "DROP TABLE IF EXISTS '{:}'".format(self.CMP_COVERAGE)
         self.execute(sql)
+
+        sql = """CREATE TABLE '{self.CMP_COVERAGE}' (
+            bin INTEGER PRIMARY KEY,
+            fold INTEGER NOT NULL,
+            offset_min REAL,
+            offset_max REAL,
+            offset_mean REAL,
+            scatter REAL,
+            crossline_mean REAL,
+            crossline_std REAL)""".format(**locals())
+        self.execute(sql)
+
+        sql = "INSERT INTO '{:}' ({:}) VALUES ({:})".format(
+                self.CMP_COVERAGE, ', '.join(COVERAGE_FIELDS),
+                ', '.join(['?' for f in COVERAGE_FIELDS]))
+        values = stats.astype(object).where(pd.notnull(stats), None)
+        self.executemany(sql, [tuple(v) for v in values.values])
         self.commit()
 
-        logging.info('...assigned {:} of {:} points to bins',
-                self.count(self.CMP_ASSIGNMENTS),
-                self.count(self.REC_PT_TABLE))
+        return stats
+
+    def calc_offset_vector_tiles(self, offset_edges, nsector=1,
+            azimuth0=0.):
+        """
+        Calculate fold by bin, offset class, and azimuth sector
+
+        Offsets and source-to-receiver azimuths are calculated in NumPy
+        from the source and receiver tables, and each assigned trace is
+        keyed by (bin, offset class, sector) in one pass (see
+        :func:`~rockfish2.navigation.utils.coverage.offset_vector_tiles`).
+        Fold for each tile is stored in the table set by `CMP_OVT`,
+        replacing any existing values.
+
+        Parameters
+        ----------
+        offset_edges: array_like
+            Increasing offsets at the edges of the offset classes.
+        nsector: int, optional
+            Number of equal azimuth sectors. Default is 1.
+        azimuth0: float, optional
+            Azimuth at the start of the first sector, in degrees clockwise
+            from grid north. Default is 0.
+
+        Returns
+        -------
+        tiles: :class:`pandas.DataFrame`
+            Tiles with columns bin, offset_class, sector, fold, and start.
+        rowid: numpy.ndarray
+            Receiver rowids sorted by tile and offset. Traces for tile
+            ``i`` are ``rowid[start[i]:start[i] + fold[i]]``.
+        """
+        logging.info('Calculating offset vector tiles...')
+        rowid, bins, sx, sy, rx, ry = self._read_cmp_traces()
+
+        offsets = dist(0, 0, rx - sx, ry - sy)
+        azimuths = azimuth(sx, sy, rx, ry)
+
+        tiles, order = offset_vector_tiles(bins, offsets, azimuths,
+                offset_edges, nsector=nsector, azimuth0=azimuth0)
+        logging.info('...sorted {:} traces into {:} tiles', len(order),
+                len(tiles))
+
+        sql = "DROP TABLE IF EXISTS '{:}'".format(self.CMP_OVT)
+        self.execute(sql)
+
+        sql = """CREATE TABLE '{self.CMP_OVT}' (
+            bin INTEGER NOT NULL,
+            offset_class INTEGER NOT NULL,
+            sector INTEGER NOT NULL,
+            fold INTEGER NOT NULL,
+            PRIMARY KEY (bin, offset_class, sector))""".format(**locals())
+        self.execute(sql)
+
+        sql = """INSERT INTO '{self.CMP_OVT}' (bin, offset_class, sector,
+            fold) VALUES (?, ?, ?, ?)""".format(**locals())
+        self.executemany(sql, zip(*[tiles[f].tolist() for f in
+            ['bin', 'offset_class', 'sector', 'fold']]))
+        self.commit()
+
+        return tiles, rowid[order]
+
+    def write_cmp_coverage(self, filename, fields=['fold']):
+        """
+        Write CMP coverage statistics at bin centers for GMT
+
+        Writes a whitespace-delimited table with columns x, y, and
+        `fields`, for use with, e.g., GMT ``psxy`` or ``xyz2grd``.
+        Coverage statistics are calculated if they do not exist.
+
+        Parameters
+        ----------
+        filename: str
+            Path to the output file.
+        fields: list, optional
+            Coverage fields to write. Default is ``['fold']``. See
+            :data:`~rockfish2.navigation.utils.coverage.COVERAGE_FIELDS`.
+        """
+        if self.CMP_COVERAGE not in self.tables:
+            self.calc_cmp_coverage()
+
+        bin_line, bins = self.get_bin_line()
+        centers = pd.DataFrame({'bin': bins, 'x': bin_line.x,
+            'y': bin_line.y})
+
+        sql = "SELECT bin, {:} FROM '{:}'".format(', '.join(fields),
+                self.CMP_COVERAGE)
+        stats = self.read_sql(sql)
+
+        dat = centers.merge(stats, on='bin', how='inner')
+
+        logging.info('Writing CMP coverage for {:} bins to: {:}',
+                len(dat), filename)
+        with open(filename, 'w') as f:
+            f.write('# x y {:}\n'.format(' '.join(fields)))
+            dat.to_csv(f, sep=' ', index=False, header=False,
+                    columns=['x', 'y'] + list(fields), na_rep='NaN')
+
+    def get_cmp_sort_order(self):
+        """
+        Sort assigned traces into CMP gathers
+
+        Traces are sorted by bin and then by source-receiver offset, using
+        :func:`numpy.lexsort` on the assignment arrays.
+
+        Returns
+        -------
+        rowid, bins, offsets: numpy.ndarray
+            Receiver rowids, bin numbers, and offsets in CMP-gather order.
+        """
+        rowid, bins, sx, sy, rx, ry = self._read_cmp_traces()
+        offsets = dist(0, 0, rx - sx, ry - sy)
+
+        order = np.lexsort((offsets, bins))
 
-        self._create_cmp_assignments_view()
+        return rowid[order], bins[order], offsets[order]
+
+    def write_cmp_sort_order(self, filename, fmt='ascii'):
+        """
+        Write the CMP-gather trace order to a file
+
+        Parameters
+        ----------
+        filename: str
+            Path to the output file.
+        fmt: str, optional
+            If 'ascii' (default), a space-delimited text file is written
+            with columns: bin, offset, line, point, cable_id, chan,
+            rec_rowid. If 'npy', the receiver rowids are written to a
+            NumPy ``.npy`` file, in sorted order.
+        """
+        rowid, bins, offsets = self.get_cmp_sort_order()
+
+        logging.info('Writing CMP sort order for {:} traces to: {:}',
+                len(rowid), filename)
+
+        if fmt == 'npy':
+            np.save(filename, rowid)
+            return
+        elif fmt != 'ascii':
+            raise ValueError("fmt must be 'ascii' or 'npy'")
+
+        sql = """SELECT rowid, line, point, cable_id, chan
+            FROM '{:}'""".format(self.REC_PT_TABLE)
+        rec = pd.DataFrame(self.execute(sql).fetchall(),
+                columns=['rec_rowid', 'line', 'point', 'cable_id', 'chan'])
+        rec = rec.set_index('rec_rowid').loc[rowid]
+
+        dat = pd.DataFrame({'bin': bins, 'offset': offsets,
+            'line': rec['line'].values, 'point': rec['point'].values,
+            'cable_id': rec['cable_id'].values, 'chan': rec['chan'].values,
+            'rec_rowid': rowid})
+        dat.to_csv(filename, sep=' ', index=False, float_format='%.2f',
+                columns=['bin', 'offset', 'line', 'point', 'cable_id',
+                    'chan', 'rec_rowid'])
+
+    def _get_changed_bins(self, table, ibin, x, y, bin_shape=None,
+            inline_dimension=None, crossline_dimension=None, tol=1e-3,
+            bin_center_field='bin_center'):
+        """
+        Compare new bin centers with those in an existing bin model
+
+        Bin polygons are oriented towards the next bin center, or from the
+        previous bin center for the last bin, so a bin is also considered
+        changed if that bin moved or is a different bin.
+
+        Returns
+        -------
+        moved: numpy.ndarray
+            Boolean array that is `True` for new bins that were added or
+            changed.
+        removed: numpy.ndarray
+            Bin numbers in the existing model that are not in the new
+            model.
+        """
+        x0, y0 = self._get_point_sql(bin_center_field)
+        sql = """SELECT bin, {:}, {:} FROM '{:}' ORDER BY bin"""\
+                .format(x0, y0, table)
+        dat = np.asarray(self.execute(sql).fetchall(), dtype=float)
+        if len(dat) == 0:
+            dat = np.zeros((0, 3))
+        ob = dat[:, 0].astype(int)
+
+        common = np.in1d(ibin, ob)
+        j = np.searchsorted(ob, ibin[common])
+        moved = np.ones(len(ibin), dtype=bool)
+        moved[common] = (np.abs(x[common] - dat[j, 1]) > tol)\
+                | (np.abs(y[common] - dat[j, 2]) > tol)
+
+        model = self._get_cmp_model_version() or {}
+        if model.get('bin_shape', None) != bin_shape:
+            moved[:] = True
+        elif (bin_shape is not None)\
+                and ((model['inline_dimension'] != inline_dimension)
+                or (model['crossline_dimension'] != crossline_dimension)):
+            moved[:] = True
+        elif (bin_shape is not None) and (len(moved) > 1):
+            _moved = moved.copy()
+            moved[0:-1] = _moved[0:-1] | _moved[1:]
+            moved[-1] = _moved[-1] | _moved[-2]
+
+            # bins that are oriented on a different bin, e.g., a new last
+            # bin after the old last bin was removed
+            if len(ob) > 1:
+                partner = np.append(ibin[1:], ibin[-2])
+                _partner = np.append(ob[1:], ob[-2])
+                moved[common] |= partner[common] != _partner[j]
+            else:
+                moved[common] = True
+
+        removed = ob[~np.in1d(ob, ibin)]
+
+        return moved, removed
 
     def create_bin_line(self, easting, northing, spacing=6.25, bin0=1000,
             if_exists='fail', bin_center_field='bin_center',
@@ -120,21 +1121,54 @@ class P190Binning(object):
         """
         Evenly distribute bins along a line
 
-        TODO docs!
+        Each call records a new version of the bin model in the table set
+        by `CMP_MODEL_VERSIONS`, with the bins that changed in the table
+        set by `CMP_MODEL_CHANGES`.
+
+        Parameters
+        ----------
+        easting, northing: array_like
+            Coordinates of the line to distribute bins along.
+        spacing: float, optional
+            Distance between bin centers. Default is 6.25.
+        bin0: int, optional
+            Number of the first bin. Default is 1000.
+        if_exists: str, optional
+            Determines what to do if the bin model table exists. If 'fail'
+            (default), raises a :class:`DatabaseError`. If 'replace', the
+            table is replaced. If 'append', bins are added to the table.
+            If 'update', only bins that were added, moved, or removed are
+            changed in the table, and
+            :meth:`~P190Binning.reassign_cmp_bins` can be used to update
+            CMP assignments for those bins only.
+        bin_shape: str, optional
+            If 'rect', rectangular bin polygons are built with dimensions
+            set by the ``inline_dimension`` (default is `spacing`) and
+            ``crossline_dimension`` (default is 500) keyword arguments.
+            Default (`None`) is to only create bin centers. Bin polygons
+            are not stored in numeric mode (``spatial=False``).
+        interp_kind: str or int, optional
+            Kind of interpolation between line coordinates. See
+            :func:`~rockfish2.navigation.utils.cartesian.distribute`.
         """
         table = kwargs.pop('cmp_model', self.CMP_MODEL)
         inline_dimension = kwargs.pop('inline_dimension', spacing)
         crossline_dimension = kwargs.pop('crossline_dimension', 500)
+        tol = kwargs.pop('tol', 1e-3)
+
+        update = (if_exists == 'update') and (table in self.tables)
 
         if if_exists == 'replace':
+            self._drop_spatial_index_if_exists(table, bin_polygon_field)
             sql = "DROP TABLE IF EXISTS {:}".format(table)
             self.execute(sql)
 
-        if (table in self.tables) and (if_exists != 'append'):
+        if (table in self.tables) and (if_exists not in ['append',
+            'update']):
 
             msg = "Table '{:}' exists.".format(table)
-            msg += " To replace or append existing data,"
-            msg += " use if_exists='replace' or 'append'."
+            msg += " To replace, append, or update existing data,"
+            msg += " use if_exists='replace', 'append', or 'update'."
 
             raise DatabaseError(msg)
 
@@ -145,10 +1179,9 @@ class P190Binning(object):
         self.execute(sql)
 
         geomfields = [bin_center_field]
-        if bin_center_field not in self._get_fields(table):
-            self._add_geom_pointxy(table, bin_center_field)
+        self._add_geom_pointxy(table, bin_center_field)
 
-        if bin_shape is not None:
+        if (bin_shape is not None) and self.SPATIAL:
             geomfields += [bin_polygon_field]
             if bin_polygon_field not in self._get_fields(table):
                 self._add_geom_polyxy(table, bin_polygon_field)
@@ -158,13 +1191,16 @@ class P190Binning(object):
         logging.info('...spacing = {:}', spacing)
         offset, x, y = self._create_bin_line(easting, northing, spacing,
                 interp_kind=interp_kind)
-        pts = ['POINT({:} {:})'.format(_x, _y) for _x, _y in zip(x, y)]
-        logging.info('...defined {:} bin centers', len(pts))
+        logging.info('...defined {:} bin centers', len(x))
         ibin = bin0 + np.arange(len(x))
-        values = [ibin, offset, pts]
+        if self.SPATIAL:
+            pts = ['POINT({:} {:})'.format(_x, _y) for _x, _y in zip(x, y)]
+            values = [ibin, offset, pts]
+        else:
+            values = [ibin, offset, x, y]
 
         # add bin outlines
-        if bin_shape == 'rect':
+        if (bin_shape == 'rect') and self.SPATIAL:
             logging.info('...building {:}x{:} rectangular bins...',
                     inline_dimension, crossline_dimension)
             _polys = self._calc_bin_rectangles(x, y, inline_dimension,
@@ -175,11 +1211,34 @@ class P190Binning(object):
             logging.info('......defined {:} bin shapes', len(polys))
             values += [polys]
 
+        if update:
+            moved, removed = self._get_changed_bins(table, ibin, x, y,
+                    bin_shape=bin_shape, inline_dimension=inline_dimension,
+                    crossline_dimension=crossline_dimension, tol=tol,
+                    bin_center_field=bin_center_field)
+            changed = np.concatenate((ibin[moved], removed))
+
+            logging.info('...updating {:} of {:} bins', len(changed),
+                    len(ibin))
+            sql = "DELETE FROM '{:}' WHERE bin=?".format(table)
+            self.executemany(sql, [(int(b), ) for b in changed])
+
+            values = [np.asarray(v)[moved].tolist() for v in values]
+        else:
+            changed = ibin
+
         # add bins to database
         sql = self._get_SQL_insert_all_fields_with_geomfromtext(table,
                 geomfields=geomfields)
 
         self.executemany(sql, zip(*values))
+
+        if table == self.CMP_MODEL:
+            self._add_cmp_model_version(changed, spacing=spacing, bin0=bin0,
+                    nbin=self.count(table), bin_shape=bin_shape,
+                    inline_dimension=inline_dimension,
+                    crossline_dimension=crossline_dimension)
+
         self.commit()
 
     def create_bin_line_from_midpoints(self, step=1, **kwargs):
@@ -198,18 +1257,25 @@ class P190Binning(object):
         """
         logging.info('Selecting midpoint coordinates...')
 
-        sql = """DROP VIEW IF EXISTS temp_mp_line"""
-        self.execute(sql)
+        if self.SPATIAL:
+            sql = """DROP VIEW IF EXISTS temp_mp_line"""
+            self.execute(sql)
 
-        sql = """CREATE TEMPORARY VIEW temp_mp_line AS SELECT
-            Line_Interpolate_Point({self.REC_LINE_VIEW}.rec_line, 0.5)
-                AS pt FROM {self.REC_LINE_VIEW}
-                ORDER BY {self.REC_LINE_VIEW}.point
-            """.format(**locals())
-        self.execute(sql)
+            sql = """CREATE TEMPORARY VIEW temp_mp_line AS SELECT
+                Line_Interpolate_Point({self.REC_LINE_VIEW}.rec_line, 0.5)
+                    AS pt FROM {self.REC_LINE_VIEW}
+                    ORDER BY {self.REC_LINE_VIEW}.point
+                """.format(**locals())
+            self.execute(sql)
 
-        sql = """SELECT X(pt), Y(pt) FROM temp_mp_line"""
-        dat = self.execute(sql).fetchall()
+            sql = """SELECT X(pt), Y(pt) FROM temp_mp_line"""
+            dat = self.execute(sql).fetchall()
+        else:
+            # center of each receiver line, in NumPy
+            keys, lines = self.read_rec_lines()
+            iline = np.arange(len(lines))
+            x, y = lines.xy(iline, lines.length / 2.)
+            dat = zip(x.tolist(), y.tolist())
 
         easting = [dat[i][0] for i in range(0, len(dat) - 1, step)]
         northing = [dat[i][1] for i in range(0, len(dat) - 1, step)]
@@ -0,0 +1,395 @@
+"""
+Survey catalog for P190 data partitioned across database files
+"""
+import os
+import time
+import multiprocessing
+import pandas as pd
+from rockfish2 import logging
+from rockfish2.db.backends.sqlite3.connection import Connection,\
+        DatabaseError
+from rockfish2.navigation.ukooa.p190.p190 import P190
+
+
+def _read_p190_worker(args):
+    """
+    Read a P190 file into a shard using a new connection
+
+    Run by worker processes in :meth:`P190Catalog.read_p190`.
+    """
+    name, database, filename, kwargs = args
+
+    t0 = time.time()
+    db = P190(database=database, **kwargs)
+    try:
+        db.read_p190(filename)
+    finally:
+        db.close()
+
+    return name, time.time() - t0
+
+def _query_worker(args):
+    """
+    Execute a query on a shard using a new connection
+
+    Run by worker processes in :meth:`P190Catalog.query`.
+    """
+    name, database, sql, params, spatial = args
+
+    db = Connection(database=database, spatial=spatial)
+    try:
+        cur = db.execute(sql, params)
+        fields = [d[0] for d in cur.description]
+        rows = [tuple(row) for row in cur.fetchall()]
+    finally:
+        db.close()
+
+    return name, fields, rows
+
+
+class P190Catalog(Connection):
+    """
+    Catalog of P190 databases, with one database file per line or shard
+
+    The catalog database stores only the name and filename of each shard.
+    Shards are regular :class:`~rockfish2.navigation.ukooa.p190.p190.P190`
+    databases, so per-line processing can open and write to shards
+    independently. Survey-wide queries either attach shards to the catalog
+    connection and read union views (:meth:`create_union_view`), or run
+    on all shards in parallel and combine the results (:meth:`query`).
+
+    Parameters
+    ----------
+    database: str, optional
+        Filename of the catalog database. Default is ``':memory:'``.
+    shard_dir: str, optional
+        Directory for new shard files. Default is the directory of the
+        catalog database.
+    shard_table: str, optional
+        Name of the table of shards. Default is ``'p190_shards'``.
+    spatial: bool, optional
+        If `True`, load SpatiaLite for the catalog connection. Default is
+        `False`.
+    **kwargs
+        Keyword arguments for
+        :class:`~rockfish2.navigation.ukooa.p190.p190.P190` when opening
+        shards.
+    """
+    def __init__(self, database=':memory:', shard_dir=None,
+            shard_table='p190_shards', spatial=False, **kwargs):
+
+        Connection.__init__(self, database=database, spatial=spatial)
+
+        self.SHARD_TABLE = shard_table
+        if shard_dir is None:
+            shard_dir = os.path.dirname(os.path.abspath(self.filename))\
+                    if self.filename else os.getcwd()
+        self.SHARD_DIR = shard_dir
+        self.SPATIAL = spatial
+        self.shard_kwargs = kwargs
+
+        # attached shards, as {name: schema}
+        self._attached = {}
+
+        self._create_table_shards()
+
+    def _create_table_shards(self):
+
+        sql = """CREATE TABLE IF NOT EXISTS '{self.SHARD_TABLE}' (
+            name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            source_file TEXT,
+            PRIMARY KEY (name))""".format(**locals())
+        self.execute(sql)
+
+    def _get_shards(self):
+        """
+        Returns a list of shard names in the catalog.
+        """
+        sql = "SELECT name FROM '{:}' ORDER BY name".format(self.SHARD_TABLE)
+        return [str(d[0]) for d in self.execute(sql)]
+
+    shards = property(_get_shards)
+
+    def get_shard_filename(self, name):
+        """
+        Get the database filename for a shard
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard.
+
+        Returns
+        -------
+        filename: str
+            Path to the shard database.
+        """
+        sql = "SELECT filename FROM '{:}' WHERE name=?"\
+                .format(self.SHARD_TABLE)
+        row = self.execute(sql, (name, )).fetchone()
+        if row is None:
+            raise DatabaseError("No shard named '{:}' in the catalog."\
+                    .format(name))
+
+        return str(row[0])
+
+    def add_shard(self, name, filename=None, source_file=None):
+        """
+        Add a shard to the catalog
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard (e.g., the sail line name).
+        filename: str, optional
+            Path to the shard database. Default is ``<name>.sqlite`` in the
+            directory set by `SHARD_DIR`.
+        source_file: str, optional
+            Path to the P190 file the shard was read from.
+
+        Returns
+        -------
+        filename: str
+            Path to the shard database.
+        """
+        if filename is None:
+            filename = os.path.join(self.SHARD_DIR, name + '.sqlite')
+
+        sql = """INSERT OR REPLACE INTO '{:}' (name, filename, source_file)
+            VALUES (?, ?, ?)""".format(self.SHARD_TABLE)
+        self.execute(sql, (name, filename, source_file))
+        self.commit()
+
+        return filename
+
+    def remove_shard(self, name, delete=False):
+        """
+        Remove a shard from the catalog
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard.
+        delete: bool, optional
+            If `True`, also delete the shard database file. Default is
+            `False`.
+        """
+        filename = self.get_shard_filename(name)
+        if name in self._attached:
+            self.detach_shard(name)
+
+        sql = "DELETE FROM '{:}' WHERE name=?".format(self.SHARD_TABLE)
+        self.execute(sql, (name, ))
+        self.commit()
+
+        if delete and os.path.isfile(filename):
+            os.remove(filename)
+
+    def open_shard(self, name):
+        """
+        Open a shard as a P190 database
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard.
+
+        Returns
+        -------
+        p190: :class:`~rockfish2.navigation.ukooa.p190.p190.P190`
+            New connection to the shard database.
+        """
+        return P190(database=self.get_shard_filename(name),
+                **self.shard_kwargs)
+
+    def read_p190(self, filenames, names=None, nproc=1):
+        """
+        Read P190 files into new or existing shards
+
+        Each file is read into its own shard database, so files can be
+        read in parallel without sharing a writer.
+
+        Parameters
+        ----------
+        filenames: list
+            Paths to P190 files to read.
+        names: list, optional
+            Shard name for each file. Default is to use the file name
+            without its extension.
+        nproc: int, optional
+            Number of processes to read files with. Default is 1. If
+            `None`, uses the number of CPUs.
+        """
+        if isinstance(filenames, basestring):
+            filenames = [filenames]
+        if names is None:
+            names = [os.path.splitext(os.path.basename(f))[0]
+                    for f in filenames]
+        assert len(names) == len(filenames),\
+                'names must have the same length as filenames'
+
+        args = []
+        for name, filename in zip(names, filenames):
+            if name in self.shards:
+                database = self.get_shard_filename(name)
+            else:
+                database = self.add_shard(name, source_file=filename)
+            args.append((name, database, filename, self.shard_kwargs))
+
+        if nproc is None:
+            nproc = multiprocessing.cpu_count()
+        nproc = min(nproc, len(args))
+
+        logging.info('Reading {:} P190 files into shards with {:}'
+                ' process(es)...', len(args), nproc)
+        if nproc > 1:
+            pool = multiprocessing.Pool(processes=nproc)
+            try:
+                for name, elapsed in pool.imap_unordered(_read_p190_worker,
+                        args):
+                    logging.info('...read {:} in {:.3f} s', name, elapsed)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for _args in args:
+                name, elapsed = _read_p190_worker(_args)
+                logging.info('...read {:} in {:.3f} s', name, elapsed)
+
+    def attach_shard(self, name):
+        """
+        Attach a shard database to the catalog connection
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard.
+
+        Returns
+        -------
+        schema: str
+            Schema name of the attached database, for use in SQL as
+            ``schema.table``.
+        """
+        if name in self._attached:
+            return self._attached[name]
+
+        schema = 'shard_{:}'.format(len(self._attached))
+        while schema in self._attached.values():
+            schema += '_'
+
+        sql = "ATTACH DATABASE ? AS '{:}'".format(schema)
+        self.execute(sql, (self.get_shard_filename(name), ))
+        self._attached[name] = schema
+
+        return schema
+
+    def detach_shard(self, name):
+        """
+        Detach a shard database from the catalog connection
+
+        Parameters
+        ----------
+        name: str
+            Name of the shard.
+        """
+        schema = self._attached.pop(name)
+        self.execute("DETACH DATABASE '{:}'".format(schema))
+
+    def create_union_view(self, table, shards=None, view=None):
+        """
+        Create a temporary view of a table from all shards
+
+        Shards are attached as needed. SQLite limits the number of
+        attached databases (10 by default), so use :meth:`query` for
+        surveys with more shards.
+
+        Parameters
+        ----------
+        table: str
+            Name of the table or view in each shard.
+        shards: list, optional
+            Names of the shards to include. Default is all shards.
+        view: str, optional
+            Name of the new view. Default is `table`.
+
+        Returns
+        -------
+        view: str
+            Name of the new view, with a ``shard`` column followed by all
+            columns from `table`.
+        """
+        if shards is None:
+            shards = self.shards
+        if view is None:
+            view = table
+
+        selects = []
+        for name in shards:
+            schema = self.attach_shard(name)
+            selects.append("SELECT '{:}' AS shard, * FROM {:}.'{:}'"\
+                    .format(name, schema, table))
+
+        self.execute("DROP VIEW IF EXISTS temp.'{:}'".format(view))
+        sql = "CREATE TEMP VIEW '{:}' AS {:}".format(view,
+                ' UNION ALL '.join(selects))
+        self.execute(sql)
+
+        return view
+
+    def query(self, sql, params=(), shards=None, nproc=1):
+        """
+        Execute a query on shards and combine the results
+
+        The query is executed on each shard with a new connection, in
+        parallel if `nproc` > 1.
+
+        Parameters
+        ----------
+        sql: str
+            SELECT statement to execute on each shard.
+        params: tuple, optional
+            Parameters for the query.
+        shards: list, optional
+            Names of the shards to query. Default is all shards.
+        nproc: int, optional
+            Number of processes to query shards with. Default is 1. If
+            `None`, uses the number of CPUs.
+
+        Returns
+        -------
+        data: :class:`pandas.DataFrame`
+            Rows from all shards, with a ``shard`` column followed by the
+            query columns, in the order of `shards`.
+        """
+        if shards is None:
+            shards = self.shards
+
+        args = [(name, self.get_shard_filename(name), sql, tuple(params),
+            self.SPATIAL) for name in shards]
+
+        if nproc is None:
+            nproc = multiprocessing.cpu_count()
+        nproc = max(min(nproc, len(args)), 1)
+
+        if nproc > 1:
+            pool = multiprocessing.Pool(processes=nproc)
+            try:
+                results = pool.map(_query_worker, args)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_query_worker(_args) for _args in args]
+
+        frames = []
+        for name, fields, rows in results:
+            dat = pd.DataFrame(rows, columns=fields)
+            dat.insert(0, 'shard', name)
+            frames.append(dat)
+
+        if len(frames) == 0:
+            return pd.DataFrame(columns=['shard'])
+
+        return pd.concat(frames, ignore_index=True)
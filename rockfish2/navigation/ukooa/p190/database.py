@@ -3,9 +3,18 @@ SQLite database tools for working with P190 data
 """
 import os
 import warnings
+import numpy as np
+import pandas as pd
 from rockfish2 import logging
 from rockfish2.db.backends.sqlite3.connection import Connection,\
         DatabaseIntegrityError
+from rockfish2.navigation.utils.pointindex import PointIndex
+from rockfish2.navigation.utils.compact import pack_channels,\
+        unpack_channels
+from rockfish2.navigation.utils.binline import LineSet
+from rockfish2.navigation.utils.sps import SPS_EXTENSIONS, SPS_HEADER,\
+        POINT_FORMAT, RELATION_FORMAT, format_records, format_time,\
+        get_relation_runs
 
 
 COORD_IDS = [#(id, desc)
@@ -19,6 +28,76 @@ COORD_IDS = [#(id, desc)
         ('E', 'Echo Sounder'),
         ('Z', 'Other, defined in H0800')]
 
+# keyword arguments that are passed to the connection
+CONNECTION_KWARGS = ['check_same_thread', 'in_memory', 'memory_budget',
+        'estimated_size']
+
+# approximate ratio of database size to P190 file size
+DB_SIZE_FACTOR = 4.
+
+def get_point_sql(column, alias=None, spatial=True):
+    """
+    Returns SQL expressions for the coordinates of a point column
+
+    Parameters
+    ----------
+    column: str
+        Name of the point column.
+    alias: str, optional
+        Alias of the table in the query.
+    spatial: bool, optional
+        If `True` (default), the column is a SpatiaLite geometry. If
+        `False`, the point is stored in ``<column>_x`` and ``<column>_y``
+        columns.
+
+    Returns
+    -------
+    x, y: str
+        SQL expressions for the x and y coordinates.
+
+    Examples
+    --------
+    >>> get_point_sql('mid_pt', alias='r')
+    ('X(r.mid_pt)', 'Y(r.mid_pt)')
+    >>> get_point_sql('mid_pt', alias='r', spatial=False)
+    ('r.mid_pt_x', 'r.mid_pt_y')
+    """
+    if alias:
+        column = '{:}.{:}'.format(alias, column)
+
+    if spatial:
+        return 'X({:})'.format(column), 'Y({:})'.format(column)
+    else:
+        return '{:}_x'.format(column), '{:}_y'.format(column)
+
+def _split_wkt_point(wkt):
+    """
+    Returns the x and y coordinates from a WKT point
+    """
+    x, y = wkt[wkt.index('(') + 1:wkt.rindex(')')].split()
+
+    return [float(x), float(y)]
+
+
+def estimate_db_size(filenames):
+    """
+    Estimate the size of a database built from P190 files
+
+    Parameters
+    ----------
+    filenames: str or list
+        Paths to P190 files.
+
+    Returns
+    -------
+    size: float
+        Estimated database size, in bytes.
+    """
+    if isinstance(filenames, basestring):
+        filenames = [filenames]
+
+    return DB_SIZE_FACTOR * sum([os.path.getsize(f) for f in filenames])
+
 
 class P190Database(Connection):
 
@@ -30,11 +109,24 @@ class P190Database(Connection):
             rec_line_table='p190_rec_lines',
             rec_line_view='p190_rec_lines_view',
             src_line_view='p190_src_lines_view',
-            src_rec_view='p190_src_rec_view', **kwargs):
+            src_rec_view='p190_src_rec_view',
+            rec_compact_table='p190_rec_compact', spatial=True,
+            minimal_srs=False, table_stats=False, **kwargs):
 
         new = not os.path.isfile(database)
 
-        Connection.__init__(self, database=database, spatial=True)
+        # only keep the SRIDs used by this database in spatial_ref_sys
+        srids = None
+        if minimal_srs:
+            srids = [input_srid, kwargs.get('output_srid', input_srid),
+                    geographic_srid]
+
+        # keyword arguments for the connection
+        _kwargs = dict([(k, kwargs.pop(k)) for k in CONNECTION_KWARGS
+            if k in kwargs])
+
+        Connection.__init__(self, database=database, spatial=spatial,
+                srids=srids, **_kwargs)
 
         #XXX this should be handled by spatial=True
         #self._init_spatiallite()
@@ -51,10 +143,29 @@ class P190Database(Connection):
         self.REC_LINE_VIEW = rec_line_view
         self.SRC_LINE_VIEW = src_line_view
         self.SRC_REC_VIEW = src_rec_view
+        self.REC_COMPACT_TABLE = rec_compact_table
+        self.SPATIAL = spatial
+        self.TABLE_STATS = table_stats
 
         if new:
             self._create_tables_views()
 
+        if self.TABLE_STATS:
+            self._track_table_stats()
+
+    def _track_table_stats(self):
+        """
+        Maintain row counts for count() in tables that are not yet tracked
+
+        Counts for tables that are already tracked are kept. Recursive
+        triggers, which update counts for replaced rows, are turned on for
+        each connection.
+        """
+        self.execute('PRAGMA recursive_triggers = ON')
+        for table in [self.HDR_TABLE, self.COORD_TABLE, self.REC_PT_TABLE]:
+            if not self._is_tracked(table):
+                self.track_stats(table)
+
     def _init_spatiallite(self):
 
         #XXX this should be handled by db.backends.sqlite3.connection
@@ -64,8 +175,39 @@ class P190Database(Connection):
         if "spatial_ref_sys" not in self.tables:
             self.execute('SELECT InitSpatialMetadata()')
 
+    def _get_point_sql(self, column, alias=None):
+        """
+        Returns SQL expressions for the coordinates of a point column
+        """
+        return get_point_sql(column, alias=alias, spatial=self.SPATIAL)
+
+    def _get_point_fields(self, name):
+        """
+        Returns the names of the fields that store a point
+        """
+        if self.SPATIAL:
+            return [name]
+        else:
+            return ['{:}_x'.format(name), '{:}_y'.format(name)]
+
+    def _has_point(self, table, name):
+        """
+        Returns `True` if a table has a point column
+        """
+        return self._get_point_fields(name)[0] in self._get_fields(table)
+
     def _add_geom_pointxy(self, table, name):
 
+        if not self.SPATIAL:
+            # numeric mode: store points as x, y columns
+            fields = self._get_fields(table)
+            for f in self._get_point_fields(name):
+                if f not in fields:
+                    sql = "ALTER TABLE '{:}' ADD COLUMN {:} REAL"\
+                            .format(table, f)
+                    self.execute(sql)
+            return
+
         if name in self._get_fields(table):
             return
 
@@ -75,7 +217,7 @@ class P190Database(Connection):
 
     def _add_geom_polyxy(self, table, name):
 
-        if name in self._get_fields(table):
+        if (not self.SPATIAL) or (name in self._get_fields(table)):
             return
 
         sql = """SELECT addGeometryColumn('{table}', '{name}',
@@ -84,7 +226,7 @@ class P190Database(Connection):
 
     def _add_geom_linestringxy(self, table, name):
 
-        if name in self._get_fields(table):
+        if (not self.SPATIAL) or (name in self._get_fields(table)):
             return
 
         sql = """SELECT addGeometryColumn('{table}', '{name}',
@@ -106,6 +248,9 @@ class P190Database(Connection):
         rebuild: bool, optional
             Determines whether or not to force a rebuild the spatial index
         """
+        if not self.SPATIAL:
+            return
+
         exists = "idx_{:}_{:}".format(table, column) in self.tables
         
         if rebuild and exists:
@@ -134,13 +279,16 @@ class P190Database(Connection):
         self._create_view_point_list()
         self._create_table_rec_pt()
         self._create_table_rec_line
-        self._create_view_rec_line()
-        self._create_view_src_line()
-        self._create_view_src_rec()
+        if self.SPATIAL:
+            self._create_view_rec_line()
+            self._create_view_src_line()
+            self._create_view_src_rec()
 
     def _create_table_coord(self):
 
+        # explicit rowid, which is not renumbered by VACUUM
         sql = """CREATE TABLE IF NOT EXISTS '{:}' (
+            id INTEGER PRIMARY KEY,
             line TEXT NOT NULL,
             point INTEGER NOT NULL,
             day_of_year REAL NOT NULL,
@@ -151,7 +299,7 @@ class P190Database(Connection):
             water_depth_or_elev REAL,
             spare TEXT,
             spare2 TEXT,
-            PRIMARY KEY (line, point, day_of_year, record_id, vessel_id,
+            UNIQUE (line, point, day_of_year, record_id, vessel_id,
                 source_id),
             FOREIGN KEY (record_id) REFERENCES {:}(record_id));
             """.format(self.COORD_TABLE, self.COORD_ID_TABLE)
@@ -187,14 +335,16 @@ class P190Database(Connection):
 
     def _create_table_rec_pt(self):
 
+        # explicit rowid, which is not renumbered by VACUUM
         sql = """CREATE TABLE IF NOT EXISTS '{self.REC_PT_TABLE}' (
+            id INTEGER PRIMARY KEY,
             line TEXT NOT NULL,
             point INTEGER NOT NULL,
             day_of_year REAL NOT NULL,
             chan INTEGER NOT NULL,
             cable_id INTEGER NOT NULL,
             cable_depth REAL DEFAULT 0.0,
-            PRIMARY KEY (line, point, day_of_year, chan, cable_id));
+            UNIQUE (line, point, day_of_year, chan, cable_id));
             """.format(**locals())
         self.execute(sql)
         
@@ -312,7 +462,8 @@ class P190Database(Connection):
         column: str
             Name of geometry field to index
         """
-        if "idx_{:}_{:}".format(table, column) not in self.tables:
+        if (not self.SPATIAL)\
+                or ("idx_{:}_{:}".format(table, column) not in self.tables):
             return
 
         sql = "SELECT DisableSpatialIndex('{:}', '{:}')"\
@@ -336,14 +487,17 @@ class P190Database(Connection):
         return sql
 
     def _get_SQL_insert_all_fields_with_geomfromtext(self, table,
-            geomfields=['geom'], **kwargs):
+            geomfields=['geom'], exclude=[], **kwargs):
 
-        fields = [f for f in self._get_fields(table) if f not in geomfields]
+        fields = [f for f in self._get_fields(table)
+                if f not in geomfields + exclude]
         values = ['?' for f in fields]
 
-        fields += geomfields
-        values += ['GeomFromText(?, {:})'.format(self.INPUT_SRID)\
-                for f in geomfields]
+        # numeric mode: points are x, y fields, which are already included
+        if self.SPATIAL:
+            fields += geomfields
+            values += ['GeomFromText(?, {:})'.format(self.INPUT_SRID)\
+                    for f in geomfields]
 
         if len(kwargs) > 0:
             idx = {}
@@ -373,7 +527,7 @@ class P190Database(Connection):
     def _get_SQL_insert_coord(self):
 
         return self._get_SQL_insert_all_fields_with_geomfromtext(
-                self.COORD_TABLE)
+                self.COORD_TABLE, exclude=['id'])
 
     SQL_INSERT_COORD = property(fget=_get_SQL_insert_coord)
 
@@ -386,7 +540,7 @@ class P190Database(Connection):
     def _get_SQL_insert_rec(self):
 
         return self._get_SQL_insert_all_fields_with_geomfromtext(
-                self.REC_PT_TABLE, geomfields=['rec_pt'])
+                self.REC_PT_TABLE, geomfields=['rec_pt'], exclude=['id'])
 
     SQL_INSERT_REC = property(fget=_get_SQL_insert_rec)
 
@@ -447,19 +601,259 @@ class P190Database(Connection):
                 self.execute(hdr_sql, self._parse_hdr(line), warn_only=True)
             elif line[0] in coord_ids:
                 coords = self._parse_coord(line)
-                self.execute(coord_sql, coords, warn_only=True)
+                if self.SPATIAL:
+                    self.execute(coord_sql, coords, warn_only=True)
+                else:
+                    self.execute(coord_sql, coords[:-1]
+                            + _split_wkt_point(coords[-1]), warn_only=True)
 
                 # update rec sql with line, point, day, hour, min, sec
                 rec_sql = self._get_SQL_insert_all_fields_with_geomfromtext(
                         self.REC_PT_TABLE, line="'{:}'".format(coords[0]),
                         point=coords[1], day_of_year=coords[2],
-                        geomfields=['rec_pt'])
+                        geomfields=['rec_pt'], exclude=['id'])
             elif line[0] == 'R':
-                self.executemany(rec_sql, self._parse_rec(line),
-                        warn_only=True)
+                recs = self._parse_rec(line)
+                if not self.SPATIAL:
+                    recs = [r[:-1] + _split_wkt_point(r[-1]) for r in recs]
+                self.executemany(rec_sql, recs, warn_only=True)
         
         self.commit()
 
+    def _read_src_rec_coords(self):
+        """
+        Read source and receiver coordinates for each receiver
+
+        Returns
+        -------
+        rowid, sx, sy, rx, ry: numpy.ndarray
+            Receiver rowids and the source and receiver coordinates.
+        """
+        sql = """SELECT r.rowid, {:}, {:} FROM '{:}' AS r INNER JOIN '{:}' AS s
+            ON r.line=s.line AND r.point=s.point
+            AND r.day_of_year=s.day_of_year WHERE s.record_id='S'
+            """.format(', '.join(self._get_point_sql('geom', 's')),
+                    ', '.join(self._get_point_sql('rec_pt', 'r')),
+                    self.REC_PT_TABLE, self.COORD_TABLE)
+        dat = np.asarray(self.execute(sql).fetchall(), dtype=float)
+        if len(dat) == 0:
+            dat = np.zeros((0, 5))
+
+        return (dat[:, 0].astype(np.int64), dat[:, 1], dat[:, 2],
+                dat[:, 3], dat[:, 4])
+
+    def build_point_index(self, points='source', leafsize=16):
+        """
+        Build an in-memory spatial index of source, receiver, or midpoint
+        locations
+
+        Parameters
+        ----------
+        points: str, optional
+            Points to index: ``'source'`` for source positions in the table
+            set by `COORD_TABLE`, or ``'receiver'`` or ``'midpoint'`` for
+            receiver positions or midpoints in the table set by
+            `REC_PT_TABLE`. Default is ``'source'``.
+        leafsize: int, optional
+            Number of points at which the KD-tree switches to brute force.
+            Default is 16.
+
+        Returns
+        -------
+        index: :class:`~rockfish2.navigation.utils.pointindex.PointIndex`
+            Point index with ids set to rowids in the source table.
+        """
+        if points == 'source':
+            x, y = self._get_point_sql('geom')
+            sql = """SELECT rowid, {:}, {:} FROM '{:}'
+                WHERE record_id='S'""".format(x, y, self.COORD_TABLE)
+        elif points in ['receiver', 'midpoint']:
+            x, y = self._get_point_sql({'receiver': 'rec_pt',
+                'midpoint': 'mid_pt'}[points])
+            sql = """SELECT rowid, {:}, {:} FROM '{:}'
+                WHERE {:} IS NOT NULL""".format(x, y, self.REC_PT_TABLE, x)
+        else:
+            raise ValueError("points must be one of 'source', 'receiver',"
+                    " or 'midpoint'.")
+
+        logging.info('Building {:} point index...', points)
+        dat = np.asarray(self.execute(sql).fetchall(), dtype=float)
+        if len(dat) == 0:
+            dat = np.zeros((0, 3))
+        logging.info('...indexed {:} points', len(dat))
+
+        return PointIndex(dat[:, 1], dat[:, 2],
+                ids=dat[:, 0].astype(np.int64), leafsize=leafsize)
+
+    def _create_table_rec_compact(self):
+
+        sql = """CREATE TABLE IF NOT EXISTS '{self.REC_COMPACT_TABLE}' (
+            line TEXT NOT NULL,
+            point INTEGER NOT NULL,
+            day_of_year REAL NOT NULL,
+            cable_id INTEGER NOT NULL,
+            src_x REAL NOT NULL,
+            src_y REAL NOT NULL,
+            chan0 INTEGER NOT NULL,
+            nchan INTEGER NOT NULL,
+            offsets BLOB NOT NULL,
+            depths BLOB NOT NULL,
+            PRIMARY KEY (line, point, day_of_year, cable_id));
+            """.format(**locals())
+        self.execute(sql)
+
+    def _read_rec_pts_with_src(self):
+        """
+        Read receivers with the position of their source
+        """
+        sql = """SELECT r.line, r.point, r.day_of_year, r.cable_id, r.chan,
+            r.cable_depth, {:}, {:} FROM '{:}' AS r INNER JOIN '{:}' AS s
+            ON r.line=s.line AND r.point=s.point
+            AND r.day_of_year=s.day_of_year WHERE s.record_id='S'"""\
+                    .format(', '.join(self._get_point_sql('rec_pt', 'r')),
+                        ', '.join(self._get_point_sql('geom', 's')),
+                        self.REC_PT_TABLE, self.COORD_TABLE)
+
+        rec = pd.DataFrame(self.execute(sql).fetchall(),
+                columns=['line', 'point', 'day_of_year', 'cable_id', 'chan',
+                    'cable_depth', 'x', 'y', 'src_x', 'src_y'])
+        assert not rec.duplicated(['line', 'point', 'day_of_year',
+            'cable_id', 'chan']).any(),\
+                    'Receivers match more than one source'
+
+        # blank depths are stored as text
+        rec['cable_depth'] = pd.to_numeric(rec['cable_depth'],
+                errors='coerce')
+
+        return rec
+
+    def create_compact_receivers(self):
+        """
+        Store receiver positions as integer offsets from the source
+
+        Receivers for each shot and cable are stored as one row in the
+        table set by `REC_COMPACT_TABLE`, replacing any existing rows.
+        Receiver positions are stored as int32 centimeter offsets from the
+        source position and depths as int32 centimeters, packed in blobs
+        ordered by channel (see
+        :func:`~rockfish2.navigation.utils.compact.pack_channels`).
+        Positions are rounded to the nearest centimeter. Missing or
+        non-numeric depths are stored as NULL values.
+        """
+        logging.info('Creating compact receiver table...')
+        self.execute("DROP TABLE IF EXISTS '{:}'"\
+                .format(self.REC_COMPACT_TABLE))
+        self._create_table_rec_compact()
+
+        rec = self._read_rec_pts_with_src()
+        if len(rec) == 0:
+            return
+
+        # number shot-cable groups
+        _, line = np.unique(rec['line'].values, return_inverse=True)
+        keys = [line, rec['point'].values, rec['day_of_year'].values,
+                rec['cable_id'].values]
+        order = np.lexsort(keys[::-1])
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = np.any([np.diff(k[order]) != 0 for k in keys], axis=0)
+        groups = np.zeros(len(order), dtype=int)
+        groups[order] = np.cumsum(new) - 1
+        first = order[new]
+
+        chan = rec['chan'].values
+        _, _, nchan, offsets = pack_channels(groups, chan,
+                np.column_stack((rec['x'] - rec['src_x'],
+                    rec['y'] - rec['src_y'])))
+        _, chan0, _, depths = pack_channels(groups, chan,
+                rec['cable_depth'].values)
+
+        sql = """INSERT INTO '{:}' (line, point, day_of_year, cable_id,
+            src_x, src_y, chan0, nchan, offsets, depths)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""\
+                    .format(self.REC_COMPACT_TABLE)
+        fields = ['line', 'point', 'day_of_year', 'cable_id', 'src_x',
+                'src_y']
+        self.executemany(sql, zip(*([rec[f].values[first].tolist()
+            for f in fields] + [chan0.tolist(), nchan.tolist(), offsets,
+                depths])))
+        self.commit()
+
+        logging.info('...packed {:} receivers into {:} rows', len(rec),
+                len(first))
+
+    def read_compact_receivers(self, where='1'):
+        """
+        Read receivers from the compact receiver table
+
+        Parameters
+        ----------
+        where: str, optional
+            SQL WHERE clause for shots and cables to read, e.g.,
+            ``"line='L1' AND cable_id=1"``. Default is to read all rows.
+
+        Returns
+        -------
+        rec: :class:`pandas.DataFrame`
+            Receivers with columns line, point, day_of_year, cable_id,
+            chan, cable_depth, x, and y. Missing depths are NaN.
+        """
+        sql = """SELECT line, point, day_of_year, cable_id, src_x, src_y,
+            chan0, nchan, offsets, depths FROM '{:}' WHERE {:}"""\
+                    .format(self.REC_COMPACT_TABLE, where)
+        dat = self.execute(sql).fetchall()
+        shots = pd.DataFrame([tuple(d)[:8] for d in dat],
+                columns=['line', 'point', 'day_of_year', 'cable_id',
+                    'src_x', 'src_y', 'chan0', 'nchan'])
+
+        igroup, chan, offsets = unpack_channels(shots['chan0'].values,
+                shots['nchan'].values, [d[8] for d in dat], nvalue=2,
+                keep_null=True)
+        depths = unpack_channels(shots['chan0'].values,
+                shots['nchan'].values, [d[9] for d in dat],
+                keep_null=True)[2]
+
+        # drop missing channels, keeping receivers with NULL depths
+        keep = ~np.isnan(offsets[:, 0])
+        igroup, chan = igroup[keep], chan[keep]
+        offsets, depths = offsets[keep], depths[keep]
+
+        rec = shots[['line', 'point', 'day_of_year', 'cable_id']]\
+                .iloc[igroup].reset_index(drop=True)
+        rec['chan'] = chan
+        rec['cable_depth'] = depths[:, 0]
+        rec['x'] = shots['src_x'].values[igroup] + offsets[:, 0]
+        rec['y'] = shots['src_y'].values[igroup] + offsets[:, 1]
+
+        return rec
+
+    def _calc_src_rec_midpoints_numeric(self, output_field='mid_pt'):
+        """
+        Calculate source-receiver midpoints in NumPy and store them in x, y
+        fields
+        """
+        logging.info('Calculating midpoints...')
+        logging.info('...output data in {:}.{:}', self.REC_PT_TABLE,
+                output_field)
+
+        self._add_geom_pointxy(self.REC_PT_TABLE, output_field)
+
+        rowid, sx, sy, rx, ry = self._read_src_rec_coords()
+        mx = sx + (rx - sx) / 2.
+        my = sy + (ry - sy) / 2.
+
+        x, y = self._get_point_fields(output_field)
+        sql = "UPDATE '{:}' SET {:}=NULL, {:}=NULL".format(
+                self.REC_PT_TABLE, x, y)
+        self.execute(sql)
+
+        sql = "UPDATE '{:}' SET {:}=?, {:}=? WHERE rowid=?".format(
+                self.REC_PT_TABLE, x, y)
+        self.executemany(sql, zip(mx.tolist(), my.tolist(),
+            rowid.tolist()))
+        self.commit()
+
+        logging.info('...calculated {:} midpoints', len(rowid))
+
     def calc_src_rec_midpoints(self, output_field='mid_pt'):
         """
         Calculate source-receiver midpoints and store them in the database
@@ -471,6 +865,9 @@ class P190Database(Connection):
             Name of the field to store midpoint geometries in. Default is
             `'mid_pt'`.
         """
+        if not self.SPATIAL:
+            return self._calc_src_rec_midpoints_numeric(output_field)
+
         if "mid_pt" not in self._get_fields(self.SRC_REC_VIEW):
             sql = "DROP VIEW {:}".format(self.SRC_REC_VIEW)
             self.execute(sql)
@@ -560,9 +957,41 @@ class P190Database(Connection):
         file = open(filename, 'rb')
         self._read_p190(file, read_header=add_hdr)
 
+    def read_rec_lines(self):
+        """
+        Read receiver points as lines for each shot and cable
+
+        Returns
+        -------
+        keys: :class:`pandas.DataFrame`
+            Line, point, and cable_id for each receiver line, sorted by
+            point.
+        lines: :class:`~rockfish2.navigation.utils.binline.LineSet`
+            Receiver positions for each receiver line, in channel order.
+        """
+        x, y = self._get_point_sql('rec_pt')
+        sql = """SELECT line, point, cable_id, {:}, {:} FROM '{:}'
+            WHERE {:} IS NOT NULL ORDER BY point, line, cable_id, chan
+            """.format(x, y, self.REC_PT_TABLE, x)
+        rec = pd.DataFrame(self.execute(sql).fetchall(),
+                columns=['line', 'point', 'cable_id', 'x', 'y'])
+
+        keys = ['line', 'point', 'cable_id']
+        new = np.ones(len(rec), dtype=bool)
+        new[1:] = np.any([rec[k].values[1:] != rec[k].values[:-1]
+            for k in keys], axis=0)
+        index = np.append(np.nonzero(new)[0], len(rec))
+
+        return (rec[keys][new].reset_index(drop=True),
+                LineSet(rec['x'].values, rec['y'].values, index))
+
     def create_rec_lines(self, replace=False):
         """
         Create line segments from receiever point groups.
+
+        In numeric mode (``spatial=False``), only the number of channels
+        is stored for each line; use :meth:`read_rec_lines` to get line
+        coordinates.
         """
         if replace:
             sql = "DROP TABLE IF EXISTS '{:}'".format(self.REC_LINE_TABLE)
@@ -570,6 +999,15 @@ class P190Database(Connection):
         
         self._create_table_rec_line()
 
+        if not self.SPATIAL:
+            sql = """INSERT OR REPLACE INTO '{:}'(line, point, cable_id,
+                nchan) SELECT line, point, cable_id, count(chan) as nchan
+                FROM '{:}' GROUP BY line, point, cable_id
+                """.format(self.REC_LINE_TABLE, self.REC_PT_TABLE)
+            self.execute(sql)
+            self.commit()
+            return
+
         sql = """INSERT OR REPLACE INTO '{:}'(line, point, cable_id, nchan,
             rec_line) SELECT line, point, cable_id, count(chan) as nchan, 
             MakeLine(rec_pt) as rec_line FROM '{:}' GROUP BY line,
@@ -578,3 +1016,248 @@ class P190Database(Connection):
         self.execute(sql)
         self.commit()
 
+    def create_geometry_columns(self, spatial_index=True):
+        """
+        Add SpatiaLite geometry columns for points stored in numeric mode
+
+        For each pair of ``<name>_x``, ``<name>_y`` fields in a table, a
+        point geometry column ``<name>`` is added (or replaced) and filled
+        from the coordinates. Use this to export a database created with
+        ``spatial=False`` for use in GIS software. Requires SpatiaLite.
+
+        Parameters
+        ----------
+        spatial_index: bool, optional
+            Determines whether or not to build spatial indices for the new
+            geometry columns. Default is `True`.
+
+        Returns
+        -------
+        columns: list
+            List of (table, column) tuples for the new geometry columns.
+        """
+        if self.SPATIAL:
+            return []
+
+        tables = [t for t in self.tables if not t.startswith('sqlite_')]
+        self.init_spatialite()
+
+        columns = []
+        for table in tables:
+            fields = self._get_fields(table)
+            for f in fields:
+                name = f[:-2]
+                if (not f.endswith('_x')) or (name + '_y' not in fields):
+                    continue
+
+                logging.info('Adding geometry column {:}.{:}...', table,
+                        name)
+                if name not in fields:
+                    sql = """SELECT addGeometryColumn('{:}', '{:}', {:},
+                        'POINT', 'XY')""".format(table, name,
+                                self.INPUT_SRID)
+                    self.execute(sql)
+
+                sql = """UPDATE '{:}' SET {:}=MakePoint({:}_x, {:}_y, {:})
+                    WHERE {:}_x IS NOT NULL""".format(table, name, name,
+                            name, self.INPUT_SRID, name)
+                self.execute(sql)
+                columns.append((table, name))
+        self.commit()
+
+        if spatial_index:
+            # _create_spatial_index() is a no-op in numeric mode
+            for table, name in columns:
+                if "idx_{:}_{:}".format(table, name) in self.tables:
+                    continue
+                sql = "SELECT CreateSpatialIndex('{:}', '{:}')"\
+                        .format(table, name)
+                self.execute(sql)
+            self.commit()
+
+        return columns
+
+    def _get_sps_line_numbers(self, line_numbers=None):
+        """
+        Returns a dictionary of SPS line numbers for each line name
+
+        Line names are used as line numbers if they are all numeric, or
+        else lines are numbered from 1 in sorted order.
+        """
+        if line_numbers is not None:
+            return dict(line_numbers)
+
+        sql = """SELECT DISTINCT line FROM '{:}' UNION
+            SELECT DISTINCT line FROM '{:}' ORDER BY line"""\
+                    .format(self.COORD_TABLE, self.REC_PT_TABLE)
+        lines = [d[0] for d in self.execute(sql).fetchall()]
+
+        try:
+            return dict([(l, float(l)) for l in lines])
+        except ValueError:
+            logging.info('...line names are not numeric, numbering lines'
+                    ' from 1')
+            return dict([(l, i + 1) for i, l in enumerate(lines)])
+
+    def _write_sps_sources(self, f, line_numbers, chunksize):
+        """
+        Write S records for sources, in chunks
+        """
+        x, y = self._get_point_sql('geom')
+        sql = """SELECT line, point, day_of_year, water_depth_or_elev,
+            {:}, {:} FROM '{:}' WHERE record_id='S'
+            ORDER BY line, point, day_of_year""".format(x, y,
+                    self.COORD_TABLE)
+        fields = ['line', 'point', 'day_of_year', 'water_depth', 'x', 'y']
+
+        cur = self.execute(sql)
+        nrec = 0
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if len(rows) == 0:
+                break
+
+            dat = pd.DataFrame([tuple(r) for r in rows], columns=fields)
+            day, time = format_time(dat['day_of_year'].values)
+            records = format_records(POINT_FORMAT, record_id='S',
+                    line=[line_numbers[l] for l in dat['line']],
+                    point=dat['point'].values, point_index=1,
+                    water_depth=pd.to_numeric(dat['water_depth'],
+                        errors='coerce').values,
+                    easting=dat['x'].values, northing=dat['y'].values,
+                    day_of_year=day, time=time)
+            f.write('\n'.join(records) + '\n')
+            nrec += len(records)
+
+        return nrec
+
+    def _write_sps_receivers(self, rf, xf, line_numbers, chunksize):
+        """
+        Write R records for receivers and X records relating them to
+        sources, in chunks
+        """
+        x, y = self._get_point_sql('rec_pt')
+        sql = """SELECT line, point, day_of_year, cable_id, chan,
+            cable_depth, {:}, {:} FROM '{:}'
+            ORDER BY line, point, day_of_year, cable_id, chan"""\
+                    .format(x, y, self.REC_PT_TABLE)
+        fields = ['line', 'point', 'day_of_year', 'cable_id', 'chan',
+                'cable_depth', 'x', 'y']
+        shot_keys = ['line', 'point', 'day_of_year']
+
+        cur = self.execute(sql)
+        carry = None
+        counter = {}
+        nrec = 0
+        nrel = 0
+        done = False
+        while not done:
+            rows = cur.fetchmany(chunksize)
+            done = len(rows) == 0
+
+            dat = pd.DataFrame([tuple(r) for r in rows], columns=fields)
+            if carry is not None:
+                dat = pd.concat([carry, dat], ignore_index=True)
+            carry = None
+
+            # hold back the last shot, which may continue in the next chunk
+            if (not done) and (len(dat) > 0):
+                last = np.ones(len(dat), dtype=bool)
+                for k in shot_keys:
+                    last &= dat[k].values == dat[k].values[-1]
+                carry = dat[last].reset_index(drop=True)
+                dat = dat[~last].reset_index(drop=True)
+
+            if len(dat) == 0:
+                continue
+
+            # number receivers from 1 along each line
+            line = dat['line'].values
+            new = np.ones(len(dat), dtype=bool)
+            new[1:] = line[1:] != line[:-1]
+            start = np.nonzero(new)[0]
+            irun = np.cumsum(new) - 1
+            offset = np.array([counter.get(l, 0) for l in line[start]])
+            rec_point = np.arange(len(dat)) - start[irun] + 1 + offset[irun]
+            for l, n in zip(line[start], np.bincount(irun)):
+                counter[l] = counter.get(l, 0) + n
+
+            lineno = np.array([line_numbers[l] for l in line], dtype=float)
+            day, time = format_time(dat['day_of_year'].values)
+            records = format_records(POINT_FORMAT, record_id='R',
+                    line=lineno, point=rec_point, point_index=1,
+                    point_depth=pd.to_numeric(dat['cable_depth'],
+                        errors='coerce').values,
+                    easting=dat['x'].values, northing=dat['y'].values,
+                    day_of_year=day, time=time)
+            rf.write('\n'.join(records) + '\n')
+            nrec += len(records)
+
+            chan = dat['chan'].values
+            i0, i1 = get_relation_runs([dat[k].values for k in shot_keys
+                + ['cable_id']], chan)
+            records = format_records(RELATION_FORMAT, record_id='X',
+                    record=dat['point'].values[i0], record_increment=1,
+                    instrument='1', line=lineno[i0],
+                    point=dat['point'].values[i0], point_index=1,
+                    from_chan=chan[i0], to_chan=chan[i1], chan_increment=1,
+                    rec_line=lineno[i0], from_rec=rec_point[i0],
+                    to_rec=rec_point[i1], rec_index=1)
+            xf.write('\n'.join(records) + '\n')
+            nrel += len(records)
+
+        return nrec, nrel
+
+    def write_sps(self, basename, chunksize=100000, line_numbers=None):
+        """
+        Write sources, receivers, and relations to SPS files
+
+        Writes SPS revision 2.1 S (source), R (receiver), and X (relation)
+        files. Rows are read in sorted chunks of `chunksize` rows and
+        formatted one field at a time for each chunk (see
+        :func:`~rockfish2.navigation.utils.sps.format_records`), so memory
+        use does not depend on the size of the survey.
+
+        Receivers are numbered from 1 along each line, in the order of
+        shot point, cable, and channel, and are given the line number of
+        their shot. One X record is written for each run of consecutive
+        channels on a cable for each shot.
+
+        Parameters
+        ----------
+        basename: str
+            Path to the output files, without extension. Files are written
+            to ``basename`` plus the extensions in
+            :data:`~rockfish2.navigation.utils.sps.SPS_EXTENSIONS`.
+        chunksize: int, optional
+            Number of rows to read and format at a time. Default is
+            100000.
+        line_numbers: dict, optional
+            SPS line number for each line name. Default is to use line
+            names if they are all numeric, or else to number lines from 1
+            in sorted order.
+
+        Returns
+        -------
+        filenames: dict
+            Paths to the S, R, and X files.
+        """
+        line_numbers = self._get_sps_line_numbers(line_numbers)
+        filenames = dict([(k, basename + SPS_EXTENSIONS[k])
+            for k in SPS_EXTENSIONS])
+
+        logging.info('Writing SPS files: {:}.*', basename)
+        with open(filenames['S'], 'w') as f:
+            f.write(SPS_HEADER + '\n')
+            nsrc = self._write_sps_sources(f, line_numbers, chunksize)
+        logging.info('...wrote {:} S records', nsrc)
+
+        with open(filenames['R'], 'w') as rf:
+            with open(filenames['X'], 'w') as xf:
+                rf.write(SPS_HEADER + '\n')
+                xf.write(SPS_HEADER + '\n')
+                nrec, nrel = self._write_sps_receivers(rf, xf, line_numbers,
+                        chunksize)
+        logging.info('...wrote {:} R records and {:} X records', nrec, nrel)
+
+        return filenames
@@ -3,21 +3,33 @@ Class for working with P190 seismic navigation data
 """
 from rockfish2.navigation.ukooa.p190.database import P190Database
 from rockfish2.navigation.ukooa.p190.binning import P190Binning
+from rockfish2.navigation.ukooa.p190.qc import P190QC
 
 
-class P190(P190Database, P190Binning):
+class P190(P190Database, P190Binning, P190QC):
     """
     Class for working with P190 seismic navigation data
     """
     def __init__(self, cmp_model='cmp_line', 
             cmp_assignments='cmp_assignments',
-            cmp_assignments_view='cmp_assignments_view', **kwargs):
+            cmp_assignments_view='cmp_assignments_view',
+            cmp_bin_index='cmp_bin_index',
+            cmp_model_versions='cmp_model_versions',
+            cmp_model_changes='cmp_model_changes',
+            cmp_coverage='cmp_coverage', cmp_ovt='cmp_ovt',
+            nav_qc='nav_qc', **kwargs):
 
         P190Database.__init__(self, **kwargs)
 
         self.CMP_MODEL = cmp_model
         self.CMP_ASSIGNMENTS = cmp_assignments
         self.CMP_ASSIGNMENTS_VIEW = cmp_assignments_view
+        self.CMP_BIN_INDEX = cmp_bin_index
+        self.CMP_MODEL_VERSIONS = cmp_model_versions
+        self.CMP_MODEL_CHANGES = cmp_model_changes
+        self.CMP_COVERAGE = cmp_coverage
+        self.CMP_OVT = cmp_ovt
+        self.NAV_QC = nav_qc
 
     def __str__(self):
         """
@@ -0,0 +1,204 @@
+"""
+Quality control tools for P190 navigation data
+"""
+import numpy as np
+import pandas as pd
+from rockfish2 import logging
+from rockfish2.navigation.utils.qc import shot_qc, channel_qc
+
+# QC table sources
+QC_SOURCE = 0
+QC_RECEIVER = 1
+
+
+class P190QC(object):
+    """
+    Convenience class for navigation quality control
+    """
+    def _create_table_nav_qc(self):
+
+        sql = """CREATE TABLE IF NOT EXISTS '{self.NAV_QC}' (
+            source INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            line TEXT NOT NULL,
+            flags INTEGER NOT NULL,
+            gap INTEGER DEFAULT 0,
+            PRIMARY KEY (source, id))""".format(**locals())
+        self.execute(sql)
+
+        sql = """CREATE INDEX IF NOT EXISTS '{self.NAV_QC}_line_idx'
+            ON '{self.NAV_QC}' (line)""".format(**locals())
+        self.execute(sql)
+
+    def _get_where_lines(self, lines):
+        """
+        Returns a WHERE clause selecting lines
+        """
+        if lines is None:
+            return '1'
+        return 'line IN ({:})'.format(', '.join(['?' for l in lines]))
+
+    def _read_qc_sources(self, lines=None):
+        """
+        Read source positions and times for lines
+        """
+        sql = """SELECT rowid, line, point, day_of_year, {:}, {:}
+            FROM '{:}' WHERE record_id='S' AND ({:})"""\
+                    .format(*(self._get_point_sql('geom')
+                        + (self.COORD_TABLE, self._get_where_lines(lines))))
+        dat = self.execute(sql, list(lines or [])).fetchall()
+
+        return pd.DataFrame(dat, columns=['rowid', 'line', 'point',
+            'day_of_year', 'x', 'y'])
+
+    def _read_qc_receivers(self, lines=None):
+        """
+        Read receiver positions for lines
+        """
+        sql = """SELECT rowid, line, point, day_of_year, cable_id, chan,
+            {:}, {:} FROM '{:}' WHERE {:}"""\
+                    .format(*(self._get_point_sql('rec_pt')
+                        + (self.REC_PT_TABLE, self._get_where_lines(lines))))
+        dat = self.execute(sql, list(lines or [])).fetchall()
+
+        return pd.DataFrame(dat, columns=['rowid', 'line', 'point',
+            'day_of_year', 'cable_id', 'chan', 'x', 'y'])
+
+    def _get_qc_shot_keys(self, rec):
+        """
+        Number the shots for receivers by line, point, and time
+        """
+        _, line = np.unique(rec['line'].values, return_inverse=True)
+        point = rec['point'].values
+        day = rec['day_of_year'].values
+
+        order = np.lexsort((day, point, line))
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = (np.diff(line[order]) != 0)\
+                | (np.diff(point[order]) != 0) | (np.diff(day[order]) != 0)
+        shot = np.zeros(len(order), dtype=int)
+        shot[order] = np.cumsum(new)
+
+        return shot
+
+    def get_lines_since(self, rowid):
+        """
+        Get lines with source records added after a rowid
+
+        Parameters
+        ----------
+        rowid: int
+            Last rowid in the table set by `COORD_TABLE` that has been
+            checked.
+
+        Returns
+        -------
+        lines: list
+            Names of lines with new source records.
+        """
+        sql = """SELECT DISTINCT line FROM '{:}' WHERE record_id='S'
+            AND rowid > ?""".format(self.COORD_TABLE)
+
+        return [d[0] for d in self.execute(sql, (rowid, )).fetchall()]
+
+    def run_navigation_qc(self, lines=None, nsigma=5., distance_tolerance=1.,
+            time_tolerance=1., channel_tolerance=1.):
+        """
+        Check source and receiver positions and store flags
+
+        Flags for shot-to-shot distance outliers, shot time jumps, missing
+        shot numbers, and channel spacing outliers are calculated for all
+        shots and receivers in each line at once (see
+        :mod:`rockfish2.navigation.utils.qc`). Rows with flags are stored
+        in the table set by `NAV_QC`, replacing existing flags for the
+        checked lines. To check shots appended during acquisition, pass
+        the lines from :meth:`get_lines_since`.
+
+        Parameters
+        ----------
+        lines: list, optional
+            Names of lines to check. Default is to check all lines.
+        nsigma: float, optional
+            Outlier threshold, in standard deviations estimated from the
+            median absolute deviation. Default is 5.
+        distance_tolerance: float, optional
+            Minimum difference from the median shot spacing for distance
+            outliers. Default is 1.
+        time_tolerance: float, optional
+            Minimum difference from the median shot interval for timing
+            outliers, in seconds. Default is 1.
+        channel_tolerance: float, optional
+            Minimum difference from the median channel spacing for
+            outliers. Default is 1.
+
+        Returns
+        -------
+        qc: :class:`pandas.DataFrame`
+            Flagged rows, with columns source, id, line, flags, and gap.
+        """
+        self._create_table_nav_qc()
+
+        logging.info('Running navigation QC...')
+        src = self._read_qc_sources(lines=lines)
+        src_flags, gap = shot_qc(src['line'].values, src['point'].values,
+                86400. * src['day_of_year'].values, src['x'].values,
+                src['y'].values, nsigma=nsigma,
+                distance_tolerance=distance_tolerance,
+                time_tolerance=time_tolerance)
+        logging.info('...flagged {:} of {:} shots',
+                np.sum(src_flags > 0), len(src))
+
+        rec = self._read_qc_receivers(lines=lines)
+        shot = self._get_qc_shot_keys(rec)
+        rec_flags = channel_qc(shot, rec['cable_id'].values,
+                rec['chan'].values, rec['x'].values, rec['y'].values,
+                nsigma=nsigma, tolerance=channel_tolerance)
+        logging.info('...flagged {:} of {:} receivers',
+                np.sum(rec_flags > 0), len(rec))
+
+        isrc = np.nonzero(src_flags)[0]
+        irec = np.nonzero(rec_flags)[0]
+        qc = pd.DataFrame({
+            'source': np.append(QC_SOURCE * np.ones(len(isrc), dtype=int),
+                QC_RECEIVER * np.ones(len(irec), dtype=int)),
+            'id': np.append(src['rowid'].values[isrc],
+                rec['rowid'].values[irec]),
+            'line': np.append(src['line'].values[isrc],
+                rec['line'].values[irec]),
+            'flags': np.append(src_flags[isrc], rec_flags[irec]),
+            'gap': np.append(gap[isrc], np.zeros(len(irec), dtype=int))})
+        qc = qc[['source', 'id', 'line', 'flags', 'gap']]
+
+        sql = "DELETE FROM '{:}' WHERE {:}".format(self.NAV_QC,
+                self._get_where_lines(lines))
+        self.execute(sql, list(lines or []))
+
+        sql = """INSERT INTO '{:}' (source, id, line, flags, gap)
+            VALUES (?, ?, ?, ?, ?)""".format(self.NAV_QC)
+        self.executemany(sql, zip(*[qc[f].tolist() for f in qc]))
+        self.commit()
+
+        return qc
+
+    def read_navigation_qc(self, flag=None):
+        """
+        Read navigation QC flags
+
+        Parameters
+        ----------
+        flag: int, optional
+            Only read rows with this flag set. Default is to read all rows.
+
+        Returns
+        -------
+        qc: :class:`pandas.DataFrame`
+            Flagged rows, with columns source, id, line, flags, and gap.
+        """
+        self._create_table_nav_qc()
+
+        sql = """SELECT source, id, line, flags, gap FROM '{:}'"""\
+                .format(self.NAV_QC)
+        if flag is not None:
+            sql += ' WHERE (flags & {:}) > 0'.format(int(flag))
+
+        return self.read_sql(sql)
@@ -0,0 +1,323 @@
+"""
+Test suite for the ukooa.p190.binning module
+"""
+import os
+import doctest
+import unittest
+import numpy as np
+from rockfish2.utils.loaders import get_example_file
+from rockfish2.navigation.ukooa.p190 import binning
+from rockfish2.navigation.ukooa.p190.p190 import P190
+
+
+class binningTestCase(unittest.TestCase):
+
+    def test__assign_nearest_bins(self):
+        """
+        Should assign points to rectangular bins along a line
+        """
+        bx = np.arange(0., 100., 10.)
+        by = np.zeros(len(bx))
+
+        mx = np.array([0., 14., 16., 51., 55., 200.])
+        my = np.array([0., 1., -1., 30., 0., 0.])
+
+        ipt, ibin = binning._assign_nearest_bins(bx, by, mx, my, 10., 50.)
+
+        # point outside of the crossline or inline limits should be dropped
+        self.assertEqual(list(ipt), [0, 1, 2, 4])
+        self.assertEqual(list(ibin), [0, 1, 2, 5])
+
+        # should work on rotated lines
+        theta = np.deg2rad(30.)
+        rot = lambda x, y: (x * np.cos(theta) - y * np.sin(theta),
+                x * np.sin(theta) + y * np.cos(theta))
+        _bx, _by = rot(bx, by)
+        _mx, _my = rot(mx, my)
+        ipt1, ibin1 = binning._assign_nearest_bins(_bx, _by, _mx, _my,
+                10., 50.)
+        self.assertEqual(list(ipt), list(ipt1))
+        self.assertEqual(list(ibin), list(ibin1))
+
+    def test_assign_cmp_bins_partitioned(self):
+        """
+        Should assign bins in partitions
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        dbfile = 'temp_binning.sqlite'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        p190 = P190(database=dbfile, input_srid=32419)
+        p190.read_p190(filename)
+        p190.create_bin_line_from_midpoints(step=10, bin_shape='rect',
+                spacing=6.25, crossline_dimension=500)
+
+        p190.assign_cmp_bins()
+        sql = """SELECT line, point, cable_id, chan, bin FROM '{:}'
+            ORDER BY line, point, cable_id, chan, bin"""\
+                    .format(p190.CMP_ASSIGNMENTS)
+        dat0 = p190.execute(sql).fetchall()
+
+        # partitions by line and by tile should give the same result
+        for partition in ['line', 'tile']:
+            p190.execute('DELETE FROM {:}'.format(p190.CMP_ASSIGNMENTS))
+            p190.assign_cmp_bins(partition=partition, nproc=2,
+                    partition_size=20)
+            dat1 = p190.execute(sql).fetchall()
+            self.assertEqual(len(dat0), len(dat1))
+            for d0, d1 in zip(dat0, dat1):
+                self.assertEqual(tuple(d0), tuple(d1))
+
+        # array method in parallel should match a serial run
+        dat = []
+        for nproc in [1, 2]:
+            p190.execute('DELETE FROM {:}'.format(p190.CMP_ASSIGNMENTS))
+            p190.assign_cmp_bins(partition='line', method='array',
+                    nproc=nproc, inline_dimension=6.25,
+                    crossline_dimension=500)
+            dat.append([tuple(d) for d in p190.execute(sql).fetchall()])
+        self.assertTrue(len(dat[0]) > 0)
+        self.assertEqual(dat[0], dat[1])
+
+        os.remove(dbfile)
+
+    def test_assign_cmp_bins_numeric(self):
+        """
+        Should bin midpoints without SpatiaLite
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419, spatial=False)
+        p190.read_p190(filename)
+        p190.create_bin_line_from_midpoints(step=10, bin_shape='rect',
+                spacing=6.25, crossline_dimension=500)
+        self.assertTrue('bin_center_x' in p190._get_fields(p190.CMP_MODEL))
+        self.assertFalse('bin_geom' in p190._get_fields(p190.CMP_MODEL))
+
+        p190.assign_cmp_bins()
+        self.assertTrue(p190.count(p190.CMP_ASSIGNMENTS) > 0)
+        self.assertTrue('mid_pt_x' in p190._get_fields(
+            p190.CMP_ASSIGNMENTS_VIEW))
+
+        stats = p190.calc_cmp_coverage()
+        self.assertEqual(stats['fold'].sum(),
+                p190.count(p190.CMP_ASSIGNMENTS))
+
+    def test_cmp_bin_index(self):
+        """
+        Should store compact assignments and write CMP sort order
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419)
+        p190.read_p190(filename)
+        p190.create_bin_line_from_midpoints(step=10, bin_shape='rect',
+                spacing=6.25, crossline_dimension=500)
+
+        p190.assign_cmp_bins(compact=True)
+        self.assertTrue(p190.CMP_BIN_INDEX in p190.tables)
+        self.assertFalse(p190.CMP_ASSIGNMENTS in p190.tables)
+
+        # should have one row per assigned receiver
+        rowid, bins = p190.read_cmp_bin_index()
+        self.assertEqual(len(rowid), len(np.unique(rowid)))
+        self.assertEqual(len(rowid), p190.count(p190.CMP_BIN_INDEX))
+
+        # should save and reload as a memmapped array
+        npyfile = 'temp_cmp_bin_index.npy'
+        p190.save_cmp_bin_index(npyfile)
+        index = p190.load_cmp_bin_index(npyfile)
+        self.assertEqual(index.dtype, np.int32)
+        for _rowid, _bin in zip(rowid, bins):
+            self.assertEqual(index[_rowid], _bin)
+        self.assertEqual(np.sum(index >= 0), len(rowid))
+        del index
+        os.remove(npyfile)
+
+        # should sort by bin, then offset
+        rowid, bins, offsets = p190.get_cmp_sort_order()
+        self.assertTrue(np.all(np.diff(bins) >= 0))
+        for b in np.unique(bins):
+            self.assertTrue(np.all(np.diff(offsets[bins == b]) >= 0))
+
+        # should write sort order to a file
+        txtfile = 'temp_cmp_sort_order.txt'
+        p190.write_cmp_sort_order(txtfile)
+        dat = np.loadtxt(txtfile, skiprows=1, usecols=(0, 6))
+        self.assertEqual(len(dat), len(rowid))
+        self.assertEqual(list(dat[:, 1].astype(int)), list(rowid))
+        os.remove(txtfile)
+
+    def test_reassign_cmp_bins(self):
+        """
+        Should only reassign midpoints for bins that changed
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419)
+        p190.read_p190(filename)
+
+        sql = """SELECT X(Line_Interpolate_Point(rec_line, 0.5)),
+            Y(Line_Interpolate_Point(rec_line, 0.5)) FROM '{:}'
+            ORDER BY point""".format(p190.REC_LINE_VIEW)
+        dat = np.asarray(p190.execute(sql).fetchall())
+        self._check_reassign_cmp_bins(p190, dat[::10, 0], dat[::10, 1])
+
+    def test_reassign_cmp_bins_numeric(self):
+        """
+        Should only reassign midpoints for bins that changed without
+        SpatiaLite
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419, spatial=False)
+        p190.read_p190(filename)
+
+        sql = """SELECT geom_x, geom_y FROM '{:}' WHERE record_id='S'
+            ORDER BY point""".format(p190.COORD_TABLE)
+        dat = np.asarray(p190.execute(sql).fetchall())
+        x, y = dat[::10, 0], dat[::10, 1]
+        self._check_reassign_cmp_bins(p190, x, y)
+
+        # bending the line moves bins towards midpoints that are assigned
+        # to unchanged bins
+        rowid0, bins0 = p190.read_cmp_bin_index()
+        y1 = y.copy()
+        y1[3:] -= 200.
+        p190.create_bin_line(x, y1, bin_shape='rect', if_exists='update')
+        p190.reassign_cmp_bins()
+        rowid1, bins1 = p190.read_cmp_bin_index()
+
+        version = p190._get_cmp_model_version()['version']
+        sql = 'SELECT bin FROM {:} WHERE version = ?'\
+                .format(p190.CMP_MODEL_CHANGES)
+        changed = set([r[0] for r in p190.execute(sql, (version, ))])
+        old = dict(zip(rowid0, bins0))
+        taken = [r for r, b in zip(rowid1, bins1) if (b in changed)
+                and (r in old) and (old[r] not in changed)]
+        self.assertTrue(len(taken) > 0)
+        self._check_full_reassignment(p190)
+
+    def _check_reassign_cmp_bins(self, p190, x, y):
+
+        p190.create_bin_line(x, y, bin_shape='rect')
+        version0 = p190._get_cmp_model_version()
+        self.assertEqual(version0['nchanged'], version0['nbin'])
+
+        p190.assign_cmp_bins(compact=True)
+
+        # move the end of the line
+        y1 = y.copy()
+        y1[-1] += 50.
+        p190.create_bin_line(x, y1, bin_shape='rect', if_exists='update')
+        version1 = p190._get_cmp_model_version()
+        self.assertEqual(version1['version'], version0['version'] + 1)
+        self.assertTrue(version1['nchanged'] > 0)
+        self.assertTrue(version1['nchanged'] < version1['nbin'])
+
+        # unchanged model should have no changes
+        p190.create_bin_line(x, y1, bin_shape='rect', if_exists='update')
+        self.assertEqual(p190._get_cmp_model_version()['nchanged'], 0)
+
+        # should match a full reassignment
+        p190.reassign_cmp_bins(version=version1['version'])
+        self._check_full_reassignment(p190)
+
+        # extend the line at a right angle, then remove the extension,
+        # which should change the orientation of the new last bin
+        ux, uy = x[-1] - x[-2], y1[-1] - y1[-2]
+        ux, uy = 20. * ux / np.hypot(ux, uy), 20. * uy / np.hypot(ux, uy)
+        p190.create_bin_line(np.append(x, x[-1] - uy),
+                np.append(y1, y1[-1] + ux), bin_shape='rect',
+                if_exists='update')
+        p190.reassign_cmp_bins()
+        p190.create_bin_line(x, y1, bin_shape='rect', if_exists='update')
+        version2 = p190._get_cmp_model_version()
+        sql = 'SELECT MAX(bin) FROM {:}'.format(p190.CMP_MODEL)
+        last_bin = p190.execute(sql).fetchone()[0]
+        sql = 'SELECT bin FROM {:} WHERE version = ?'\
+                .format(p190.CMP_MODEL_CHANGES)
+        changed = [r[0] for r in p190.execute(sql, (version2['version'], ))]
+        self.assertTrue(last_bin in changed)
+        self.assertTrue(max(changed) > last_bin)
+
+        p190.reassign_cmp_bins()
+        self._check_full_reassignment(p190)
+
+    def _check_full_reassignment(self, p190):
+        """
+        Compare bin assignments with a full reassignment
+        """
+        rowid0, bins0 = p190.read_cmp_bin_index()
+
+        p190.execute('DELETE FROM {:}'.format(p190.CMP_BIN_INDEX))
+        p190.assign_cmp_bins(compact=True)
+        rowid1, bins1 = p190.read_cmp_bin_index()
+
+        self.assertTrue(len(rowid1) > 0)
+        self.assertEqual(sorted(zip(rowid0, bins0)),
+                sorted(zip(rowid1, bins1)))
+
+    def test_calc_cmp_coverage(self):
+        """
+        Should calculate and export CMP coverage
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419)
+        p190.read_p190(filename)
+        p190.create_bin_line_from_midpoints(step=10, bin_shape='rect',
+                spacing=6.25, crossline_dimension=500)
+        p190.assign_cmp_bins()
+
+        stats = p190.calc_cmp_coverage()
+        self.assertTrue(p190.CMP_COVERAGE in p190.tables)
+        self.assertEqual(len(stats), p190.count(p190.CMP_COVERAGE))
+
+        # fold should match a GROUP BY query
+        sql = """SELECT bin, COUNT(*) FROM '{:}' GROUP BY bin
+            ORDER BY bin""".format(p190.CMP_ASSIGNMENTS)
+        dat = p190.execute(sql).fetchall()
+        self.assertEqual([d[1] for d in dat], list(stats['fold']))
+
+        xyzfile = 'temp_cmp_coverage.xyz'
+        p190.write_cmp_coverage(xyzfile, fields=['fold', 'offset_mean'])
+        dat = np.loadtxt(xyzfile)
+        self.assertEqual(dat.shape, (len(stats), 4))
+        os.remove(xyzfile)
+
+    def test_calc_offset_vector_tiles(self):
+        """
+        Should store fold by bin, offset class, and sector
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419)
+        p190.read_p190(filename)
+        p190.create_bin_line_from_midpoints(step=10, bin_shape='rect',
+                spacing=6.25, crossline_dimension=500)
+        p190.assign_cmp_bins()
+
+        tiles, rowid = p190.calc_offset_vector_tiles([0, 1000, 2000, 10000],
+                nsector=4)
+        self.assertTrue(p190.CMP_OVT in p190.tables)
+        self.assertEqual(len(tiles), p190.count(p190.CMP_OVT))
+        self.assertEqual(tiles['fold'].sum(), len(rowid))
+
+        # fold by bin should match the total for all tiles
+        sql = """SELECT bin, SUM(fold) FROM '{:}' GROUP BY bin
+            ORDER BY bin""".format(p190.CMP_OVT)
+        dat = p190.execute(sql).fetchall()
+        fold = tiles.groupby('bin')['fold'].sum()
+        self.assertEqual([d[1] for d in dat], list(fold))
+
+
+def suite():
+    testSuite = unittest.makeSuite(binningTestCase, 'test')
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,108 @@
+"""
+Test suite for the ukooa.p190.catalog module
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from rockfish2.utils.loaders import get_example_file
+from rockfish2.db import Connection
+from rockfish2.db.backends.sqlite3.connection import DatabaseError
+from rockfish2.navigation.ukooa.p190.catalog import P190Catalog
+
+
+class catalogTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.shard_dir = tempfile.mkdtemp()
+        self.catalog_file = os.path.join(self.shard_dir, 'catalog.sqlite')
+
+        # shards with a simple table
+        self.lines = ['L1', 'L2', 'L3']
+        for i, line in enumerate(self.lines):
+            db = Connection(os.path.join(self.shard_dir,
+                line + '.sqlite'))
+            db.execute('CREATE TABLE shots (point INTEGER, depth REAL)')
+            db.executemany('INSERT INTO shots VALUES (?, ?)',
+                    [(p, 10. * i) for p in range(10 * (i + 1))])
+            db.commit()
+            db.close()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.shard_dir)
+
+    def test_add_shard(self):
+        """
+        Should register shards in the catalog
+        """
+        catalog = P190Catalog(self.catalog_file)
+        for line in self.lines:
+            filename = catalog.add_shard(line)
+            self.assertTrue(os.path.isfile(filename))
+        self.assertEqual(catalog.shards, self.lines)
+
+        # should persist
+        catalog.close()
+        catalog = P190Catalog(self.catalog_file)
+        self.assertEqual(catalog.shards, self.lines)
+
+        catalog.remove_shard('L2')
+        self.assertEqual(catalog.shards, ['L1', 'L3'])
+        self.assertRaises(DatabaseError, catalog.get_shard_filename, 'L2')
+
+    def test_create_union_view(self):
+        """
+        Should combine tables from attached shards
+        """
+        catalog = P190Catalog(self.catalog_file)
+        for line in self.lines:
+            catalog.add_shard(line)
+
+        view = catalog.create_union_view('shots')
+        sql = "SELECT shard, COUNT(*) FROM {:} GROUP BY shard".format(view)
+        counts = dict([tuple(d) for d in catalog.execute(sql)])
+        self.assertEqual(counts, {'L1': 10, 'L2': 20, 'L3': 30})
+
+        # should reuse attached shards
+        catalog.create_union_view('shots', shards=['L1'], view='shots_l1')
+        self.assertEqual(len(catalog._attached), 3)
+        self.assertEqual(catalog.count('shots_l1'), 10)
+
+    def test_query(self):
+        """
+        Should fan queries out to shards
+        """
+        catalog = P190Catalog(self.catalog_file)
+        for line in self.lines:
+            catalog.add_shard(line)
+
+        sql = 'SELECT point, depth FROM shots WHERE point < ?'
+        for nproc in [1, 2]:
+            dat = catalog.query(sql, params=(15, ), nproc=nproc)
+            self.assertEqual(list(dat.columns), ['shard', 'point', 'depth'])
+            self.assertEqual(len(dat), 10 + 15 + 15)
+            self.assertEqual(list(dat['shard'].unique()), self.lines)
+
+    def test_read_p190(self):
+        """
+        Should read P190 files into separate shards
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        catalog = P190Catalog(self.catalog_file, input_srid=32419)
+        catalog.read_p190([filename])
+        self.assertEqual(catalog.shards, ['MGL1407MCS15.TEST'])
+
+        p190 = catalog.open_shard('MGL1407MCS15.TEST')
+        self.assertTrue(p190.count(p190.REC_PT_TABLE) > 0)
+
+
+def suite():
+    testSuite = unittest.makeSuite(catalogTestCase, 'test')
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -4,6 +4,7 @@ Test suite for the ukooa.p190.database module
 import os
 import doctest
 import unittest
+import numpy as np
 from rockfish2.utils.loaders import get_example_file
 from rockfish2.database.database import DatabaseOperationalError,\
         DatabaseIntegrityError
@@ -13,6 +14,24 @@ P190_FILES = [#(filename, nhdr, ncoord, nrec)
         ('MGL1407MCS15.TEST.p190', 39, 156, 24336)]
 
 
+def add_shifted_line(p190, line, dx):
+    """
+    Copy all sources and receivers to a new line that reuses the shot
+    numbers, shifted by `dx` in x, in a numeric-mode database
+    """
+    for table, point in [(p190.COORD_TABLE, 'geom'),
+            (p190.REC_PT_TABLE, 'rec_pt')]:
+        fields = [f for f in p190._get_fields(table) if f != 'id']
+        sql = """INSERT INTO '{:}' ({:}) SELECT {:} FROM '{:}'"""\
+                .format(table, ', '.join(fields),
+                    ', '.join(['?' if f == 'line' else '"{:}"'.format(f)
+                        for f in fields]), table)
+        p190.execute(sql, (line, ))
+        p190.execute("UPDATE '{:}' SET {:}_x = {:}_x + ? WHERE line = ?"\
+                .format(table, point, point), (dx, line))
+    p190.commit()
+
+
 class databaseTestCase(unittest.TestCase):
 
     def test_init(self):
@@ -163,7 +182,7 @@ class databaseTestCase(unittest.TestCase):
         nfields = [1 for i in sql if i == '?']
 
         self.assertEqual(len(nfields),
-                len(p190._get_fields(p190.COORD_TABLE)))
+                len(p190._get_fields(p190.COORD_TABLE)) - 1)
 
         line = 'VMGL1407MCS15   1   91010322722.57N0733831.18W  '
         line += '63520.23600513.05083.6253145210 '
@@ -201,7 +220,7 @@ class databaseTestCase(unittest.TestCase):
         nfields = [1 for i in sql if i == '?']
 
         self.assertEqual(len(nfields),
-                len(p190._get_fields(p190.REC_PT_TABLE)))
+                len(p190._get_fields(p190.REC_PT_TABLE)) - 1)
 
     def test__parse_hdr(self):
         """
@@ -355,6 +374,238 @@ class databaseTestCase(unittest.TestCase):
             self.assertEqual(d0[0], d1[0])
             self.assertEqual(d0[1], d1[1])
 
+    def test_build_point_index(self):
+        """
+        Should index sources and receivers by rowid
+        """
+        p190 = database.P190Database(input_srid=32419)
+
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+        p190.read_p190(filename)
+
+        index = p190.build_point_index('source')
+        sql = """SELECT COUNT(*) FROM '{:}' WHERE record_id='S'"""\
+                .format(p190.COORD_TABLE)
+        self.assertEqual(len(index), p190.execute(sql).fetchone()[0])
+
+        # nearest source to each source should be itself
+        distance, ids = index.nearest(index.x, index.y)
+        self.assertEqual(ids.tolist(), index.ids.tolist())
+
+        index = p190.build_point_index('receiver')
+        self.assertEqual(len(index), p190.count(p190.REC_PT_TABLE))
+
+        sql = """SELECT X(rec_pt), Y(rec_pt) FROM '{:}' WHERE rowid=?"""\
+                .format(p190.REC_PT_TABLE)
+        x, y = p190.execute(sql, (int(index.ids[10]),)).fetchone()
+        self.assertEqual(index.x[10], x)
+        self.assertEqual(index.y[10], y)
+
+        self.assertRaises(ValueError, p190.build_point_index, 'foobar')
+
+    def test_compact_receivers(self):
+        """
+        Should store receivers as offsets from the source
+        """
+        p190 = database.P190Database(input_srid=32419, spatial=False)
+
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+        p190.read_p190(filename)
+
+        add_shifted_line(p190, 'L2', 1000.)
+
+        p190.create_compact_receivers()
+        self.assertTrue(p190.REC_COMPACT_TABLE in p190.tables)
+
+        rec = p190.read_compact_receivers()
+        self.assertEqual(len(rec), p190.count(p190.REC_PT_TABLE))
+
+        # should match receiver positions to the nearest centimeter
+        sql = """SELECT {:}, {:}, cable_depth FROM '{:}'
+            ORDER BY line, point, day_of_year, cable_id, chan"""\
+                    .format(*(list(p190._get_point_sql('rec_pt'))
+                        + [p190.REC_PT_TABLE]))
+        dat = [tuple(d) for d in p190.execute(sql).fetchall()]
+        xy = np.asarray([d[:2] for d in dat])
+        self.assertTrue(np.all(np.abs(rec['x'].values - xy[:, 0])
+            <= 0.005 + 1e-6))
+        self.assertTrue(np.all(np.abs(rec['y'].values - xy[:, 1])
+            <= 0.005 + 1e-6))
+
+        # blank depths should be NaN
+        blank = np.asarray([isinstance(d[2], basestring) for d in dat])
+        self.assertTrue(np.any(blank))
+        self.assertEqual(np.isnan(rec['cable_depth'].values).tolist(),
+                blank.tolist())
+
+    def test_numeric_mode(self):
+        """
+        Should store points as x, y columns without SpatiaLite
+        """
+        p190 = database.P190Database(input_srid=32419, spatial=False)
+        self.assertFalse(p190.SRC_REC_VIEW in p190.views)
+
+        test = P190_FILES[0]
+        filename = get_example_file(test[0])
+        p190.read_p190(filename)
+
+        self.assertEqual(p190.count(p190.HDR_TABLE), test[1])
+        self.assertEqual(p190.count(p190.COORD_TABLE), test[2])
+        self.assertEqual(p190.count(p190.REC_PT_TABLE), test[3])
+
+        fields = p190._get_fields(p190.REC_PT_TABLE)
+        self.assertTrue('rec_pt_x' in fields)
+        self.assertTrue('rec_pt_y' in fields)
+
+        sql = "SELECT rec_pt_x, rec_pt_y FROM '{:}' WHERE rowid=1"\
+                .format(p190.REC_PT_TABLE)
+        x, y = p190.execute(sql).fetchone()
+        self.assertAlmostEqual(x, 63760.3)
+        self.assertAlmostEqual(y, 3600252.9)
+
+        # should calculate midpoints in numpy
+        p190.calc_src_rec_midpoints()
+        self.assertTrue(p190._has_point(p190.REC_PT_TABLE, 'mid_pt'))
+        rowid, sx0, sy0, rx0, ry0 = p190._read_src_rec_coords()
+        index = p190.build_point_index('midpoint')
+        self.assertEqual(len(index), len(rowid))
+        i = np.argsort(index.ids)
+        j = np.argsort(rowid)
+        self.assertTrue(np.allclose(index.x[i], (sx0 + rx0)[j] / 2.))
+        self.assertTrue(np.allclose(index.y[i], (sy0 + ry0)[j] / 2.))
+
+        # should match receivers to sources on the same line
+        add_shifted_line(p190, 'L2', 1000.)
+        rowid, sx, sy, rx, ry = p190._read_src_rec_coords()
+        self.assertEqual(len(rowid), 2 * test[3])
+        self.assertEqual(len(np.unique(rowid)), len(rowid))
+        self.assertTrue(np.allclose(np.sort(rx - sx),
+            np.sort(np.append(rx0 - sx0, rx0 - sx0))))
+
+        # should create receiver lines without geometries
+        p190.create_rec_lines()
+        keys, lines = p190.read_rec_lines()
+        self.assertEqual(len(keys), p190.count(p190.REC_LINE_TABLE))
+        self.assertEqual(len(lines), len(keys))
+
+    def test_stable_rowids(self):
+        """
+        Should keep source and receiver rowids after VACUUM
+        """
+        p190 = database.P190Database(input_srid=32419, spatial=False)
+        p190.read_p190(get_example_file(P190_FILES[0][0]))
+
+        for table, key in [(p190.COORD_TABLE, 'line, point, record_id'),
+                (p190.REC_PT_TABLE, 'line, point, cable_id, chan')]:
+            # only an INTEGER PRIMARY KEY is guaranteed to be kept
+            pragma = [d for d in p190._get_pragma(table) if d[5] > 0]
+            self.assertEqual([(d[1], d[2]) for d in pragma],
+                    [('id', 'INTEGER')])
+            sql = "SELECT COUNT(*) FROM '{:}' WHERE id != rowid"\
+                    .format(table)
+            self.assertEqual(p190.execute(sql).fetchone()[0], 0)
+
+            sql = "SELECT rowid, {:} FROM '{:}' ORDER BY rowid"\
+                    .format(key, table)
+            rows0 = [tuple(d) for d in p190.execute(sql).fetchall()]
+            p190.execute("DELETE FROM '{:}' WHERE rowid <= 10"\
+                    .format(table))
+            p190.commit()
+            p190.execute('VACUUM')
+            rows1 = [tuple(d) for d in p190.execute(sql).fetchall()]
+            self.assertEqual(rows1, rows0[10:])
+
+    def test_table_stats(self):
+        """
+        Should maintain row counts while reading data
+        """
+        p190 = database.P190Database(input_srid=32419, spatial=False,
+                table_stats=True)
+
+        test = P190_FILES[0]
+        p190.read_p190(get_example_file(test[0]))
+
+        self.assertEqual(p190._get_maintained_count(p190.COORD_TABLE),
+                test[2])
+        self.assertEqual(p190.count(p190.REC_PT_TABLE), test[3])
+        self.assertEqual(p190.count(p190.REC_PT_TABLE, chan=1),
+                p190.execute("SELECT COUNT(*) FROM '{:}' WHERE chan=1"\
+                        .format(p190.REC_PT_TABLE)).fetchone()[0])
+
+    def test_table_stats_reopen(self):
+        """
+        Should track tables once when opening an existing database
+        """
+        dbfile = 'temp_table_stats.sqlite'
+        if os.path.isfile(dbfile):
+            os.remove(dbfile)
+
+        p190 = database.P190Database(database=dbfile, input_srid=32419,
+                spatial=False)
+        test = P190_FILES[0]
+        p190.read_p190(get_example_file(test[0]))
+        p190.close()
+
+        # should start tracking existing tables
+        p190 = database.P190Database(database=dbfile, input_srid=32419,
+                spatial=False, table_stats=True)
+        self.assertEqual(p190._get_maintained_count(p190.COORD_TABLE),
+                test[2])
+        self.assertEqual(p190.execute('PRAGMA recursive_triggers')\
+                .fetchone()[0], 1)
+        p190.execute("UPDATE rockfish_table_stats SET nrows = -1"
+                " WHERE tbl = '{:}'".format(p190.HDR_TABLE))
+        p190.commit()
+        p190.close()
+
+        # should not recompute counts for tables that are already tracked
+        p190 = database.P190Database(database=dbfile, input_srid=32419,
+                spatial=False, table_stats=True)
+        self.assertEqual(p190._get_maintained_count(p190.HDR_TABLE), -1)
+        p190.close()
+
+        os.remove(dbfile)
+
+    def test_write_sps(self):
+        """
+        Should write S, R, and X records in chunks
+        """
+        p190 = database.P190Database(input_srid=32419, spatial=False)
+        p190.read_p190(get_example_file(P190_FILES[0][0]))
+
+        basename = 'temp_sps'
+        filenames = p190.write_sps(basename, chunksize=1000)
+
+        lines = {}
+        for k in ['S', 'R', 'X']:
+            with open(filenames[k]) as f:
+                lines[k] = f.read().splitlines()
+            os.remove(filenames[k])
+
+            # should have a header and 80-column records
+            self.assertTrue(lines[k][0].startswith('H00'))
+            for line in lines[k][1:]:
+                self.assertEqual(len(line), 80)
+                self.assertEqual(line[0], k)
+
+        sql = "SELECT COUNT(*) FROM '{:}' WHERE record_id='S'"\
+                .format(p190.COORD_TABLE)
+        self.assertEqual(len(lines['S']) - 1,
+                p190.execute(sql).fetchone()[0])
+        self.assertEqual(len(lines['R']) - 1, p190.count(p190.REC_PT_TABLE))
+
+        # relations should cover every receiver once
+        nchan = sum([int(l[43:48]) - int(l[38:43]) + 1
+            for l in lines['X'][1:]])
+        nrec = sum([int(float(l[69:79])) - int(float(l[59:69])) + 1
+            for l in lines['X'][1:]])
+        self.assertEqual(nchan, p190.count(p190.REC_PT_TABLE))
+        self.assertEqual(nrec, p190.count(p190.REC_PT_TABLE))
+
+        # receivers should be numbered along the line
+        points = [float(l[11:21]) for l in lines['R'][1:]]
+        self.assertEqual(points, range(1, len(points) + 1))
+
     def XXX__create_drop_spatial_index(self):
         """
         Should (re)build a spatial index
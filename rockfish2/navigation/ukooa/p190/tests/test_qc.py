@@ -0,0 +1,54 @@
+"""
+Test suite for the ukooa.p190.qc module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.utils.loaders import get_example_file
+from rockfish2.navigation.ukooa.p190 import qc
+from rockfish2.navigation.ukooa.p190.p190 import P190
+from rockfish2.navigation.utils.qc import SPIKE
+
+
+class qcTestCase(unittest.TestCase):
+
+    def test_run_navigation_qc(self):
+        """
+        Should store flags for bad shots
+        """
+        filename = get_example_file('MGL1407MCS15.TEST.p190')
+
+        p190 = P190(input_srid=32419)
+        p190.read_p190(filename)
+
+        p190.run_navigation_qc()
+        self.assertTrue(p190.NAV_QC in p190.tables)
+        nflag0 = len(p190.read_navigation_qc(flag=SPIKE))
+
+        # move a shot
+        sql = """SELECT rowid, line, point FROM '{:}' WHERE record_id='S'
+            ORDER BY point LIMIT 1 OFFSET 10""".format(p190.COORD_TABLE)
+        rowid, line, point = p190.execute(sql).fetchone()
+        sql = """UPDATE '{:}' SET geom=ShiftCoords(geom, 500, 500)
+            WHERE rowid=?""".format(p190.COORD_TABLE)
+        p190.execute(sql, (rowid, ))
+
+        dat = p190.run_navigation_qc(lines=[line])
+        spikes = p190.read_navigation_qc(flag=SPIKE)
+        self.assertTrue(len(spikes) > nflag0)
+        self.assertTrue(rowid in spikes[spikes['source'] == qc.QC_SOURCE]
+                ['id'].tolist())
+        self.assertEqual(len(dat), p190.count(p190.NAV_QC))
+
+        # should find lines with new shots
+        self.assertEqual(p190.get_lines_since(0), [line])
+        self.assertEqual(p190.get_lines_since(1e9), [])
+
+
+def suite():
+    testSuite = unittest.makeSuite(qcTestCase, 'test')
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
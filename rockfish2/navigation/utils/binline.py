@@ -0,0 +1,450 @@
+"""
+Arc-length parameterization of lines for binning and QC
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+from rockfish2.navigation.utils.cartesian import cumdist
+
+
+class BinLine(object):
+    """
+    Line with precomputed arc-length and segment tables
+
+    Distances along the line are measured from the first point.
+    Crossline distances are positive to the left of the line direction
+    (i.e., counterclockwise from the direction of increasing distance).
+
+    Parameters
+    ----------
+    x, y: array_like
+        Coordinates of the points defining the line. Arrays must be of
+        equal length, with at least two points.
+
+    Examples
+    --------
+    >>> line = BinLine([0, 10, 10], [0, 0, 10])
+    >>> print line.length
+    20.0
+    >>> x, y = line.xy([5, 15])
+    >>> print x.tolist(), y.tolist()
+    [5.0, 10.0] [0.0, 5.0]
+    >>> distance, crossline = line.project([5, 12], [1, 15])
+    >>> print distance.tolist(), crossline.tolist()
+    [5.0, 25.0] [1.0, -2.0]
+    """
+    def __init__(self, x, y):
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        assert len(self.x) == len(self.y), 'Arrays must have the same length'
+        assert len(self.x) > 1, 'Line must have at least two points'
+
+        # arc length at each point
+        self.distance = cumdist(self.x, self.y)
+
+        # segment tables
+        self.dx = np.diff(self.x)
+        self.dy = np.diff(self.y)
+        self.segment_length = np.diff(self.distance)
+        _length = np.where(self.segment_length > 0, self.segment_length, 1.)
+        self.ux = self.dx / _length
+        self.uy = self.dy / _length
+
+        self._tree = None
+        self._segment_tree = None
+
+    def __len__(self):
+
+        return len(self.x)
+
+    def _get_length(self):
+
+        return self.distance[-1]
+
+    length = property(fget=_get_length)
+
+    def _get_tree(self):
+        """
+        KD-tree of the line points, built on first use
+        """
+        if self._tree is None:
+            self._tree = cKDTree(np.column_stack((self.x, self.y)))
+        return self._tree
+
+    tree = property(fget=_get_tree)
+
+    def _get_segment_tree(self):
+        """
+        KD-tree of the segment midpoints, built on first use
+        """
+        if self._segment_tree is None:
+            self._segment_tree = cKDTree(np.column_stack((
+                self.x[:-1] + self.dx / 2., self.y[:-1] + self.dy / 2.)))
+        return self._segment_tree
+
+    segment_tree = property(fget=_get_segment_tree)
+
+    def segment(self, distance):
+        """
+        Find the segments containing distances along the line
+
+        Parameters
+        ----------
+        distance: array_like
+            Distances along the line.
+
+        Returns
+        -------
+        iseg: numpy.ndarray
+            Index of the segment for each distance. Distances before the
+            start or after the end of the line are placed in the first or
+            last segment.
+        """
+        iseg = np.searchsorted(self.distance, np.atleast_1d(distance),
+                side='right') - 1
+        return np.clip(iseg, 0, len(self.segment_length) - 1)
+
+    def xy(self, distance, bounds_error=True):
+        """
+        Calculate coordinates at distances along the line
+
+        Parameters
+        ----------
+        distance: array_like
+            Distances along the line.
+        bounds_error: bool, optional
+            If `True` (default), raises a `ValueError` for distances
+            outside of the line. If `False`, points beyond the ends of the
+            line are extrapolated along the first or last segment.
+
+        Returns
+        -------
+        x, y: numpy.ndarray
+            Coordinates of the points.
+        """
+        distance = np.atleast_1d(distance).astype(float)
+
+        if bounds_error and (len(distance) > 0):
+            if distance.min() < 0:
+                raise ValueError('A value in distance is below the'
+                        ' interpolation range: min(distance) = {:} < 0.'\
+                                .format(distance.min()))
+            if distance.max() > self.length:
+                raise ValueError('A value in distance is above the'
+                        ' interpolation range: max(distance) = {:} > {:}.'\
+                                .format(distance.max(), self.length))
+
+        iseg = self.segment(distance)
+        ds = distance - self.distance[iseg]
+
+        return (self.x[iseg] + ds * self.ux[iseg],
+                self.y[iseg] + ds * self.uy[iseg])
+
+    def direction(self, distance):
+        """
+        Calculate the direction of the line at distances along the line
+
+        Parameters
+        ----------
+        distance: array_like
+            Distances along the line.
+
+        Returns
+        -------
+        theta: numpy.ndarray
+            Direction of the line in radians, counterclockwise from the
+            x-axis.
+        """
+        iseg = self.segment(distance)
+        return np.arctan2(self.uy[iseg], self.ux[iseg])
+
+    def stations(self, spacing, start=0.):
+        """
+        Evenly distribute stations along the line
+
+        Parameters
+        ----------
+        spacing: float
+            Distance between stations.
+        start: float, optional
+            Distance to the first station. Default is 0.
+
+        Returns
+        -------
+        distance, x, y: numpy.ndarray
+            Distances along the line and coordinates of the stations.
+        """
+        distance = np.arange(start, self.length, spacing)
+        x, y = self.xy(distance)
+
+        return distance, x, y
+
+    def _project_segments(self, x, y, iseg):
+        """
+        Project points onto segments
+
+        Projections are limited to the segments, except before the first
+        and after the last segment, where points are projected onto the
+        extended line. The distance from each point to the nearest point on
+        the segment itself is also returned.
+        """
+        px = x - self.x[iseg]
+        py = y - self.y[iseg]
+
+        t = px * self.ux[iseg] + py * self.uy[iseg]
+        t0 = np.where(iseg == 0, -np.inf, 0.)
+        t1 = np.where(iseg == len(self.segment_length) - 1, np.inf,
+                self.segment_length[iseg])
+        _t = np.clip(t, 0., self.segment_length[iseg])
+        t = np.clip(t, t0, t1)
+
+        # offset from the projection
+        ex = px - t * self.ux[iseg]
+        ey = py - t * self.uy[iseg]
+        crossline = self.ux[iseg] * ey - self.uy[iseg] * ex
+
+        r = np.hypot(px - _t * self.ux[iseg], py - _t * self.uy[iseg])
+
+        return self.distance[iseg] + t, crossline, r
+
+    def project(self, x, y, k=2):
+        """
+        Find distances along and across the line for points
+
+        Each point is projected onto the nearest segment. Segments that
+        connect to the `k` line points nearest to each point are checked
+        first, and then all segments with midpoints close enough to be
+        nearer, so that the nearest segment is found for folded lines too.
+
+        Parameters
+        ----------
+        x, y: array_like
+            Coordinates of the points to project.
+        k: int, optional
+            Number of nearest line points to take candidate segments from.
+            Default is 2.
+
+        Returns
+        -------
+        distance, crossline: numpy.ndarray
+            Distance along the line to the projection of each point, and
+            the signed distance from the line (positive to the left).
+        """
+        x = np.atleast_1d(x).astype(float)
+        y = np.atleast_1d(y).astype(float)
+        nseg = len(self.segment_length)
+
+        k = min(k, len(self))
+        _, ipt = self.tree.query(np.column_stack((x, y)), k=k)
+        ipt = np.reshape(ipt, (len(x), k))
+
+        distance = np.zeros(len(x))
+        crossline = np.zeros(len(x))
+        best = np.inf * np.ones(len(x))
+
+        def _update(i, iseg):
+            _distance, _crossline, _r = self._project_segments(x[i], y[i],
+                    iseg)
+            better = _r < best[i]
+            distance[i[better]] = _distance[better]
+            crossline[i[better]] = _crossline[better]
+            best[i[better]] = _r[better]
+
+        i = np.arange(len(x))
+        for _ipt in ipt.T:
+            for iseg in [_ipt - 1, _ipt]:
+                _update(i, np.clip(iseg, 0, nseg - 1))
+
+        # a nearer segment has its midpoint within the best distance so
+        # far plus half of the longest segment; query nearest midpoints
+        # until all of those segments have been checked
+        radius = best + 0.5 * np.max(self.segment_length)
+        k = min(4 * k, nseg)
+        while (len(i) > 0) and (nseg > 1):
+            _r, iseg = self.segment_tree.query(np.column_stack((x[i],
+                y[i])), k=k)
+            _r = np.reshape(_r, (len(i), k))
+            iseg = np.reshape(iseg, (len(i), k))
+            within = _r <= radius[i][:, np.newaxis]
+            for j in range(k):
+                _update(i[within[:, j]], iseg[within[:, j], j])
+            if k == nseg:
+                break
+            i = i[within[:, -1]]
+            k = min(2 * k, nseg)
+
+        return distance, crossline
+
+    def nearest(self, distance):
+        """
+        Find the nearest line points to distances along the line
+
+        Parameters
+        ----------
+        distance: array_like
+            Distances along the line.
+
+        Returns
+        -------
+        ipt: numpy.ndarray
+            Index of the nearest line point for each distance.
+        """
+        distance = np.atleast_1d(distance)
+        j = np.clip(np.searchsorted(self.distance, distance), 1,
+                len(self) - 1)
+        before = (distance - self.distance[j - 1])\
+                <= (self.distance[j] - distance)
+
+        return np.where(before, j - 1, j)
+
+
+class LineSet(object):
+    """
+    Many lines packed into ragged arrays, with cached arc-length tables
+
+    Points for all lines are stored in single arrays, and points for line
+    ``i`` are ``x[index[i]:index[i + 1]]``. Cumulative distances are
+    calculated once for all lines, and each line is shifted to its own
+    range of a single increasing distance axis, so that coordinates for any
+    number of lines are interpolated with one call to :func:`numpy.interp`.
+
+    Parameters
+    ----------
+    x, y: array_like
+        Coordinates of the points for all lines, concatenated.
+    index: array_like
+        Index of the first point of each line in `x`, `y`, followed by
+        the total number of points. Each line must have at least one point.
+
+    Examples
+    --------
+    >>> lines = LineSet.from_lines([([0, 10], [0, 0]), ([0, 0, 5], [0, 5, 5])])
+    >>> print lines.length.tolist()
+    [10.0, 10.0]
+    >>> x, y = lines.distribute([2, 4, 7], [0, 1, 3])
+    >>> print x.tolist(), y.tolist()
+    [2.0, 0.0, 2.0] [0.0, 4.0, 5.0]
+    """
+    def __init__(self, x, y, index):
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.index = np.asarray(index, dtype=int)
+        assert len(self.x) == len(self.y), 'Arrays must have the same length'
+        assert self.index[0] == 0 and self.index[-1] == len(self.x),\
+                'index must start at 0 and end at the number of points'
+        assert np.all(np.diff(self.index) > 0),\
+                'Each line must have at least one point'
+
+        # line number for each point
+        self.line = np.repeat(np.arange(len(self)), np.diff(self.index))
+
+        # cumulative distance along each line
+        r = np.zeros(len(self.x))
+        r[1:] = np.hypot(np.diff(self.x), np.diff(self.y))
+        r[self.index[:-1]] = 0.
+        r = np.cumsum(r)
+        self.distance = r - r[self.index[:-1]][self.line]
+        self.length = self.distance[self.index[1:] - 1]
+
+        # offset of each line on a single, increasing distance axis
+        self._base = np.zeros(len(self))
+        self._base[1:] = np.cumsum(self.length[:-1] + 1.)
+        self._distance = self.distance + self._base[self.line]
+
+    def __len__(self):
+
+        return len(self.index) - 1
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        Create a line set from a list of lines
+
+        Parameters
+        ----------
+        lines: list
+            List of ``(x, y)`` coordinate arrays for each line.
+
+        Returns
+        -------
+        lines: :class:`LineSet`
+            New line set.
+        """
+        x = np.concatenate([np.atleast_1d(l[0]) for l in lines])
+        y = np.concatenate([np.atleast_1d(l[1]) for l in lines])
+        index = np.zeros(len(lines) + 1, dtype=int)
+        index[1:] = np.cumsum([len(np.atleast_1d(l[0])) for l in lines])
+
+        return cls(x, y, index)
+
+    def xy(self, line, distance, bounds_error=True):
+        """
+        Calculate coordinates at distances along lines
+
+        Parameters
+        ----------
+        line: array_like
+            Line number for each distance.
+        distance: array_like
+            Distances along the lines.
+        bounds_error: bool, optional
+            If `True` (default), raises a `ValueError` for distances
+            outside of their lines. If `False`, coordinates for these
+            distances are NaN.
+
+        Returns
+        -------
+        x, y: numpy.ndarray
+            Coordinates of the points.
+        """
+        line = np.atleast_1d(line).astype(int)
+        distance = np.atleast_1d(distance).astype(float)
+
+        # allow for rounding in the cumulative distances of all lines
+        tol = 1e-9 * (1. + self._distance[-1])
+        outside = (distance < -tol) | (distance > self.length[line] + tol)
+        if bounds_error and np.any(outside):
+            i = np.nonzero(outside)[0][0]
+            raise ValueError('A value in distance is outside of the'
+                    ' interpolation range: distance = {:} for line {:}'
+                    ' with length {:}.'.format(distance[i], line[i],
+                        self.length[line[i]]))
+
+        _distance = np.clip(distance, 0., self.length[line])\
+                + self._base[line]
+        x = np.interp(_distance, self._distance, self.x)
+        y = np.interp(_distance, self._distance, self.y)
+        x[outside] = np.nan
+        y[outside] = np.nan
+
+        return x, y
+
+    def distribute(self, distance, index, bounds_error=True):
+        """
+        Calculate coordinates at ragged arrays of distances along lines
+
+        Parameters
+        ----------
+        distance: array_like
+            Distances along all lines, concatenated.
+        index: array_like
+            Index of the first distance for each line in `distance`,
+            followed by the total number of distances.
+        bounds_error: bool, optional
+            If `True` (default), raises a `ValueError` for distances
+            outside of their lines. If `False`, coordinates for these
+            distances are NaN.
+
+        Returns
+        -------
+        x, y: numpy.ndarray
+            Coordinates of the points, packed in the same order as
+            `distance`.
+        """
+        index = np.asarray(index, dtype=int)
+        assert len(index) == len(self) + 1,\
+                'index must have one more value than the number of lines'
+        line = np.repeat(np.arange(len(self)), np.diff(index))
+
+        return self.xy(line, distance, bounds_error=bounds_error)
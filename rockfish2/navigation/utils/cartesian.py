@@ -32,6 +32,33 @@ def dist(x0, y0, x1, y1):
     return np.sqrt(dx ** 2 + dy ** 2)
 
 
+def azimuth(x0, y0, x1, y1):
+    """
+    Calculate azimuths from points in (x0, y0) to points in (x1, y1)
+
+    Parameters
+    ----------
+    x0, y0: array_like
+        Coordinates of origin points.
+    x1, y1: array_like
+        Coordinates of destination points.
+
+    Returns
+    -------
+    azimuth: numpy.ndarray
+        Azimuths in degrees clockwise from the +y-axis (grid north), in
+        the range [0, 360).
+
+    Examples
+    --------
+    >>> azimuth(0, 0, [0, 1, 0, -1], [1, 0, -1, 0]).tolist()
+    [0.0, 90.0, 180.0, 270.0]
+    """
+    dx = np.atleast_1d(x1) - np.atleast_1d(x0)
+    dy = np.atleast_1d(y1) - np.atleast_1d(y0)
+    return np.degrees(np.arctan2(dx, dy)) % 360.
+
+
 def cumdist(x, y):
     """
     Calculate cumlative cartestian distance along a line
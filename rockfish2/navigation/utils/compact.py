@@ -0,0 +1,147 @@
+"""
+Compact integer encoding of per-channel values
+"""
+import numpy as np
+
+# value for missing channels
+NULL_INT32 = np.iinfo(np.int32).min
+
+
+def pack_channels(groups, chan, values, scale=100.):
+    """
+    Pack values for each channel into one int32 array per group
+
+    Values are scaled, rounded, and stored as little-endian int32 values.
+    Channels are implicit from their position in each array, starting at
+    the first channel in the group. Missing channels and NaN values are
+    stored as `NULL_INT32`.
+
+    Parameters
+    ----------
+    groups: array_like
+        Integer group number (e.g., shot and cable) for each channel.
+    chan: array_like
+        Integer channel number for each channel.
+    values: array_like
+        Values for each channel, with shape ``(nchan,)`` or
+        ``(nchan, nvalue)``.
+    scale: float, optional
+        Scale factor applied to values before rounding. Default is 100,
+        e.g., to store meters as integer centimeters.
+
+    Returns
+    -------
+    ugroups: numpy.ndarray
+        Sorted group numbers.
+    chan0: numpy.ndarray
+        First channel in each group.
+    nchan: numpy.ndarray
+        Number of channels from the first to the last channel in each
+        group.
+    blobs: list
+        Packed values for each group, as buffers of
+        ``nchan * nvalue`` int32 values.
+
+    Examples
+    --------
+    >>> ugroups, chan0, nchan, blobs = pack_channels([1, 1, 2], [3, 5, 1],
+    ...     [0.5, 1.25, -2.])
+    >>> print ugroups.tolist(), chan0.tolist(), nchan.tolist()
+    [1, 2] [3, 1] [3, 1]
+    >>> chan, values = unpack_channels(chan0, nchan, blobs)[1:]
+    >>> print chan.tolist(), values.ravel().tolist()
+    [3, 5, 1] [0.5, 1.25, -2.0]
+    """
+    groups = np.asarray(groups)
+    chan = np.asarray(chan, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    nvalue = values.shape[1]
+
+    order = np.lexsort((chan, groups))
+    groups = groups[order]
+    chan = chan[order]
+    values = values[order]
+
+    ugroups, start = np.unique(groups, return_index=True)
+    end = np.append(start[1:], len(groups)) - 1
+    chan0 = chan[start]
+    nchan = chan[end] - chan0 + 1
+
+    # position of each channel in the packed array
+    first = np.zeros(len(ugroups), dtype=np.int64)
+    first[1:] = np.cumsum(nchan)[:-1]
+    ig = np.repeat(np.arange(len(ugroups)), np.diff(np.append(start,
+        len(groups))))
+    ipos = first[ig] + chan - chan0[ig]
+
+    packed = NULL_INT32 * np.ones((np.sum(nchan), nvalue), dtype='<i4')
+    valid = np.isfinite(values)
+    _values = NULL_INT32 * np.ones(values.shape, dtype='<i4')
+    _values[valid] = np.round(scale * values[valid]).astype('<i4')
+    packed[ipos] = _values
+
+    buf = packed.tostring()
+    size = 4 * nvalue
+    blobs = [buffer(buf[size * i0:size * (i0 + n)])
+            for i0, n in zip(first, nchan)]
+
+    return ugroups, chan0, nchan, blobs
+
+
+def unpack_channels(chan0, nchan, blobs, nvalue=1, scale=100.,
+        keep_null=False):
+    """
+    Unpack values packed with :func:`pack_channels`
+
+    All blobs are joined and decoded with a single call to
+    :func:`numpy.frombuffer`.
+
+    Parameters
+    ----------
+    chan0: array_like
+        First channel in each group.
+    nchan: array_like
+        Number of channels in each group.
+    blobs: list
+        Packed values for each group.
+    nvalue: int, optional
+        Number of values for each channel. Default is 1.
+    scale: float, optional
+        Scale factor that was applied to values. Default is 100.
+    keep_null: bool, optional
+        If `True`, return all channels, with `NULL_INT32` values as NaN.
+        Default is to drop channels with a `NULL_INT32` first value.
+
+    Returns
+    -------
+    igroup: numpy.ndarray
+        Index of the group for each channel.
+    chan: numpy.ndarray
+        Channel number.
+    values: numpy.ndarray
+        Values with shape ``(nchan, nvalue)``. Missing channels are not
+        included, unless `keep_null` is `True`.
+    """
+    chan0 = np.asarray(chan0, dtype=np.int64)
+    nchan = np.asarray(nchan, dtype=np.int64)
+
+    buf = b''.join([bytes(b) for b in blobs])
+    packed = np.frombuffer(buf, dtype='<i4').reshape(-1, nvalue)
+    assert len(packed) == np.sum(nchan),\
+            'Blob sizes do not match the number of channels'
+
+    igroup = np.repeat(np.arange(len(nchan)), nchan)
+    first = np.zeros(len(nchan), dtype=np.int64)
+    first[1:] = np.cumsum(nchan)[:-1]
+    chan = chan0[igroup] + np.arange(len(packed)) - first[igroup]
+
+    values = packed / float(scale)
+    values[packed == NULL_INT32] = np.nan
+    if keep_null:
+        return igroup, chan, values
+
+    keep = packed[:, 0] != NULL_INT32
+
+    return igroup[keep], chan[keep], values[keep]
@@ -0,0 +1,206 @@
+"""
+Fold and coverage statistics for CMP bins
+"""
+import numpy as np
+import pandas as pd
+
+COVERAGE_FIELDS = ['bin', 'fold', 'offset_min', 'offset_max', 'offset_mean',
+        'scatter', 'crossline_mean', 'crossline_std']
+TILE_FIELDS = ['bin', 'offset_class', 'sector', 'fold', 'start']
+
+
+def grid_index(x, y, x0, y0, dx, dy, nx, ny):
+    """
+    Calculate bin numbers for points in a regular grid
+
+    Bins are numbered ``ix * ny + iy``, where ``ix`` and ``iy`` are the
+    column and row of the grid cell containing a point.
+
+    Parameters
+    ----------
+    x, y: array_like
+        Coordinates of the points.
+    x0, y0: float
+        Coordinates of the lower-left corner of the grid.
+    dx, dy: float
+        Cell dimensions.
+    nx, ny: int
+        Number of cells in the x and y directions.
+
+    Returns
+    -------
+    bins: numpy.ndarray
+        Bin number for each point, or -1 for points outside of the grid.
+
+    Examples
+    --------
+    >>> grid_index([0.5, 1.5, 0.5, 9.], [0.5, 0.5, 1.5, 0.], 0, 0, 1, 1,
+    ...     2, 2).tolist()
+    [0, 2, 1, -1]
+    """
+    ix = np.floor((np.asarray(x, dtype=float) - x0) / dx).astype(int)
+    iy = np.floor((np.asarray(y, dtype=float) - y0) / dy).astype(int)
+
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+
+    return np.where(inside, ix * ny + iy, -1)
+
+
+def bin_statistics(bins, offsets, x=None, y=None, crossline=None):
+    """
+    Calculate fold and coverage statistics for bins
+
+    Statistics are calculated for all bins at once with
+    :func:`numpy.bincount` and :func:`numpy.minimum.at` /
+    :func:`numpy.maximum.at`. Bins can be any integer keys, e.g., bin
+    numbers along a bin line or indices from :func:`grid_index`.
+
+    Parameters
+    ----------
+    bins: array_like
+        Bin number for each trace.
+    offsets: array_like
+        Source-receiver offset for each trace.
+    x, y: array_like, optional
+        Midpoint coordinates for each trace. If given, the midpoint
+        scatter (the root-mean-square distance of midpoints from their
+        mean position in each bin) is calculated.
+    crossline: array_like, optional
+        Crossline distance of each midpoint from the bin line. If given,
+        the mean and standard deviation of crossline distances are
+        calculated.
+
+    Returns
+    -------
+    stats: :class:`pandas.DataFrame`
+        Statistics for each bin, with columns given by `COVERAGE_FIELDS`.
+        Statistics that are not calculated are NaN.
+
+    Examples
+    --------
+    >>> stats = bin_statistics([1, 1, 2], [100., 300., 200.])
+    >>> stats['fold'].tolist()
+    [2, 1]
+    >>> stats['offset_mean'].tolist()
+    [200.0, 200.0]
+    """
+    bins = np.asarray(bins)
+    offsets = np.asarray(offsets, dtype=float)
+
+    ubins, ib = np.unique(bins, return_inverse=True)
+    nbin = len(ubins)
+
+    fold = np.bincount(ib, minlength=nbin)
+    _fold = np.maximum(fold, 1).astype(float)
+
+    offset_min = np.inf * np.ones(nbin)
+    offset_max = -np.inf * np.ones(nbin)
+    np.minimum.at(offset_min, ib, offsets)
+    np.maximum.at(offset_max, ib, offsets)
+    offset_mean = np.bincount(ib, weights=offsets, minlength=nbin) / _fold
+
+    scatter = np.nan * np.ones(nbin)
+    if (x is not None) and (y is not None):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        xm = np.bincount(ib, weights=x, minlength=nbin) / _fold
+        ym = np.bincount(ib, weights=y, minlength=nbin) / _fold
+        r2 = (x - xm[ib]) ** 2 + (y - ym[ib]) ** 2
+        scatter = np.sqrt(np.bincount(ib, weights=r2, minlength=nbin)
+                / _fold)
+
+    crossline_mean = np.nan * np.ones(nbin)
+    crossline_std = np.nan * np.ones(nbin)
+    if crossline is not None:
+        crossline = np.asarray(crossline, dtype=float)
+        crossline_mean = np.bincount(ib, weights=crossline,
+                minlength=nbin) / _fold
+        crossline_std = np.sqrt(np.bincount(ib,
+            weights=(crossline - crossline_mean[ib]) ** 2,
+            minlength=nbin) / _fold)
+
+    stats = pd.DataFrame({'bin': ubins, 'fold': fold,
+        'offset_min': offset_min, 'offset_max': offset_max,
+        'offset_mean': offset_mean, 'scatter': scatter,
+        'crossline_mean': crossline_mean, 'crossline_std': crossline_std})
+
+    return stats[COVERAGE_FIELDS]
+
+
+def offset_vector_tiles(bins, offsets, azimuths, offset_edges, nsector=1,
+        azimuth0=0.):
+    """
+    Sort traces into offset-class and azimuth-sector tiles for each bin
+
+    Each trace is given a (bin, offset class, azimuth sector) key, and
+    traces are sorted by key and then by offset with a single
+    :func:`numpy.lexsort`.
+
+    Parameters
+    ----------
+    bins: array_like
+        Bin number for each trace.
+    offsets: array_like
+        Source-receiver offset for each trace.
+    azimuths: array_like
+        Source-receiver azimuth for each trace, in degrees.
+    offset_edges: array_like
+        Increasing offsets at the edges of the offset classes. Offset
+        class ``i`` includes offsets in
+        ``[offset_edges[i], offset_edges[i + 1])``. Traces with offsets
+        outside of the edges are not included in any tile.
+    nsector: int, optional
+        Number of equal azimuth sectors. Default is 1.
+    azimuth0: float, optional
+        Azimuth at the start of the first sector. Default is 0.
+
+    Returns
+    -------
+    tiles: :class:`pandas.DataFrame`
+        Tiles with at least one trace, with columns given by `TILE_FIELDS`.
+        ``start`` is the index of the first trace for the tile in `order`.
+    order: numpy.ndarray
+        Indices of the traces included in tiles, sorted by bin, offset
+        class, sector, and offset.
+
+    Examples
+    --------
+    >>> tiles, order = offset_vector_tiles([1, 1, 1, 2],
+    ...     [50., 150., 10., 75.], [10., 10., 200., 10.], [0, 100, 200],
+    ...     nsector=2)
+    >>> tiles[['bin', 'offset_class', 'sector', 'fold']].values.tolist()
+    [[1, 0, 0, 1], [1, 0, 1, 1], [1, 1, 0, 1], [2, 0, 0, 1]]
+    >>> order.tolist()
+    [0, 2, 1, 3]
+    """
+    bins = np.asarray(bins)
+    offsets = np.asarray(offsets, dtype=float)
+    azimuths = np.asarray(azimuths, dtype=float)
+    offset_edges = np.asarray(offset_edges, dtype=float)
+
+    offset_class = np.searchsorted(offset_edges, offsets, side='right') - 1
+    sector = np.floor(((azimuths - azimuth0) % 360.)
+            / (360. / nsector)).astype(int)
+    sector = np.minimum(sector, nsector - 1)
+
+    keep = np.nonzero((offset_class >= 0)
+            & (offset_class < len(offset_edges) - 1))[0]
+    order = keep[np.lexsort((offsets[keep], sector[keep],
+        offset_class[keep], bins[keep]))]
+
+    _bins = bins[order]
+    _offset_class = offset_class[order]
+    _sector = sector[order]
+
+    # first trace in each tile
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (np.diff(_bins) != 0) | (np.diff(_offset_class) != 0)\
+            | (np.diff(_sector) != 0)
+    start = np.nonzero(new)[0]
+    fold = np.diff(np.append(start, len(order)))
+
+    tiles = pd.DataFrame({'bin': _bins[start],
+        'offset_class': _offset_class[start], 'sector': _sector[start],
+        'fold': fold, 'start': start})
+
+    return tiles[TILE_FIELDS], order
@@ -0,0 +1,383 @@
+"""
+Vectorized geodesic calculations for geographic coordinates
+
+All functions take longitudes and latitudes in degrees and return
+distances in meters and azimuths in degrees clockwise from north. Inputs
+are broadcast against each other, so one point can be compared to many.
+With ``pairwise=True``, distances are calculated between all pairs of
+points in the first and second sets of coordinates.
+"""
+import warnings
+import numpy as np
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+
+# mean radius of the earth for spherical calculations
+EARTH_RADIUS = 6371008.8
+
+
+def _broadcast(lon0, lat0, lon1, lat1, pairwise=False):
+    """
+    Convert coordinates to radians and broadcast them for pairwise
+    calculations
+    """
+    lon0 = np.radians(np.asarray(lon0, dtype=float))
+    lat0 = np.radians(np.asarray(lat0, dtype=float))
+    lon1 = np.radians(np.asarray(lon1, dtype=float))
+    lat1 = np.radians(np.asarray(lat1, dtype=float))
+
+    if pairwise:
+        lon0 = np.ravel(lon0)[:, np.newaxis]
+        lat0 = np.ravel(lat0)[:, np.newaxis]
+        lon1 = np.ravel(lon1)[np.newaxis, :]
+        lat1 = np.ravel(lat1)[np.newaxis, :]
+
+    return np.broadcast_arrays(lon0, lat0, lon1, lat1)
+
+
+def _wrap(lon):
+    """
+    Wrap longitudes in degrees to [-180, 180)
+    """
+    return (lon + 180.) % 360. - 180.
+
+
+def haversine(lon0, lat0, lon1, lat1, radius=EARTH_RADIUS, pairwise=False):
+    """
+    Calculate great-circle distances on a sphere
+
+    Parameters
+    ----------
+    lon0, lat0: array_like
+        Coordinates of the first points, in degrees.
+    lon1, lat1: array_like
+        Coordinates of the second points, in degrees.
+    radius: float, optional
+        Radius of the sphere. Default is the mean radius of the earth in
+        meters.
+    pairwise: bool, optional
+        If `True`, calculate distances between all pairs of first and second
+        points, returning an array with shape ``(n0, n1)``. Default is to
+        broadcast the first points against the second points.
+
+    Returns
+    -------
+    distance: numpy.ndarray
+        Great-circle distances, in the units of `radius`.
+
+    Examples
+    --------
+    >>> print round(float(haversine(0, 0, 0, 1, radius=180. / np.pi)), 6)
+    1.0
+    >>> haversine([0, 1], [0, 0], [0, 1, 2], [0, 0, 0],
+    ...     pairwise=True).shape
+    (2, 3)
+    """
+    lon0, lat0, lon1, lat1 = _broadcast(lon0, lat0, lon1, lat1,
+            pairwise=pairwise)
+
+    h = np.sin((lat1 - lat0) / 2.) ** 2\
+            + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2.) ** 2
+
+    return 2. * radius * np.arcsin(np.sqrt(np.minimum(h, 1.)))
+
+
+def spherical_azimuth(lon0, lat0, lon1, lat1, pairwise=False):
+    """
+    Calculate initial great-circle azimuths from first to second points
+
+    Parameters
+    ----------
+    lon0, lat0: array_like
+        Coordinates of the first points, in degrees.
+    lon1, lat1: array_like
+        Coordinates of the second points, in degrees.
+    pairwise: bool, optional
+        If `True`, calculate azimuths between all pairs of first and second
+        points. Default is to broadcast the first points against the
+        second points.
+
+    Returns
+    -------
+    azimuth: numpy.ndarray
+        Azimuths at the first points in degrees clockwise from north, in
+        the range [0, 360).
+
+    Examples
+    --------
+    >>> spherical_azimuth(0, 0, [0, 1, 0, -1], [1, 0, -1, 0]).tolist()
+    [0.0, 90.0, 180.0, 270.0]
+    """
+    lon0, lat0, lon1, lat1 = _broadcast(lon0, lat0, lon1, lat1,
+            pairwise=pairwise)
+
+    dlon = lon1 - lon0
+    az = np.degrees(np.arctan2(np.sin(dlon) * np.cos(lat1),
+        np.cos(lat0) * np.sin(lat1)
+        - np.sin(lat0) * np.cos(lat1) * np.cos(dlon)))
+
+    return az % 360.
+
+
+def spherical_forward(lon0, lat0, azimuth, distance, radius=EARTH_RADIUS):
+    """
+    Calculate points at distances and azimuths along great circles
+
+    Parameters
+    ----------
+    lon0, lat0: array_like
+        Coordinates of the starting points, in degrees.
+    azimuth: array_like
+        Initial azimuths, in degrees clockwise from north.
+    distance: array_like
+        Distances along the great circles, in the units of `radius`.
+    radius: float, optional
+        Radius of the sphere. Default is the mean radius of the earth in
+        meters.
+
+    Returns
+    -------
+    lon1, lat1: numpy.ndarray
+        Coordinates of the end points, in degrees, with longitudes in the
+        range [-180, 180).
+
+    Examples
+    --------
+    >>> lon1, lat1 = spherical_forward(0, 0, 90, 1, radius=180. / np.pi)
+    >>> print round(float(lon1), 6), round(float(lat1), 6)
+    1.0 0.0
+    """
+    lon0 = np.radians(np.asarray(lon0, dtype=float))
+    lat0 = np.radians(np.asarray(lat0, dtype=float))
+    azimuth = np.radians(np.asarray(azimuth, dtype=float))
+    delta = np.asarray(distance, dtype=float) / radius
+
+    lat1 = np.arcsin(np.sin(lat0) * np.cos(delta)
+            + np.cos(lat0) * np.sin(delta) * np.cos(azimuth))
+    lon1 = lon0 + np.arctan2(np.sin(azimuth) * np.sin(delta) * np.cos(lat0),
+            np.cos(delta) - np.sin(lat0) * np.sin(lat1))
+
+    return _wrap(np.degrees(lon1)), np.degrees(lat1)
+
+
+def vincenty_inverse(lon0, lat0, lon1, lat1, a=WGS84_A, f=WGS84_F,
+        pairwise=False, tol=1e-12, maxiter=200):
+    """
+    Calculate ellipsoidal distances and azimuths between points
+
+    Uses Vincenty's iterative solution of the inverse geodesic problem.
+    All points are iterated together, and points stop updating once they
+    have converged.
+
+    Parameters
+    ----------
+    lon0, lat0: array_like
+        Coordinates of the first points, in degrees.
+    lon1, lat1: array_like
+        Coordinates of the second points, in degrees.
+    a: float, optional
+        Semi-major axis of the ellipsoid. Default is the WGS84 value in
+        meters.
+    f: float, optional
+        Flattening of the ellipsoid. Default is the WGS84 value.
+    pairwise: bool, optional
+        If `True`, calculate distances between all pairs of first and second
+        points. Default is to broadcast the first points against the
+        second points.
+    tol: float, optional
+        Convergence tolerance for the change in longitude on the auxiliary
+        sphere, in radians. Default is 1e-12.
+    maxiter: int, optional
+        Maximum number of iterations. Default is 200.
+
+    Returns
+    -------
+    distance: numpy.ndarray
+        Distances along the ellipsoid, in the units of `a`. Distances for
+        points that do not converge (nearly antipodal points) are NaN.
+    azimuth0: numpy.ndarray
+        Forward azimuths at the first points, in degrees in [0, 360).
+    azimuth1: numpy.ndarray
+        Back azimuths from the second points to the first points, in
+        degrees in [0, 360).
+
+    Examples
+    --------
+    >>> distance, az0, az1 = vincenty_inverse(0, 0, 1, 0)
+    >>> print round(float(distance), 3), float(az0), float(az1)
+    111319.491 90.0 270.0
+    """
+    lon0, lat0, lon1, lat1 = _broadcast(lon0, lat0, lon1, lat1,
+            pairwise=pairwise)
+    shape = lon0.shape
+    lon0, lat0, lon1, lat1 = [np.ravel(v) for v in [lon0, lat0, lon1, lat1]]
+    b = (1 - f) * a
+
+    L = lon1 - lon0
+    U0 = np.arctan((1 - f) * np.tan(lat0))
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    sinU0, cosU0 = np.sin(U0), np.cos(U0)
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+
+    lam = L.copy()
+    active = np.ones(L.shape, dtype=bool)
+    sin_sigma = np.zeros(L.shape)
+    cos_sigma = np.ones(L.shape)
+    sigma = np.zeros(L.shape)
+    cos2_alpha = np.ones(L.shape)
+    cos_2sigma_m = np.zeros(L.shape)
+
+    for _ in range(maxiter):
+        if not np.any(active):
+            break
+
+        _lam = lam[active]
+        _sinU0, _cosU0 = sinU0[active], cosU0[active]
+        _sinU1, _cosU1 = sinU1[active], cosU1[active]
+
+        sin_lam, cos_lam = np.sin(_lam), np.cos(_lam)
+        _sin_sigma = np.hypot(_cosU1 * sin_lam,
+                _cosU0 * _sinU1 - _sinU0 * _cosU1 * cos_lam)
+        _cos_sigma = _sinU0 * _sinU1 + _cosU0 * _cosU1 * cos_lam
+        _sigma = np.arctan2(_sin_sigma, _cos_sigma)
+
+        # coincident points have sin_sigma == 0
+        _sin_alpha = np.where(_sin_sigma == 0, 0.,
+                _cosU0 * _cosU1 * sin_lam
+                / np.where(_sin_sigma == 0, 1., _sin_sigma))
+        _cos2_alpha = 1 - _sin_alpha ** 2
+
+        # equatorial lines have cos2_alpha == 0
+        _cos_2sigma_m = np.where(_cos2_alpha == 0, 0.,
+                _cos_sigma - 2 * _sinU0 * _sinU1
+                / np.where(_cos2_alpha == 0, 1., _cos2_alpha))
+
+        C = f / 16 * _cos2_alpha * (4 + f * (4 - 3 * _cos2_alpha))
+        _lam1 = L[active] + (1 - C) * f * _sin_alpha * (_sigma + C
+                * _sin_sigma * (_cos_2sigma_m + C * _cos_sigma
+                    * (-1 + 2 * _cos_2sigma_m ** 2)))
+
+        lam[active] = _lam1
+        sin_sigma[active] = _sin_sigma
+        cos_sigma[active] = _cos_sigma
+        sigma[active] = _sigma
+        cos2_alpha[active] = _cos2_alpha
+        cos_2sigma_m[active] = _cos_2sigma_m
+
+        idx = np.nonzero(active)
+        active[idx] = np.abs(_lam1 - _lam) > tol
+
+    if np.any(active):
+        warnings.warn('{:} points failed to converge after {:} iterations'\
+                .format(np.sum(active), maxiter))
+
+    u2 = cos2_alpha * (a ** 2 - b ** 2) / b ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (cos_sigma
+        * (-1 + 2 * cos_2sigma_m ** 2) - B / 6 * cos_2sigma_m
+        * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+
+    distance = b * A * (sigma - delta_sigma)
+    distance[active] = np.nan
+
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    az0 = np.degrees(np.arctan2(cosU1 * sin_lam,
+        cosU0 * sinU1 - sinU0 * cosU1 * cos_lam))
+    az1 = np.degrees(np.arctan2(cosU0 * sin_lam,
+        -sinU0 * cosU1 + cosU0 * sinU1 * cos_lam))
+
+    return (np.reshape(distance, shape), np.reshape(az0 % 360., shape),
+            np.reshape((az1 + 180.) % 360., shape))
+
+
+def vincenty_forward(lon0, lat0, azimuth, distance, a=WGS84_A, f=WGS84_F,
+        tol=1e-12, maxiter=200):
+    """
+    Calculate points at distances and azimuths along ellipsoidal geodesics
+
+    Uses Vincenty's iterative solution of the direct geodesic problem.
+
+    Parameters
+    ----------
+    lon0, lat0: array_like
+        Coordinates of the starting points, in degrees.
+    azimuth: array_like
+        Initial azimuths, in degrees clockwise from north.
+    distance: array_like
+        Distances along the geodesics, in the units of `a`.
+    a: float, optional
+        Semi-major axis of the ellipsoid. Default is the WGS84 value in
+        meters.
+    f: float, optional
+        Flattening of the ellipsoid. Default is the WGS84 value.
+    tol: float, optional
+        Convergence tolerance for the angular distance on the auxiliary
+        sphere, in radians. Default is 1e-12.
+    maxiter: int, optional
+        Maximum number of iterations. Default is 200.
+
+    Returns
+    -------
+    lon1, lat1: numpy.ndarray
+        Coordinates of the end points, in degrees, with longitudes in the
+        range [-180, 180).
+    azimuth1: numpy.ndarray
+        Back azimuths from the end points to the starting points, in
+        degrees in [0, 360).
+
+    Examples
+    --------
+    >>> lon1, lat1, az1 = vincenty_forward(0, 0, 90, 111319.491)
+    >>> print round(float(lon1), 6), round(float(lat1), 6), float(az1)
+    1.0 0.0 270.0
+    """
+    lon0, lat0, azimuth, distance = np.broadcast_arrays(
+            np.radians(np.asarray(lon0, dtype=float)),
+            np.radians(np.asarray(lat0, dtype=float)),
+            np.radians(np.asarray(azimuth, dtype=float)),
+            np.asarray(distance, dtype=float))
+    b = (1 - f) * a
+
+    sin_alpha0, cos_alpha0 = np.sin(azimuth), np.cos(azimuth)
+    tanU0 = (1 - f) * np.tan(lat0)
+    cosU0 = 1 / np.sqrt(1 + tanU0 ** 2)
+    sinU0 = tanU0 * cosU0
+
+    sigma0 = np.arctan2(tanU0, cos_alpha0)
+    sin_alpha = cosU0 * sin_alpha0
+    cos2_alpha = 1 - sin_alpha ** 2
+    u2 = cos2_alpha * (a ** 2 - b ** 2) / b ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+
+    sigma = distance / (b * A)
+    for _ in range(maxiter):
+        cos_2sigma_m = np.cos(2 * sigma0 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (cos_sigma
+            * (-1 + 2 * cos_2sigma_m ** 2) - B / 6 * cos_2sigma_m
+            * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        _sigma = sigma
+        sigma = distance / (b * A) + delta_sigma
+        if np.all(np.abs(sigma - _sigma) <= tol):
+            break
+
+    cos_2sigma_m = np.cos(2 * sigma0 + sigma)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+
+    tmp = sinU0 * sin_sigma - cosU0 * cos_sigma * cos_alpha0
+    lat1 = np.arctan2(sinU0 * cos_sigma + cosU0 * sin_sigma * cos_alpha0,
+            (1 - f) * np.hypot(sin_alpha, tmp))
+    lam = np.arctan2(sin_sigma * sin_alpha0,
+            cosU0 * cos_sigma - sinU0 * sin_sigma * cos_alpha0)
+    C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+    L = lam - (1 - C) * f * sin_alpha * (sigma + C * sin_sigma
+            * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+
+    az1 = np.degrees(np.arctan2(sin_alpha, -tmp))
+
+    return (_wrap(np.degrees(lon0 + L)), np.degrees(lat1),
+            (az1 + 180.) % 360.)
@@ -2,10 +2,14 @@
 Utilities for interacting with the Generic Mapping Tools software
 """
 import numpy as np
+from rockfish2 import logging
 
 SQL2GMT_FORMATS = {'INTEGER': 'integer', 'BLOB': 'string',
         'REAL': 'double', 'TEXT': 'string'}
 
+# size of a SpatiaLite XY POINT geometry blob, in bytes
+POINT_BLOB_SIZE = 60
+
 def pad_for_gmt(value):
     """
     Pads values for use in GMT ASCII file data strings
@@ -58,3 +62,183 @@ def make_data_type_line_from_sql(sql_types):
     """
     sql_types = np.atleast_1d(sql_types)
     return '@T' + '|'.join([SQL2GMT_FORMATS[t] for t in sql_types])
+
+def _python2sql_type(value):
+    """
+    Returns the SQL data type for a Python value
+    """
+    if isinstance(value, (int, long, np.integer)):
+        return 'INTEGER'
+    elif isinstance(value, (float, np.floating)):
+        return 'REAL'
+    else:
+        return 'TEXT'
+
+def _first_value(rows, i):
+    """
+    Returns the first value in a column that is not NULL
+    """
+    for row in rows:
+        if row[i] is not None:
+            return row[i]
+
+def _format_value(value, null=''):
+    """
+    Formats a value for GMT ASCII files, keeping full float precision
+    """
+    if value is None:
+        return null
+    elif isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return 'NaN'
+        return repr(float(value))
+    else:
+        return str(pad_for_gmt(value))
+
+def decode_spatialite_points(blobs):
+    """
+    Decodes SpatiaLite XY POINT geometry blobs in bulk
+
+    All blobs are joined into a single buffer and read as a NumPy array,
+    without calling SpatiaLite for each row.
+
+    Parameters
+    ----------
+    blobs: list
+        SpatiaLite geometry blobs. ``None`` values are returned as NaN.
+
+    Returns
+    -------
+    x, y: numpy.ndarray
+        Coordinates of the points.
+    """
+    x = np.nan * np.ones(len(blobs))
+    y = np.nan * np.ones(len(blobs))
+
+    inotnull = [i for i, b in enumerate(blobs) if b is not None]
+    if len(inotnull) == 0:
+        return x, y
+
+    buf = b''.join([bytes(blobs[i]) for i in inotnull])
+    if len(buf) != POINT_BLOB_SIZE * len(inotnull):
+        raise ValueError('Only SpatiaLite XY POINT geometries can be'
+                ' decoded.')
+    dat = np.frombuffer(buf, dtype=np.uint8).reshape(-1, POINT_BLOB_SIZE)
+
+    if np.any(dat[:, 0] != 0x00) or np.any(dat[:, 38] != 0x7C)\
+            or np.any(dat[:, POINT_BLOB_SIZE - 1] != 0xFE):
+        raise ValueError('Geometries are not SpatiaLite blobs.')
+
+    little = dat[:, 1] == 0x01
+    for endian, rows in [('<', little), ('>', ~little)]:
+        if not np.any(rows):
+            continue
+        _dat = dat[rows]
+        if np.any(_dat[:, 39:43].copy().view(endian + 'i4') != 1):
+            raise ValueError('Only SpatiaLite XY POINT geometries can be'
+                    ' decoded.')
+        xy = _dat[:, 43:59].copy().view(endian + 'f8')
+        idx = np.asarray(inotnull)[rows]
+        x[idx] = xy[:, 0]
+        y[idx] = xy[:, 1]
+
+    return x, y
+
+def write_gmt(db, table, filename, geometry='geom', binary=False,
+        chunksize=100000):
+    """
+    Streams a table, view, or query result to a GMT file
+
+    Rows are read from a database cursor in chunks, so memory use does not
+    grow with the number of rows. If the geometry column is present, point
+    geometries are written in GMT OGR format, with other columns as
+    aspatial data. Otherwise, columns are written as plain ASCII tables.
+
+    Parameters
+    ----------
+    db: :class:`~rockfish2.db.backends.sqlite3.connection.Connection`
+        Database connection to read from.
+    table: str
+        Name of a table or view, or a SELECT statement.
+    filename: str
+        Name of the file to write.
+    geometry: str, optional
+        Name of the column with SpatiaLite point geometries. Default is
+        ``'geom'``.
+    binary: bool, optional
+        If `True`, write GMT native binary data with columns of 8-byte
+        floats (read with ``-bi<ncol>d``), instead of ASCII. All columns
+        must be numeric. The geometry column is written as x and y
+        columns. Default is `False`.
+    chunksize: int, optional
+        Number of rows to read from the database at a time. Default is
+        100000.
+
+    Returns
+    -------
+    columns: list
+        Names of the columns written, in order.
+    """
+    if table.strip().upper().startswith('SELECT'):
+        sql = table
+    else:
+        sql = "SELECT * FROM '{:}'".format(table)
+
+    logging.info('Writing GMT data to {:}...', filename)
+    cur = db.execute(sql)
+    fields = [d[0] for d in cur.description]
+
+    if geometry in fields:
+        igeom = fields.index(geometry)
+        columns = ['x', 'y']
+    else:
+        igeom = None
+        columns = []
+    idata = [i for i, f in enumerate(fields) if i != igeom]
+    columns += [fields[i] for i in idata]
+
+    mode = 'wb' if binary else 'w'
+    nrow = 0
+    with open(filename, mode) as f:
+        header = binary
+
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if len(rows) == 0:
+                break
+
+            if igeom is not None:
+                x, y = decode_spatialite_points([r[igeom] for r in rows])
+
+            if binary:
+                dat = np.asarray([[r[i] for i in idata] for r in rows],
+                        dtype=float).reshape(len(rows), len(idata))
+                if igeom is not None:
+                    dat = np.column_stack((x, y, dat))
+                dat.astype('<f8').tofile(f)
+            elif igeom is not None:
+                if not header:
+                    _fields = [fields[i] for i in idata]
+                    f.write('# @VGMT1.0 @GPOINT\n')
+                    f.write('# ' + make_field_line(_fields) + '\n')
+                    f.write('# ' + make_data_type_line_from_sql(
+                        [_python2sql_type(_first_value(rows, i))
+                            for i in idata]) + '\n')
+                    f.write('# FEATURE_DATA\n')
+                    header = True
+                f.write(''.join(['# @D{:}\n{:} {:}\n'.format('|'.join(
+                    [_format_value(r[i]) for i in idata]),
+                    _format_value(_x), _format_value(_y))
+                    for r, _x, _y in zip(rows, x, y)]))
+            else:
+                if not header:
+                    f.write('# ' + ' '.join(columns) + '\n')
+                    header = True
+                f.write(''.join([' '.join([_format_value(r[i], 'NaN')
+                    for i in idata]) + '\n' for r in rows]))
+
+            nrow += len(rows)
+
+    logging.info('...wrote {:} rows', nrow)
+
+    return columns
@@ -0,0 +1,160 @@
+"""
+In-memory spatial index for navigation points
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class PointIndex(object):
+    """
+    KD-tree index of points with batch nearest-neighbor and radius queries
+
+    Parameters
+    ----------
+    x, y: array_like
+        Coordinates of the points to index. Arrays must be of equal length.
+    ids: array_like, optional
+        Integer id for each point (e.g., database rowids). Default is to use
+        the index of each point in `x`, `y`.
+    leafsize: int, optional
+        Number of points at which the KD-tree switches to brute force.
+        Default is 16.
+
+    Examples
+    --------
+    >>> index = PointIndex([0, 10, 20], [0, 0, 0], ids=[100, 101, 102])
+    >>> distance, ids = index.nearest([1, 19], [0, 1])
+    >>> print ids.tolist()
+    [100, 102]
+    >>> print [_ids.tolist() for _ids in index.within([10], [0], 10)]
+    [[100, 101, 102]]
+    """
+    def __init__(self, x, y, ids=None, leafsize=16):
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        assert len(self.x) == len(self.y), 'Arrays must have the same length'
+
+        if ids is None:
+            ids = np.arange(len(self.x))
+        self.ids = np.asarray(ids, dtype=np.int64)
+        assert len(self.ids) == len(self.x),\
+                'ids must have the same length as x and y'
+
+        self.leafsize = leafsize
+        self.tree = cKDTree(np.column_stack((self.x, self.y)),
+                leafsize=leafsize)
+
+    def __len__(self):
+
+        return len(self.x)
+
+    def _points(self, x, y):
+
+        return np.column_stack((np.atleast_1d(x).astype(float),
+            np.atleast_1d(y).astype(float)))
+
+    def nearest(self, x, y, k=1, distance_upper_bound=np.inf):
+        """
+        Find the k nearest indexed points to each query point
+
+        Parameters
+        ----------
+        x, y: array_like
+            Coordinates of the query points.
+        k: int, optional
+            Number of nearest points to return. Default is 1.
+        distance_upper_bound: float, optional
+            Only return points within this distance of the query points.
+
+        Returns
+        -------
+        distance: numpy.ndarray
+            Distances to the nearest points, sorted by distance, with shape
+            ``(npts,)`` for ``k=1`` or ``(npts, k)`` for ``k>1``. Missing
+            neighbors have infinite distance.
+        ids: numpy.ndarray
+            Ids of the nearest points, with the same shape as `distance`.
+            Missing neighbors have ids of -1.
+        """
+        distance, i = self.tree.query(self._points(x, y), k=k,
+                distance_upper_bound=distance_upper_bound)
+
+        found = i < len(self)
+        ids = np.where(found, self.ids[np.minimum(i, len(self) - 1)], -1)
+
+        return distance, ids
+
+    def within(self, x, y, r):
+        """
+        Find indexed points within a radius of each query point
+
+        Parameters
+        ----------
+        x, y: array_like
+            Coordinates of the query points.
+        r: float
+            Search radius.
+
+        Returns
+        -------
+        ids: list
+            Sorted :class:`numpy.ndarray` of ids for each query point.
+        """
+        ii = self.tree.query_ball_point(self._points(x, y), r)
+
+        return [np.sort(self.ids[np.asarray(i, dtype=int)]) for i in ii]
+
+    def count_within(self, x, y, r):
+        """
+        Count indexed points within a radius of each query point
+
+        Parameters
+        ----------
+        x, y: array_like
+            Coordinates of the query points.
+        r: float
+            Search radius.
+
+        Returns
+        -------
+        count: numpy.ndarray
+            Number of points within `r` of each query point.
+        """
+        return np.asarray([len(i) for i in
+            self.tree.query_ball_point(self._points(x, y), r)])
+
+    def save(self, filename):
+        """
+        Save the indexed points to a NumPy ``.npz`` file
+
+        The KD-tree is rebuilt when the file is loaded with :meth:`load`.
+
+        Parameters
+        ----------
+        filename: str
+            Name of the file to write. ``.npz`` is appended if it is not
+            already in the name.
+        """
+        np.savez(filename, x=self.x, y=self.y, ids=self.ids,
+                leafsize=self.leafsize)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a point index saved with :meth:`save`
+
+        Parameters
+        ----------
+        filename: str
+            Name of the file to read.
+
+        Returns
+        -------
+        index: :class:`PointIndex`
+            Point index for the saved points.
+        """
+        dat = np.load(filename)
+
+        return cls(dat['x'], dat['y'], ids=dat['ids'],
+                leafsize=int(dat['leafsize']))
@@ -0,0 +1,243 @@
+"""
+Vectorized quality control checks for navigation data
+"""
+import numpy as np
+
+# QC flags, combined as a bitmask
+SPIKE = 1
+TIME_JUMP = 2
+GAP = 4
+CHANNEL_SPACING = 8
+
+QC_FLAGS = [#(flag, desc)
+        (SPIKE, 'Shot-to-shot distance outlier'),
+        (TIME_JUMP, 'Shot time jump'),
+        (GAP, 'Missing shot numbers before this shot'),
+        (CHANNEL_SPACING, 'Channel spacing outlier')]
+
+
+def group_median(values, groups):
+    """
+    Calculate the median of values in each group
+
+    Parameters
+    ----------
+    values: array_like
+        Values to calculate medians for.
+    groups: array_like
+        Integer group number for each value.
+
+    Returns
+    -------
+    median: numpy.ndarray
+        Median of the group for each value.
+
+    Examples
+    --------
+    >>> group_median([1., 5., 2., 10., 20.], [0, 0, 0, 1, 1]).tolist()
+    [2.0, 2.0, 2.0, 15.0, 15.0]
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+
+    order = np.lexsort((values, groups))
+    ugroups, start, ig = np.unique(groups[order], return_index=True,
+            return_inverse=True)
+    count = np.diff(np.append(start, len(values)))
+
+    _values = values[order]
+    median = 0.5 * (_values[start + (count - 1) // 2]
+            + _values[start + count // 2])
+
+    return median[np.searchsorted(ugroups, groups)]
+
+
+def mad_outliers(values, groups=None, nsigma=5., tolerance=0.):
+    """
+    Flag outliers from the median of each group
+
+    Values are outliers if they differ from the median of their group by
+    more than `nsigma` times the scaled median absolute deviation (MAD), and
+    by more than `tolerance`.
+
+    Parameters
+    ----------
+    values: array_like
+        Values to check.
+    groups: array_like, optional
+        Integer group number for each value. Default is to put all values
+        in one group.
+    nsigma: float, optional
+        Number of standard deviations, estimated from the MAD, at which
+        values are outliers. Default is 5.
+    tolerance: float, optional
+        Minimum absolute difference from the median for outliers. Default
+        is 0.
+
+    Returns
+    -------
+    outliers: numpy.ndarray
+        `True` for values that are outliers.
+
+    Examples
+    --------
+    >>> mad_outliers([10., 10.1, 9.9, 10., 30., 10.2]).tolist()
+    [False, False, False, False, True, False]
+    """
+    values = np.asarray(values, dtype=float)
+    if groups is None:
+        groups = np.zeros(len(values), dtype=int)
+
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+
+    deviation = np.abs(values - group_median(values, groups))
+    sigma = 1.4826 * group_median(deviation, groups)
+
+    return (deviation > nsigma * sigma) & (deviation > tolerance)
+
+
+def _sort_pairs(keys):
+    """
+    Sort by keys and find consecutive pairs in the same group
+
+    The last key varies fastest. Returns the sort order and a mask that is
+    `True` where a sorted item is in the same group (all but the last key)
+    as the item before it.
+    """
+    order = np.lexsort(keys[::-1])
+    same = np.zeros(len(order), dtype=bool)
+    if len(order) > 1:
+        same[1:] = True
+        for key in keys[:-1]:
+            _key = np.asarray(key)[order]
+            same[1:] &= _key[1:] == _key[:-1]
+
+    return order, same
+
+
+def shot_qc(line, point, time, x, y, nsigma=5., distance_tolerance=1.,
+        time_tolerance=1.):
+    """
+    Check source positions, shot times, and shot numbers along lines
+
+    Shots are sorted by line and shot number. The distance and time
+    between consecutive shots, divided by the step in shot number, are
+    checked for outliers from the median of each line. Shots that are not
+    later than the previous shot are always flagged as time jumps.
+
+    Parameters
+    ----------
+    line: array_like
+        Line name or number for each shot.
+    point: array_like
+        Integer shot number for each shot.
+    time: array_like
+        Time of each shot, in seconds.
+    x, y: array_like
+        Source coordinates for each shot.
+    nsigma: float, optional
+        Outlier threshold, in standard deviations estimated from the
+        median absolute deviation. Default is 5.
+    distance_tolerance: float, optional
+        Minimum difference from the median shot spacing for distance
+        outliers. Default is 1.
+    time_tolerance: float, optional
+        Minimum difference from the median shot interval for timing
+        outliers, in seconds. Default is 1.
+
+    Returns
+    -------
+    flags: numpy.ndarray
+        Bitmask of QC flags for each shot, in the input order.
+    gap: numpy.ndarray
+        Number of missing shot numbers before each shot.
+    """
+    _, line = np.unique(np.asarray(line), return_inverse=True)
+    point = np.asarray(point, dtype=np.int64)
+    time = np.asarray(time, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    flags = np.zeros(len(point), dtype=int)
+    gap = np.zeros(len(point), dtype=int)
+
+    order, same = _sort_pairs([line, point])
+    ipair = np.nonzero(same)[0]
+    i0 = order[ipair - 1]
+    i1 = order[ipair]
+    if len(ipair) == 0:
+        return flags, gap
+
+    step = np.maximum(point[i1] - point[i0], 1)
+    spacing = np.hypot(x[i1] - x[i0], y[i1] - y[i0]) / step
+    interval = (time[i1] - time[i0]) / step
+
+    spike = mad_outliers(spacing, line[i1], nsigma=nsigma,
+            tolerance=distance_tolerance)
+    flags[i1[spike]] |= SPIKE
+
+    jump = mad_outliers(interval, line[i1], nsigma=nsigma,
+            tolerance=time_tolerance) | (time[i1] <= time[i0])
+    flags[i1[jump]] |= TIME_JUMP
+
+    gap[i1] = point[i1] - point[i0] - 1
+    gap = np.maximum(gap, 0)
+    flags[gap > 0] |= GAP
+
+    return flags, gap
+
+
+def channel_qc(shot, cable, chan, x, y, nsigma=5., tolerance=1.):
+    """
+    Check the spacing between receivers along streamers
+
+    Receivers are sorted by shot, cable, and channel. The distance between
+    consecutive channels on the same cable, divided by the step in channel
+    number, is checked for outliers from the median of each cable.
+
+    Parameters
+    ----------
+    shot: array_like
+        Integer shot number (or other unique shot key) for each receiver.
+    cable: array_like
+        Integer cable number for each receiver.
+    chan: array_like
+        Integer channel number for each receiver.
+    x, y: array_like
+        Receiver coordinates.
+    nsigma: float, optional
+        Outlier threshold, in standard deviations estimated from the
+        median absolute deviation. Default is 5.
+    tolerance: float, optional
+        Minimum difference from the median channel spacing for outliers.
+        Default is 1.
+
+    Returns
+    -------
+    flags: numpy.ndarray
+        Bitmask of QC flags for each receiver, in the input order.
+    """
+    shot = np.asarray(shot)
+    cable = np.asarray(cable)
+    chan = np.asarray(chan, dtype=np.int64)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    flags = np.zeros(len(chan), dtype=int)
+
+    order, same = _sort_pairs([shot, cable, chan])
+    ipair = np.nonzero(same)[0]
+    i0 = order[ipair - 1]
+    i1 = order[ipair]
+    if len(ipair) == 0:
+        return flags
+
+    step = np.maximum(chan[i1] - chan[i0], 1)
+    spacing = np.hypot(x[i1] - x[i0], y[i1] - y[i0]) / step
+
+    bad = mad_outliers(spacing, cable[i1], nsigma=nsigma,
+            tolerance=tolerance)
+    flags[i1[bad]] |= CHANNEL_SPACING
+
+    return flags
@@ -0,0 +1,172 @@
+"""
+Formatting tools for Shell Processing Support (SPS) files
+"""
+import numpy as np
+
+# file extensions for each record type
+SPS_EXTENSIONS = {'S': '.sps', 'R': '.rps', 'X': '.xps'}
+
+# SPS revision 2.1 point records (S and R)
+POINT_FORMAT = [#(field, format, width)
+        ('record_id', '%1s', 1),
+        ('line', '%10.2f', 10),
+        ('point', '%10.2f', 10),
+        (None, '', 2),
+        ('point_index', '%1d', 1),
+        ('point_code', '%-2s', 2),
+        ('static', '%4d', 4),
+        ('point_depth', '%4.1f', 4),
+        ('datum', '%4d', 4),
+        ('uphole_time', '%2d', 2),
+        ('water_depth', '%6.1f', 6),
+        ('easting', '%9.1f', 9),
+        ('northing', '%10.1f', 10),
+        ('elevation', '%6.1f', 6),
+        ('day_of_year', '%3d', 3),
+        ('time', '%6s', 6)]
+
+# SPS revision 2.1 relation records (X)
+RELATION_FORMAT = [#(field, format, width)
+        ('record_id', '%1s', 1),
+        ('tape', '%6s', 6),
+        ('record', '%8d', 8),
+        ('record_increment', '%1d', 1),
+        ('instrument', '%1s', 1),
+        ('line', '%10.2f', 10),
+        ('point', '%10.2f', 10),
+        ('point_index', '%1d', 1),
+        ('from_chan', '%5d', 5),
+        ('to_chan', '%5d', 5),
+        ('chan_increment', '%1d', 1),
+        ('rec_line', '%10.2f', 10),
+        ('from_rec', '%10.2f', 10),
+        ('to_rec', '%10.2f', 10),
+        ('rec_index', '%1d', 1)]
+
+SPS_HEADER = 'H00 SPS format version num.     SPS V2.1'
+
+
+def format_records(record_format, **columns):
+    """
+    Format columns of values as fixed-width records
+
+    Each field is formatted for all records at once with
+    :func:`numpy.char.mod`. Fields that are not given, and NaN values, are
+    left blank.
+
+    Parameters
+    ----------
+    record_format: list
+        List of (field, format, width) tuples, e.g., `POINT_FORMAT`.
+    **columns
+        Values for each field, as arrays or scalars.
+
+    Returns
+    -------
+    records: numpy.ndarray
+        Formatted records.
+
+    Examples
+    --------
+    >>> fmt = [('a', '%3d', 3), (None, '', 1), ('b', '%5.1f', 5)]
+    >>> format_records(fmt, a=[1, 22], b=[0.5, np.nan]).tolist()
+    ['  1   0.5', ' 22      ']
+    """
+    arrays = [np.asarray(v) for v in columns.values()]
+    nrec = max([len(v) for v in arrays if v.ndim > 0] or [1])
+
+    records = np.repeat(np.array(['']), nrec)
+    for field, fmt, width in record_format:
+        value = columns.get(field, None)
+        if value is None:
+            records = np.char.add(records, ' ' * width)
+            continue
+
+        value = np.asarray(value)
+        if value.ndim == 0:
+            value = np.repeat(value, nrec)
+
+        blank = np.zeros(nrec, dtype=bool)
+        if value.dtype.kind == 'f':
+            blank = ~np.isfinite(value)
+            value = np.where(blank, 0., value)
+
+        col = np.char.mod(fmt, value)
+        col[blank] = ' ' * width
+        if np.any(np.char.str_len(col) != width):
+            raise ValueError('Values for {:} do not fit in {:} characters.'\
+                    .format(field, width))
+
+        records = np.char.add(records, col)
+
+    return records
+
+def format_time(day_of_year):
+    """
+    Split fractional days of the year into days and hhmmss strings
+
+    Parameters
+    ----------
+    day_of_year: array_like
+        Day of the year, with the time of day as a fraction.
+
+    Returns
+    -------
+    day: numpy.ndarray
+        Integer day of the year.
+    time: numpy.ndarray
+        Time of day as hhmmss strings, rounded to the nearest second.
+
+    Examples
+    --------
+    >>> day, time = format_time([32.5, 1.75])
+    >>> print day.tolist(), time.tolist()
+    [32, 1] ['120000', '180000']
+    """
+    day_of_year = np.asarray(day_of_year, dtype=float)
+    day = np.floor(day_of_year).astype(int)
+    seconds = np.round((day_of_year - day) * 86400.).astype(int)
+    seconds = np.clip(seconds, 0, 86399)
+
+    time = np.char.mod('%06d', 10000 * (seconds // 3600)
+            + 100 * ((seconds // 60) % 60) + seconds % 60)
+
+    return day, time
+
+def get_relation_runs(keys, chan):
+    """
+    Split sorted receivers into runs of consecutive channels
+
+    Parameters
+    ----------
+    keys: list
+        Arrays of keys (e.g., shot and cable) for each receiver. Receivers
+        must be sorted by keys and then channel.
+    chan: array_like
+        Integer channel numbers.
+
+    Returns
+    -------
+    start, end: numpy.ndarray
+        Indices of the first and last receiver in each run.
+
+    Examples
+    --------
+    >>> start, end = get_relation_runs([[1, 1, 1, 2, 2]], [1, 2, 4, 1, 2])
+    >>> print start.tolist(), end.tolist()
+    [0, 2, 3] [1, 2, 4]
+    """
+    chan = np.asarray(chan, dtype=np.int64)
+    if len(chan) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    new = np.ones(len(chan), dtype=bool)
+    new[1:] = np.diff(chan) != 1
+    for key in keys:
+        key = np.asarray(key)
+        new[1:] |= key[1:] != key[:-1]
+
+    start = np.nonzero(new)[0]
+    end = np.append(start[1:], len(chan)) - 1
+
+    return start, end
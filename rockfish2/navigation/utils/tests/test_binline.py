@@ -0,0 +1,140 @@
+"""
+Test suite for the navigation.utils.binline module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import binline, cartesian
+
+
+class binlineTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.binline module
+    """
+    def setUp(self):
+
+        # gently curving line
+        theta = np.linspace(0, np.pi / 4., 200)
+        self.x = 61475.9 + 10000. * np.sin(theta)
+        self.y = 3601321.9 + 10000. * (1 - np.cos(theta))
+
+    def test_xy(self):
+        """
+        Should match distribute() for linear interpolation
+        """
+        line = binline.BinLine(self.x, self.y)
+
+        distance = np.linspace(0, line.length, 1000)
+        x0, y0 = cartesian.distribute(self.x, self.y, distance)
+        x1, y1 = line.xy(distance)
+
+        for _x0, _y0, _x1, _y1 in zip(x0, y0, x1, y1):
+            self.assertAlmostEqual(_x0, _x1, 6)
+            self.assertAlmostEqual(_y0, _y1, 6)
+
+        # should raise a ValueError if distance is outside of range
+        self.assertRaises(ValueError, line.xy, [-1.])
+        self.assertRaises(ValueError, line.xy, [line.length + 1.])
+
+    def test_project(self):
+        """
+        Should invert xy() and give signed crossline distances
+        """
+        line = binline.BinLine(self.x, self.y)
+
+        distance0 = np.linspace(0, line.length, 500)
+        crossline0 = np.linspace(-20, 20, 500)
+
+        x, y = line.xy(distance0)
+        theta = line.direction(distance0)
+        x1 = x - crossline0 * np.sin(theta)
+        y1 = y + crossline0 * np.cos(theta)
+
+        distance1, crossline1 = line.project(x1, y1)
+
+        for d0, d1 in zip(distance0, distance1):
+            self.assertAlmostEqual(d0, d1, 0)
+
+        for c0, c1 in zip(crossline0, crossline1):
+            self.assertAlmostEqual(c0, c1, 1)
+
+        # points on the line should have zero crossline distance
+        distance2, crossline2 = line.project(self.x, self.y)
+        for d0, d1 in zip(line.distance, distance2):
+            self.assertAlmostEqual(d0, d1, 6)
+        self.assertTrue(np.allclose(crossline2, 0))
+
+    def test_project_folded(self):
+        """
+        Should project onto the nearest segment of a folded line
+        """
+        line = binline.BinLine([0, 1000, 1000, 900, 800, 700, 600, 500],
+                [0, 0, 30, 30, 30, 30, 30, 30])
+        distance, crossline = line.project([500., 950., 1100.],
+                [5., 20., 15.])
+        self.assertEqual(distance.tolist(), [500., 1080., 1015.])
+        self.assertEqual(crossline.tolist(), [5., 10., -100.])
+
+    def test_nearest(self):
+        """
+        Should find nearest line points
+        """
+        line = binline.BinLine([0, 10, 20, 30], [0, 0, 0, 0])
+
+        ipt = line.nearest([-5, 0, 4, 5, 6, 29, 100])
+        self.assertEqual(list(ipt), [0, 0, 0, 0, 1, 3, 3])
+
+    def test_stations(self):
+        """
+        Should distribute stations along the line
+        """
+        line = binline.BinLine(self.x, self.y)
+
+        distance, x, y = line.stations(6.25)
+
+        self.assertEqual(distance[0], 0)
+        self.assertTrue(distance[-1] < line.length)
+        self.assertTrue(np.allclose(np.diff(distance), 6.25))
+
+    def test_line_set(self):
+        """
+        Should match distribute() for each line
+        """
+        np.random.seed(5)
+        _lines = []
+        for i in range(20):
+            n = np.random.randint(2, 50)
+            _lines.append((np.cumsum(np.random.rand(n)),
+                np.cumsum(np.random.rand(n) - 0.5)))
+        lines = binline.LineSet.from_lines(_lines)
+        self.assertEqual(len(lines), 20)
+
+        distance = []
+        for x, y in _lines:
+            length = cartesian.cumdist(x, y)[-1]
+            distance.append(np.linspace(0, length, 17))
+        index = np.arange(0, 20 * 17 + 1, 17)
+
+        x1, y1 = lines.distribute(np.concatenate(distance), index)
+        for i, (x, y) in enumerate(_lines):
+            x0, y0 = cartesian.distribute(x, y, distance[i])
+            self.assertTrue(np.allclose(x0, x1[index[i]:index[i + 1]]))
+            self.assertTrue(np.allclose(y0, y1[index[i]:index[i + 1]]))
+
+        # distances outside of lines
+        self.assertRaises(ValueError, lines.xy, [0], [-1.])
+        self.assertRaises(ValueError, lines.xy, [3],
+                [lines.length[3] + 0.01])
+        x1, y1 = lines.xy([3, 3], [1e-3, lines.length[3] + 0.01],
+                bounds_error=False)
+        self.assertTrue(np.isfinite(x1[0]) and np.isnan(x1[1]))
+
+
+def suite():
+    testSuite = unittest.makeSuite(binlineTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(binline))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -67,6 +67,26 @@ class cartesianTestCase(unittest.TestCase):
         self.assertRaises(ValueError, cartesian.distribute, x, y, [-1e9])
 
 
+    def test_azimuth(self):
+        """
+        Should calculate azimuths clockwise from north
+        """
+        az0 = np.arange(0, 360, 15.)
+        x1 = 10. * np.sin(np.deg2rad(az0))
+        y1 = 10. * np.cos(np.deg2rad(az0))
+
+        az1 = cartesian.azimuth(0, 0, x1, y1)
+        for _az0, _az1 in zip(az0, az1):
+            self.assertAlmostEqual(_az0, _az1, 6)
+
+        # should reverse direction
+        az2 = cartesian.azimuth(x1, y1, 0, 0)
+        for _az1, _az2 in zip(az1, az2):
+            self.assertAlmostEqual(np.cos(np.deg2rad(_az1 + 180.)),
+                    np.cos(np.deg2rad(_az2)), 6)
+            self.assertAlmostEqual(np.sin(np.deg2rad(_az1 + 180.)),
+                    np.sin(np.deg2rad(_az2)), 6)
+
 
 def suite():
     testSuite = unittest.makeSuite(cartesianTestCase, 'test')
@@ -0,0 +1,69 @@
+"""
+Test suite for the navigation.utils.compact module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import compact
+
+
+class compactTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.compact module
+    """
+    def test_pack_unpack_channels(self):
+        """
+        Should round trip values to the nearest centimeter
+        """
+        np.random.seed(7)
+        groups, chan = [v.ravel() for v in np.meshgrid(np.arange(20),
+            np.arange(1, 101), indexing='ij')]
+        values = 5000. * np.random.randn(len(chan), 2)
+
+        # drop some channels and shuffle
+        idx = np.random.permutation(len(chan))[:1900]
+
+        ugroups, chan0, nchan, blobs = compact.pack_channels(groups[idx],
+                chan[idx], values[idx])
+        self.assertEqual(ugroups.tolist(), range(20))
+        self.assertEqual(len(blobs), 20)
+        for blob, n in zip(blobs, nchan):
+            self.assertEqual(len(blob), 8 * n)
+
+        igroup, _chan, _values = compact.unpack_channels(chan0, nchan,
+                blobs, nvalue=2)
+        self.assertEqual(len(_chan), 1900)
+
+        # compare in sorted order
+        order = np.lexsort((chan[idx], groups[idx]))
+        self.assertEqual(ugroups[igroup].tolist(),
+                groups[idx][order].tolist())
+        self.assertEqual(_chan.tolist(), chan[idx][order].tolist())
+        self.assertTrue(np.all(np.abs(_values - values[idx][order])
+            <= 0.005 + 1e-9))
+
+    def test_pack_nan(self):
+        """
+        Should keep channels with NaN values
+        """
+        ugroups, chan0, nchan, blobs = compact.pack_channels([1, 1, 1],
+                [1, 2, 4], [np.nan, 1.5, 2.])
+        self.assertEqual(np.frombuffer(bytes(blobs[0]), dtype='<i4')\
+                .tolist(), [compact.NULL_INT32, 150, compact.NULL_INT32,
+                    200])
+
+        igroup, chan, values = compact.unpack_channels(chan0, nchan, blobs,
+                keep_null=True)
+        self.assertEqual(chan.tolist(), [1, 2, 3, 4])
+        self.assertTrue(np.all(np.isnan(values[[0, 2], 0])))
+        self.assertEqual(values[[1, 3], 0].tolist(), [1.5, 2.])
+
+
+def suite():
+    testSuite = unittest.makeSuite(compactTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(compact))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,107 @@
+"""
+Test suite for the navigation.utils.coverage module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import coverage
+
+
+class coverageTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.coverage module
+    """
+    def test_bin_statistics(self):
+        """
+        Should match statistics calculated bin by bin
+        """
+        np.random.seed(1)
+        n = 5000
+        bins = np.random.randint(1000, 1100, n)
+        offsets = 100. + 8000. * np.random.rand(n)
+        x = 500000. + 10 * np.random.randn(n)
+        y = 4000000. + 10 * np.random.randn(n)
+        crossline = 20 * np.random.randn(n)
+
+        stats = coverage.bin_statistics(bins, offsets, x=x, y=y,
+                crossline=crossline)
+
+        self.assertEqual(list(stats.columns), coverage.COVERAGE_FIELDS)
+        self.assertEqual(list(stats['bin']), list(np.unique(bins)))
+        self.assertEqual(stats['fold'].sum(), n)
+
+        for i in range(len(stats)):
+            b = stats['bin'][i]
+            idx = bins == b
+            self.assertEqual(stats['fold'][i], np.sum(idx))
+            self.assertEqual(stats['offset_min'][i], offsets[idx].min())
+            self.assertEqual(stats['offset_max'][i], offsets[idx].max())
+            self.assertAlmostEqual(stats['offset_mean'][i],
+                    offsets[idx].mean(), 6)
+            self.assertAlmostEqual(stats['crossline_mean'][i],
+                    crossline[idx].mean(), 6)
+            self.assertAlmostEqual(stats['crossline_std'][i],
+                    crossline[idx].std(), 6)
+            r = np.sqrt(np.mean((x[idx] - x[idx].mean()) ** 2
+                + (y[idx] - y[idx].mean()) ** 2))
+            self.assertAlmostEqual(stats['scatter'][i], r, 6)
+
+        # optional statistics should be NaN if not calculated
+        stats = coverage.bin_statistics(bins, offsets)
+        self.assertTrue(np.all(np.isnan(stats['scatter'])))
+        self.assertTrue(np.all(np.isnan(stats['crossline_mean'])))
+
+    def test_grid_index(self):
+        """
+        Should work with bins from a grid
+        """
+        x = np.array([0.5, 0.6, 1.5, 10.])
+        y = np.array([0.5, 0.7, 0.5, 0.5])
+        bins = coverage.grid_index(x, y, 0, 0, 1, 1, 4, 4)
+        self.assertEqual(list(bins), [0, 0, 4, -1])
+
+        stats = coverage.bin_statistics(bins[bins >= 0], np.ones(3))
+        self.assertEqual(list(stats['fold']), [2, 1])
+
+    def test_offset_vector_tiles(self):
+        """
+        Should sort traces into offset-class and azimuth-sector tiles
+        """
+        np.random.seed(2)
+        n = 2000
+        bins = np.random.randint(0, 20, n)
+        offsets = 8000. * np.random.rand(n)
+        azimuths = 360. * np.random.rand(n)
+        offset_edges = [0, 1000, 2000, 4000, 6000]
+
+        tiles, order = coverage.offset_vector_tiles(bins, offsets,
+                azimuths, offset_edges, nsector=6, azimuth0=15.)
+
+        # should drop offsets outside of the classes
+        self.assertEqual(len(order), np.sum(offsets < 6000))
+        self.assertEqual(tiles['fold'].sum(), len(order))
+
+        for i in range(len(tiles)):
+            idx = order[tiles['start'][i]:tiles['start'][i]
+                    + tiles['fold'][i]]
+
+            # traces should belong to the tile
+            self.assertTrue(np.all(bins[idx] == tiles['bin'][i]))
+            ic = tiles['offset_class'][i]
+            self.assertTrue(np.all(offsets[idx] >= offset_edges[ic]))
+            self.assertTrue(np.all(offsets[idx] < offset_edges[ic + 1]))
+            sector = ((azimuths[idx] - 15.) % 360.) // 60.
+            self.assertTrue(np.all(sector == tiles['sector'][i]))
+
+            # and be sorted by offset
+            self.assertTrue(np.all(np.diff(offsets[idx]) >= 0))
+
+
+def suite():
+    testSuite = unittest.makeSuite(coverageTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(coverage))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,121 @@
+"""
+Test suite for the navigation.utils.geodesic module
+"""
+import doctest
+import unittest
+import warnings
+import numpy as np
+from rockfish2.navigation.utils import geodesic
+
+
+def dms2deg(d, m, s):
+    return np.sign(d) * (abs(d) + m / 60. + s / 3600.)
+
+
+class geodesicTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.geodesic module
+    """
+    def setUp(self):
+
+        # Flinders Peak to Buninyong (Vincenty, 1975)
+        self.lon0 = dms2deg(144, 25, 29.52440)
+        self.lat0 = dms2deg(-37, 57, 3.72030)
+        self.lon1 = dms2deg(143, 55, 35.38390)
+        self.lat1 = dms2deg(-37, 39, 10.15610)
+        self.distance = 54972.271
+        self.az0 = dms2deg(306, 52, 5.37)
+        self.az1 = dms2deg(127, 10, 25.07)
+
+        np.random.seed(4)
+        self.lon = 360. * np.random.rand(100) - 180.
+        self.lat = 170. * np.random.rand(100) - 85.
+
+    def test_vincenty_inverse(self):
+        """
+        Should match the reference solution
+        """
+        distance, az0, az1 = geodesic.vincenty_inverse(self.lon0,
+                self.lat0, self.lon1, self.lat1)
+        self.assertAlmostEqual(distance, self.distance, 3)
+        self.assertAlmostEqual(az0, self.az0, 5)
+        self.assertAlmostEqual(az1, self.az1, 5)
+
+    def test_vincenty_forward(self):
+        """
+        Should invert vincenty_inverse
+        """
+        lon1, lat1, az1 = geodesic.vincenty_forward(self.lon0, self.lat0,
+                self.az0, self.distance)
+        self.assertAlmostEqual(lon1, self.lon1, 6)
+        self.assertAlmostEqual(lat1, self.lat1, 6)
+        self.assertAlmostEqual(az1, self.az1, 5)
+
+        # round trip for many points at once
+        distance, az0, _ = geodesic.vincenty_inverse(self.lon[:50],
+                self.lat[:50], self.lon[50:], self.lat[50:])
+        ok = np.isfinite(distance)
+        lon1, lat1, _ = geodesic.vincenty_forward(self.lon[:50][ok],
+                self.lat[:50][ok], az0[ok], distance[ok])
+        dlon = (lon1 - self.lon[50:][ok] + 180.) % 360. - 180.
+        self.assertTrue(np.allclose(dlon, 0, atol=1e-6))
+        self.assertTrue(np.allclose(lat1, self.lat[50:][ok], atol=1e-6))
+
+    def test_spherical(self):
+        """
+        Spherical kernels should be consistent with each other
+        """
+        distance = geodesic.haversine(self.lon[:50], self.lat[:50],
+                self.lon[50:], self.lat[50:])
+        az0 = geodesic.spherical_azimuth(self.lon[:50], self.lat[:50],
+                self.lon[50:], self.lat[50:])
+        lon1, lat1 = geodesic.spherical_forward(self.lon[:50],
+                self.lat[:50], az0, distance)
+        dlon = (lon1 - self.lon[50:] + 180.) % 360. - 180.
+        self.assertTrue(np.allclose(dlon, 0, atol=1e-6))
+        self.assertTrue(np.allclose(lat1, self.lat[50:], atol=1e-6))
+
+        # should be close to the ellipsoidal distance
+        distance = geodesic.haversine(self.lon0, self.lat0, self.lon1,
+                self.lat1)
+        self.assertTrue(abs(distance - self.distance) / self.distance
+                < 0.005)
+
+    def test_pairwise(self):
+        """
+        Should calculate distances between all pairs of points
+        """
+        for func in [geodesic.haversine,
+                lambda *args, **kwargs:
+                    geodesic.vincenty_inverse(*args, **kwargs)[0]]:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                d = func(self.lon[:10], self.lat[:10], self.lon[10:30],
+                        self.lat[10:30], pairwise=True)
+            self.assertEqual(d.shape, (10, 20))
+            for i in range(10):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    di = func(self.lon[i], self.lat[i], self.lon[10:30],
+                            self.lat[10:30])
+                self.assertTrue(np.allclose(d[i], di, equal_nan=True))
+
+    def test_coincident(self):
+        """
+        Should return zero distance for coincident points
+        """
+        distance, _, _ = geodesic.vincenty_inverse(self.lon, self.lat,
+                self.lon, self.lat)
+        self.assertTrue(np.all(distance == 0))
+        self.assertTrue(np.all(geodesic.haversine(self.lon, self.lat,
+            self.lon, self.lat) == 0))
+
+
+def suite():
+    testSuite = unittest.makeSuite(geodesicTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(geodesic))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
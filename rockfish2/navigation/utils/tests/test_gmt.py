@@ -2,17 +2,91 @@
 Test suite for the navigation.utils.gmt module
 """
 import os
+import struct
 import doctest
 import unittest
+import numpy as np
+from rockfish2.db import Connection
 from rockfish2.navigation.utils import gmt
 
 
+def make_point_blob(x, y, srid=4326, endian='<'):
+    """
+    Packs a point as a SpatiaLite geometry blob
+    """
+    return buffer('\x00' + ('\x01' if endian == '<' else '\x00')
+            + struct.pack(endian + 'i4dBidd', srid, x, y, x, y, 0x7C, 1, x, y)
+            + '\xfe')
+
+
 class gmtTestCase(unittest.TestCase):
     """
     Tests for the navigation.utils.gmt module
     """
-    # Tests covered by doctests, so far
-    pass
+    def setUp(self):
+
+        self.db = Connection()
+        sql = """CREATE TABLE pts (name TEXT, chan INTEGER, depth REAL,
+            geom BLOB)"""
+        self.db.execute(sql)
+
+        self.x = 1000. * np.random.rand(25) + 0.123456789
+        self.y = 1000. * np.random.rand(25)
+        rows = [('pt {:}'.format(i), i, 10. * i,
+            make_point_blob(self.x[i], self.y[i])) for i in range(25)]
+        self.db.executemany('INSERT INTO pts VALUES (?, ?, ?, ?)', rows)
+
+    def test_decode_spatialite_points(self):
+        """
+        Should decode point blobs in either byte order
+        """
+        blobs = [make_point_blob(1.5, -2.), None,
+                make_point_blob(3., 4.25, endian='>')]
+        x, y = gmt.decode_spatialite_points(blobs)
+        self.assertEqual(x[[0, 2]].tolist(), [1.5, 3.])
+        self.assertEqual(y[[0, 2]].tolist(), [-2., 4.25])
+        self.assertTrue(np.isnan(x[1]) and np.isnan(y[1]))
+
+        self.assertRaises(ValueError, gmt.decode_spatialite_points,
+                [buffer('\x00' * 10)])
+
+    def test_write_gmt_ogr(self):
+        """
+        Should write points in GMT OGR format
+        """
+        filename = 'temp_write_gmt.gmt'
+        columns = gmt.write_gmt(self.db, 'pts', filename, chunksize=7)
+        self.assertEqual(columns, ['x', 'y', 'name', 'chan', 'depth'])
+
+        lines = open(filename).read().splitlines()
+        os.remove(filename)
+
+        self.assertEqual(lines[1], '# @Nname|chan|depth')
+        self.assertEqual(lines[2], '# @Tstring|integer|double')
+        self.assertEqual(lines[4], '# @D"pt 0"|0|0.0')
+        x, y = np.asarray([l.split() for l in lines[5::2]], dtype=float).T
+        self.assertEqual(x.tolist(), self.x.tolist())
+        self.assertEqual(y.tolist(), self.y.tolist())
+
+    def test_write_gmt_binary(self):
+        """
+        Should write numeric columns as native binary
+        """
+        filename = 'temp_write_gmt.bin'
+        columns = gmt.write_gmt(self.db, 'SELECT chan, depth, geom FROM pts',
+                filename, binary=True, chunksize=7)
+        self.assertEqual(columns, ['x', 'y', 'chan', 'depth'])
+
+        dat = np.fromfile(filename, dtype='<f8').reshape(-1, 4)
+        os.remove(filename)
+
+        self.assertEqual(dat[:, 0].tolist(), self.x.tolist())
+        self.assertEqual(dat[:, 2].tolist(), range(25))
+
+        # text columns cannot be written as binary
+        self.assertRaises(ValueError, gmt.write_gmt, self.db, 'pts',
+                filename, binary=True)
+        os.remove(filename)
 
 
 def suite():
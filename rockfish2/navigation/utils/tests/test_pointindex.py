@@ -0,0 +1,87 @@
+"""
+Test suite for the navigation.utils.pointindex module
+"""
+import os
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import pointindex
+
+
+class pointindexTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.pointindex module
+    """
+    def setUp(self):
+
+        np.random.seed(3)
+        self.x = 10000. * np.random.rand(500)
+        self.y = 10000. * np.random.rand(500)
+        self.ids = np.arange(1000, 1500)
+
+        self.qx = 10000. * np.random.rand(50)
+        self.qy = 10000. * np.random.rand(50)
+
+    def test_nearest(self):
+        """
+        Should match a brute-force search
+        """
+        index = pointindex.PointIndex(self.x, self.y, ids=self.ids)
+
+        r = np.hypot(self.x[np.newaxis, :] - self.qx[:, np.newaxis],
+                self.y[np.newaxis, :] - self.qy[:, np.newaxis])
+
+        distance, ids = index.nearest(self.qx, self.qy)
+        self.assertEqual(ids.tolist(), self.ids[np.argmin(r, axis=1)].tolist())
+        self.assertTrue(np.allclose(distance, np.min(r, axis=1)))
+
+        distance, ids = index.nearest(self.qx, self.qy, k=3)
+        self.assertEqual(ids.shape, (50, 3))
+        self.assertEqual(ids.tolist(),
+                self.ids[np.argsort(r, axis=1)[:, :3]].tolist())
+
+        # missing neighbors
+        distance, ids = index.nearest(self.qx, self.qy,
+                distance_upper_bound=1.)
+        self.assertTrue(np.all(ids[np.isinf(distance)] == -1))
+
+    def test_within(self):
+        """
+        Should match a brute-force radius search
+        """
+        index = pointindex.PointIndex(self.x, self.y, ids=self.ids)
+
+        r = np.hypot(self.x[np.newaxis, :] - self.qx[:, np.newaxis],
+                self.y[np.newaxis, :] - self.qy[:, np.newaxis])
+
+        ids = index.within(self.qx, self.qy, 1000.)
+        count = index.count_within(self.qx, self.qy, 1000.)
+        for i in range(len(self.qx)):
+            self.assertEqual(ids[i].tolist(),
+                    self.ids[r[i] <= 1000.].tolist())
+            self.assertEqual(count[i], len(ids[i]))
+
+    def test_save_load(self):
+        """
+        Should save and reload an index
+        """
+        filename = 'temp_pointindex.npz'
+        index = pointindex.PointIndex(self.x, self.y, ids=self.ids)
+        index.save(filename)
+
+        index1 = pointindex.PointIndex.load(filename)
+        os.remove(filename)
+
+        self.assertEqual(len(index1), len(index))
+        self.assertEqual(index1.nearest(self.qx, self.qy)[1].tolist(),
+                index.nearest(self.qx, self.qy)[1].tolist())
+
+
+def suite():
+    testSuite = unittest.makeSuite(pointindexTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(pointindex))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,99 @@
+"""
+Test suite for the navigation.utils.qc module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import qc
+
+
+class qcTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.qc module
+    """
+    def setUp(self):
+
+        np.random.seed(6)
+
+        # two lines with 50 m shot spacing and 20 s shot interval
+        self.point = np.append(np.arange(1000, 1200), np.arange(5000, 5100))
+        self.line = np.asarray(200 * ['L1'] + 100 * ['L2'])
+        self.x = 50. * (self.point - self.point[0])\
+                + 0.1 * np.random.randn(300)
+        self.y = 1000. * (self.line == 'L2') + 0.1 * np.random.randn(300)
+        self.time = 20. * (self.point - self.point[0])\
+                + 0.01 * np.random.randn(300)
+
+    def test_group_median(self):
+        """
+        Should match numpy.median for each group
+        """
+        values = np.random.rand(101)
+        groups = np.random.randint(0, 7, 101)
+
+        median = qc.group_median(values, groups)
+        for g in np.unique(groups):
+            self.assertTrue(np.allclose(median[groups == g],
+                np.median(values[groups == g])))
+
+    def test_shot_qc(self):
+        """
+        Should flag spikes, time jumps, and gaps
+        """
+        # clean data should not be flagged
+        flags, gap = qc.shot_qc(self.line, self.point, self.time, self.x,
+                self.y)
+        self.assertEqual(np.sum(flags), 0)
+        self.assertEqual(np.sum(gap), 0)
+
+        # add a spike, a time jump, and a gap
+        x = self.x.copy()
+        x[50] += 200.
+        time = self.time.copy()
+        time[120:200] += 15.
+        keep = np.ones(300, dtype=bool)
+        keep[250:253] = False
+
+        # shuffle input order
+        idx = np.random.permutation(np.nonzero(keep)[0])
+        flags, gap = qc.shot_qc(self.line[idx], self.point[idx], time[idx],
+                x[idx], self.y[idx])
+
+        spike = self.point[idx][(flags & qc.SPIKE) > 0]
+        self.assertEqual(sorted(spike.tolist()), [1050, 1051])
+
+        jump = self.point[idx][(flags & qc.TIME_JUMP) > 0]
+        self.assertEqual(jump.tolist(), [1120])
+
+        igap = np.nonzero(flags & qc.GAP)[0]
+        self.assertEqual(self.point[idx][igap].tolist(), [5053])
+        self.assertEqual(gap[igap].tolist(), [3])
+
+    def test_channel_qc(self):
+        """
+        Should flag channel spacing outliers
+        """
+        # 10 shots with 2 cables of 48 channels at 12.5 m spacing
+        shot, cable, chan = [v.ravel() for v in np.meshgrid(np.arange(10),
+            [1, 2], np.arange(1, 49), indexing='ij')]
+        x = -12.5 * chan + 0.05 * np.random.randn(len(chan))
+        y = 100. * cable + 0.05 * np.random.randn(len(chan))
+
+        flags = qc.channel_qc(shot, cable, chan, x, y)
+        self.assertEqual(np.sum(flags), 0)
+
+        # move one receiver
+        y[500] += 30.
+        flags = qc.channel_qc(shot, cable, chan, x, y)
+        bad = np.nonzero(flags & qc.CHANNEL_SPACING)[0]
+        self.assertEqual(bad.tolist(), [500, 501])
+
+
+def suite():
+    testSuite = unittest.makeSuite(qcTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(qc))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,51 @@
+"""
+Test suite for the navigation.utils.sps module
+"""
+import doctest
+import unittest
+import numpy as np
+from rockfish2.navigation.utils import sps
+
+
+class spsTestCase(unittest.TestCase):
+    """
+    Tests for the navigation.utils.sps module
+    """
+    def test_format_records(self):
+        """
+        Should format 80-column point and relation records
+        """
+        day, time = sps.format_time([45.5 + 61. / 86400.])
+        records = sps.format_records(sps.POINT_FORMAT, record_id='S',
+                line=[1001.], point=[2534], point_index=1,
+                water_depth=[np.nan], easting=[512345.67],
+                northing=[4321098.7], day_of_year=day, time=time)
+        self.assertEqual(len(records[0]), 80)
+        self.assertEqual(records[0][0:21], 'S   1001.00   2534.00')
+        self.assertEqual(records[0][23], '1')
+        self.assertEqual(records[0][40:46], ' ' * 6)
+        self.assertEqual(records[0][46:55], ' 512345.7')
+        self.assertEqual(records[0][55:65], ' 4321098.7')
+        self.assertEqual(records[0][71:80], ' 45120101')
+
+        records = sps.format_records(sps.RELATION_FORMAT, record_id='X',
+                record=2534, record_increment=1, instrument='1',
+                line=1001., point=2534, point_index=1, from_chan=1,
+                to_chan=636, chan_increment=1, rec_line=1001.,
+                from_rec=1., to_rec=636., rec_index=1)
+        self.assertEqual(len(records[0]), 80)
+        self.assertEqual(records[0][38:48], '    1  636')
+
+        # should not write values that do not fit
+        self.assertRaises(ValueError, sps.format_records, sps.POINT_FORMAT,
+                point_depth=[1000.])
+
+
+def suite():
+    testSuite = unittest.makeSuite(spsTestCase, 'test')
+    testSuite.addTest(doctest.DocTestSuite(sps))
+
+    return testSuite
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')